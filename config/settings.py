@@ -29,3 +29,49 @@ DB_CONFIG = {
     "host": get_env_var("DB_HOST"),
     "port": get_env_var("DB_PORT"),
 }
+
+# Pool de conexões do engine único do processo (src/database/db_utils.obter_engine)
+POOL_CONFIG = {
+    "pool_size": int(get_env_var("DB_POOL_SIZE") or 5),
+    "max_overflow": int(get_env_var("DB_MAX_OVERFLOW") or 2),
+    "pool_timeout": int(get_env_var("DB_POOL_TIMEOUT") or 30),
+    "pool_recycle": int(get_env_var("DB_POOL_RECYCLE") or 3600),
+    # Uma conexão somente leitura REPEATABLE READ por relatório (DatabaseConnection.session)
+    "sessao_por_relatorio": (get_env_var("DB_SESSAO_RELATORIO") or "true").lower() == "true",
+    # Sessões abertas dentro desta janela (ms) importam o mesmo retrato e coalescem consultas idênticas; 0 = retrato próprio
+    "retrato_compartilhado_ms": int(get_env_var("DB_RETRATO_COMPARTILHADO_MS") or 2000),
+    # Comandos preparados (PREPARE/EXECUTE) para as consultas de Indicadores; desative atrás de pgbouncer em modo transação
+    "consultas_preparadas": (get_env_var("DB_CONSULTAS_PREPARADAS") or "true").lower() == "true",
+    # Consultas com duração a partir deste limite (ms) são logadas com os parâmetros; 0 = desativado
+    "consulta_lenta_ms": int(get_env_var("DB_CONSULTA_LENTA_MS") or 0),
+    # Modo diagnóstico: EXPLAIN (ANALYZE, BUFFERS) de cada consulta de Indicadores (também por header X-Explain)
+    "explain": (get_env_var("DB_EXPLAIN") or "false").lower() == "true",
+}
+
+# Cache de resultados de Indicadores entre requisições (src/core/cache.py).
+# A validade é garantida por uma sonda de versão dos dados do cliente: contagem e última data em fc/dre/indicador
+# (pelos índices), contador de escritas de cada tabela (pg_stat_user_tables) e hash do plano de contas.
+CACHE_CONFIG = {
+    "ativo": (get_env_var("INDICADORES_CACHE") or "true").lower() == "true",
+    "max_entradas": int(get_env_var("INDICADORES_CACHE_MAX_ENTRADAS") or 2000),
+    "ttl_segundos": int(get_env_var("INDICADORES_CACHE_TTL") or 900),
+    "sqlite": get_env_var("INDICADORES_CACHE_SQLITE"),  # caminho do arquivo; vazio = apenas memória
+}
+
+# Cache curto dos metadados dos seletores (clientes, anos, centros de custo) em src/database/metadados.py.
+# Sem sonda de versão: após uma carga, os metadados novos aparecem em até ttl_segundos (0 = desativado).
+METADADOS_CONFIG = {
+    "ttl_segundos": int(get_env_var("METADADOS_CACHE_TTL") or 60),
+    "max_entradas": int(get_env_var("METADADOS_CACHE_MAX_ENTRADAS") or 500),
+}
+
+# Agregados mensais de fc/dre (src/queries/AGREGADOS_MENSAIS.txt). Com "ativo", Indicadores lê de
+# fc_mensal/dre_mensal; atualize-os após cada carga com `python -m src.database.agregados_mensais`.
+AGREGADOS_CONFIG = {
+    "ativo": (get_env_var("INDICADORES_AGREGADOS_MENSAIS") or "false").lower() == "true",
+}
+
+# Relatório 5: tamanho da janela da análise temporal da Geração de Caixa (ex.: 3, 6 ou 12 meses)
+RELATORIO5_CONFIG = {
+    "meses_analise_temporal": int(get_env_var("RELATORIO5_MESES_ANALISE_TEMPORAL") or 3),
+}
@@ -1,9 +1,9 @@
-from fastapi import FastAPI, HTTPException, Query, Depends, Security
+from fastapi import FastAPI, HTTPException, Query, Depends, Security, Header
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import date, timedelta
 import os
 import io
@@ -11,14 +11,19 @@ import re
 import gc
 import time
 import zipfile
+import itertools
+from contextlib import nullcontext
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 load_dotenv()  # Carrega as variáveis do arquivo .env
 
 import logging
-from src.database.db_utils import DatabaseConnection, buscar_clientes, obter_meses, obter_anos
+from src.database.db_utils import DatabaseConnection, obter_meses, obter_engine, estado_pool, metricas_consultas
+from src.database.metadados import listar_clientes_ativos, obter_anos_clientes, buscar_centros_custo, buscar_nomes_clientes
 from src.core.indicadores import Indicadores
+from src.core.planejador import PlanejadorRelatorios
+from config.settings import POOL_CONFIG
 from src.core.relatorios import (
     Relatorio1, Relatorio2, Relatorio3, Relatorio4, Relatorio5, Relatorio6, Relatorio7, Relatorio8
 )
@@ -93,6 +98,11 @@ app.add_middleware(
     expose_headers=["Content-Disposition", "Content-Length"],  # Necessário para download
 )
 
+@app.on_event("startup")
+def criar_pool_conexoes():
+    """Cria na subida da API o engine único do processo, compartilhado por todas as DatabaseConnection."""
+    obter_engine()
+
 # ---------------------------
 # Constantes de Negócio
 # ---------------------------
@@ -219,10 +229,20 @@ def health():
         "max_workers_parallelism": 2
     }
 
+@app.get("/v1/pool", dependencies=[Depends(verify_api_key)])
+def metricas_pool():
+    """Medidores do pool de conexões (uso e espera pelo checkout) para dimensionar DB_POOL_SIZE/DB_MAX_OVERFLOW."""
+    return estado_pool()
+
+@app.get("/v1/consultas", dependencies=[Depends(verify_api_key)])
+def metricas_consultas_banco():
+    """Tempo, linhas e bytes das consultas ao banco por método de origem, com histograma de tempo (desde o início do processo)."""
+    return metricas_consultas.resumo()
+
 @app.get("/v1/clientes", dependencies=[Depends(verify_api_key)])
 def listar_clientes():
     db = DatabaseConnection()
-    clientes = buscar_clientes(db)  # lista de dicts {id_cliente, nome}
+    clientes = listar_clientes_ativos(db)  # lista de dicts {id_cliente, nome}
     return {"clientes": clientes or []}
 
 @app.get("/v1/anos", dependencies=[Depends(verify_api_key)])
@@ -232,12 +252,8 @@ def listar_anos(id_cliente: str = Query(..., description="IDs separados por vír
     ids = [int(x) for x in id_cliente.split(",") if x.strip().isdigit()]
     if not ids:
         raise HTTPException(status_code=422, detail="Informe id_cliente válidos.")
-    todos = []
-    for cid in ids:
-        anos_c = obter_anos(db, cid)  # ex.: [2025, 2024, ...]
-        todos.extend(anos_c or [])
-    # únicos e ordenados desc
-    anos = sorted(list(set(todos)), reverse=True)
+    # Uma consulta para todos os clientes; únicos e ordenados desc (ex.: [2025, 2024, ...])
+    anos = obter_anos_clientes(db, ids)
     return {"anos": anos}
 
 @app.get("/v1/meta", dependencies=[Depends(verify_api_key)])
@@ -249,75 +265,106 @@ def meta():
 # ---------------------------
 # Funções auxiliares de geração de relatórios
 # ---------------------------
-def gerar_relatorio_unico(
-    db: DatabaseConnection,
-    id_cliente: List[int],
-    display_nome: str,
+def sessao_relatorio(db: DatabaseConnection):
+    """Sessão somente leitura REPEATABLE READ para as consultas de um relatório (desativável por DB_SESSAO_RELATORIO)."""
+    return db.session() if POOL_CONFIG["sessao_por_relatorio"] else nullcontext(db)
+
+
+def logar_resumo_consultas(db: DatabaseConnection, mais_lentas: int = 5) -> None:
+    """Loga a quantidade de consultas e o tempo de banco da requisição, com os métodos mais lentos."""
+    resumo = db.metricas_consultas.resumo()
+    logging.info(
+        f"🗄️  Banco: {resumo['consultas']} consultas, {resumo['tempo_total_ms']:.0f} ms, "
+        f"{resumo['linhas']} linhas, {resumo['bytes']:,} bytes"
+    )
+    for rotulo, m in list(resumo["por_rotulo"].items())[:mais_lentas]:
+        logging.info(f"     {rotulo}: {m['consultas']}x, {m['tempo_total_ms']:.0f} ms (máx. {m['tempo_max_ms']:.0f} ms)")
+
+
+def salvar_planos_explain(db: DatabaseConnection, nome: str) -> None:
+    """No modo diagnóstico, loga o resumo dos planos capturados e grava os planos em outputs/explain/."""
+    if db.captura_explain is None:
+        return
+    resumo = db.captura_explain.resumo()
+    logging.info(
+        f"🔬 EXPLAIN: {resumo['consultas']} planos, {resumo['com_seq_scan']} com Seq Scan, "
+        f"{resumo['linhas_removidas_filtro']} linhas descartadas por filtro, "
+        f"{resumo['blocos_lidos']} blocos lidos do disco / {resumo['blocos_em_cache']} em cache"
+    )
+    for consulta in resumo["por_consulta"]:
+        if consulta["seq_scans"]:
+            logging.warning(f"     Seq Scan em {', '.join(consulta['seq_scans'])}: {consulta['rotulo']}")
+    try:
+        os.makedirs(os.path.join("outputs", "explain"), exist_ok=True)
+        caminho = os.path.join("outputs", "explain", f"{slugify_filename(nome)}_{int(time.time())}.json")
+        db.captura_explain.salvar(caminho)
+        logging.info(f"🔬 Planos salvos em {caminho}")
+    except Exception as e:
+        logging.warning(f"⚠️ Não foi possível salvar os planos do EXPLAIN: {str(e)}")
+
+
+def planejar_relatorios(
+    indicadores: Indicadores,
+    relatorios_ids: List[int],
     mes_atual: date,
     mes_anterior: date,
+    filtros: List[tuple],
+    executar: bool = True
+) -> tuple:
+    """Planeja os dados de todos os relatórios pedidos, sem cálculos repetidos (ver src/core/planejador.py).
+
+    Com `executar`, busca tudo de uma vez; sem ele, a busca fica para `gerar_dados_relatorios`,
+    relatório a relatório.
+
+    Args:
+        filtros: Pares (centro_custo, empresa), um por PDF.
+
+    Returns:
+        Tupla (planejador, plano).
+    """
+    planejador = PlanejadorRelatorios(indicadores)
+    plano = planejador.planejar(
+        {rel_id: RELATORIO_CLASSES[rel_id] for rel_id in relatorios_ids}, mes_atual, mes_anterior, filtros
+    )
+    resumo = plano.resumo()
+    logging.info(f"🧭 Plano de consultas: {resumo['distintos']} cálculos distintos ({resumo['declarados']} declarados pelos relatórios)")
+    if executar:
+        falhas = planejador.executar(plano)
+        if falhas:
+            logging.warning(f"⚠️ {falhas} consulta(s) antecipada(s) falharam; serão repetidas pelos relatórios")
+    return planejador, plano
+
+
+def gerar_dados_relatorios(
+    indicadores: Indicadores,
     relatorios_ids: List[int],
-    analise_text: str,
+    nome: str,
+    mes_atual: date,
+    mes_anterior: date,
     centro_custo: Optional[str],
     empresa: Optional[str],
-    ano: int,
-    mes: int
-) -> StreamingResponse:
-    """Gera um único relatório PDF (com ou sem filtro de centro de custo/empresa)."""
-    
-    logging.info(f"📄 Iniciando geração de relatório único para {display_nome} - {mes}/{ano}")
-    logging.info(f"📋 Relatórios solicitados: {relatorios_ids}")
-    
-    # Criar instância de Indicadores
-    indicadores = Indicadores(id_cliente, db)
-    
-    logging.info(f"✅ Indicadores criados, validando dados...")
-    
-    # Validação de dados
-    dados_validos, mensagem_erro = validar_dados_cliente(indicadores, mes_atual)
-    if not dados_validos:
-        raise HTTPException(
-            status_code=422,
-            detail={
-                "error": "Dados insuficientes",
-                "message": mensagem_erro,
-                "cliente_id": id_cliente,
-                "periodo": f"{mes}/{ano}",
-                "code": "NO_DATA_AVAILABLE"
-            }
-        )
-    
-    # Índice
-    meses = obter_meses()
-    nome_mes = next((nm for nm, n in meses if n == mes), str(mes))
-    ids_escolhidos = set(relatorios_ids)
-    indice_data = {
-        "fluxo_caixa": "Sim" if ids_escolhidos & {1, 2, 3, 4, 5} else "Não",
-        "dre_gerencial": "Sim" if 6 in ids_escolhidos else "Não",
-        "indicador": "Sim" if 7 in ids_escolhidos else "Não",
-        "nota_consultor": "Sim" if 8 in ids_escolhidos else "Não",
-        "cliente_nome": display_nome,
-        "mes": nome_mes,
-        "ano": ano,
-        "nome": display_nome,
-        "Periodo": f"{nome_mes} {ano}",
-        "marca": MARCA_PADRAO,
-    }
-    
-    relatorios_dados = [("Índice", indice_data)]
-    
-    logging.info(f"🔄 Gerando {len(relatorios_ids)} relatórios (sequencial - otimizado para banco)...")
+    analise_text: str,
+    plano: Optional[tuple] = None
+) -> Iterator[tuple]:
+    """Gera os relatórios SEQUENCIALMENTE, entregando (rótulo, dados) assim que cada um fica pronto.
+
+    Consumido por `RenderingEngine.render_stream`, que converte cada relatório enquanto o
+    seguinte é calculado. Com `plano` (planejador, plano), os dados de cada relatório são
+    buscados logo antes dele: os primeiros já renderizam enquanto os últimos consultam o banco.
+    """
     tempo_inicio_relatorios = time.time()
-    
-    # Gerar relatórios SEQUENCIALMENTE reusando a mesma conexão/indicadores
-    # CRÍTICO: Reduz conexões simultâneas ao banco de ~175 para ~10-25
-    for rel_id in relatorios_ids:
+    for posicao, rel_id in enumerate(relatorios_ids, 1):
         tempo_inicio_rel = time.time()
         rel_label = RELATORIO_LABELS[rel_id]
-        rel_class = RELATORIO_CLASSES[rel_id]
-        relatorio = rel_class(indicadores, display_nome)  # Reusa indicadores existentes
-        
-        logging.info(f"  📊 [{rel_id}/{len(relatorios_ids)}] Gerando {rel_label}...")
-        
+        relatorio = RELATORIO_CLASSES[rel_id](indicadores, nome)  # Reusa indicadores existentes
+    
+        logging.info(f"  📊 [{posicao}/{len(relatorios_ids)}] Gerando {rel_label}...")
+        if plano is not None:
+            planejador, plano_relatorios = plano
+            falhas = planejador.executar(plano_relatorios, rel_id)
+            if falhas:
+                logging.warning(f"⚠️ {falhas} consulta(s) antecipada(s) do {rel_label} falharam; serão repetidas pelo relatório")
+    
         # Passar filtros para os métodos das classes de relatório
         if rel_id in {1, 2, 3, 4, 5}:  # Relatórios de FC (aceita centro_custo)
             dados = relatorio.gerar_relatorio(mes_atual, mes_anterior, centro_custo)
@@ -329,32 +376,101 @@ def gerar_relatorio_unico(
             if analise_text:
                 relatorio.salvar_analise(mes_atual, analise_text)
             dados = relatorio.gerar_relatorio(mes_atual)
-        
+    
         tempo_rel = time.time() - tempo_inicio_rel
-        logging.info(f"  ✅ [{rel_id}/{len(relatorios_ids)}] {rel_label} concluído em {tempo_rel:.1f}s")
-        relatorios_dados.append((rel_label, dados))
+        logging.info(f"  ✅ [{posicao}/{len(relatorios_ids)}] {rel_label} concluído em {tempo_rel:.1f}s")
+        yield rel_label, dados
     
     tempo_total_relatorios = time.time() - tempo_inicio_relatorios
-    logging.info(f"⏱️  Total geração relatórios: {tempo_total_relatorios:.1f}s (média: {tempo_total_relatorios/len(relatorios_ids):.1f}s/relatório)")
+    logging.info(f"⏱️  Total geração relatórios: {tempo_total_relatorios:.1f}s (média: {tempo_total_relatorios/max(len(relatorios_ids), 1):.1f}s/relatório)")
+
+
+def gerar_relatorio_unico(
+    db: DatabaseConnection,
+    id_cliente: List[int],
+    display_nome: str,
+    mes_atual: date,
+    mes_anterior: date,
+    relatorios_ids: List[int],
+    analise_text: str,
+    centro_custo: Optional[str],
+    empresa: Optional[str],
+    ano: int,
+    mes: int
+) -> StreamingResponse:
+    """Gera um único relatório PDF (com ou sem filtro de centro de custo/empresa)."""
     
-    logging.info(f"🎨 Renderizando PDF final...")
+    logging.info(f"📄 Iniciando geração de relatório único para {display_nome} - {mes}/{ano}")
+    logging.info(f"📋 Relatórios solicitados: {relatorios_ids}")
     
-    # Renderizar PDF
-    engine = RenderingEngine()
-    os.makedirs("outputs", exist_ok=True)
+    # Consultas do relatório em uma única conexão/transação (mesmo retrato dos dados em todas as páginas)
+    with sessao_relatorio(db):
+        # Criar instância de Indicadores
+        indicadores = Indicadores(id_cliente, db)
+        logging.info(f"✅ Indicadores criados, validando dados...")
     
-    # Nome do arquivo
-    nome_mes_slug = slugify_filename(nome_mes)
-    filename_parts = [f"Relatorio_{slugify_filename(display_nome)}", f"{nome_mes_slug}_{ano}"]
+        # Validação de dados, antes das consultas dos relatórios (sem dados, nada mais é consultado)
+        dados_validos, mensagem_erro = validar_dados_cliente(indicadores, mes_atual)
+        if not dados_validos:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "error": "Dados insuficientes",
+                    "message": mensagem_erro,
+                    "cliente_id": id_cliente,
+                    "periodo": f"{mes}/{ano}",
+                    "code": "NO_DATA_AVAILABLE"
+                }
+            )
+    
+        # Plano dos dados de todos os relatórios (snapshot do fc, lote do DRE, indicadores), buscados relatório a relatório
+        plano = planejar_relatorios(indicadores, relatorios_ids, mes_atual, mes_anterior, [(centro_custo, empresa)], executar=False)
+    
+        # Índice
+        meses = obter_meses()
+        nome_mes = next((nm for nm, n in meses if n == mes), str(mes))
+        ids_escolhidos = set(relatorios_ids)
+        indice_data = {
+            "fluxo_caixa": "Sim" if ids_escolhidos & {1, 2, 3, 4, 5} else "Não",
+            "dre_gerencial": "Sim" if 6 in ids_escolhidos else "Não",
+            "indicador": "Sim" if 7 in ids_escolhidos else "Não",
+            "nota_consultor": "Sim" if 8 in ids_escolhidos else "Não",
+            "cliente_nome": display_nome,
+            "mes": nome_mes,
+            "ano": ano,
+            "nome": display_nome,
+            "Periodo": f"{nome_mes} {ano}",
+            "marca": MARCA_PADRAO,
+        }
     
-    if centro_custo:
-        filename_parts.append(f"CC_{slugify_filename(centro_custo)}")
-    elif empresa:
-        filename_parts.append(f"EMP_{slugify_filename(empresa)}")
+        # Nome do arquivo
+        os.makedirs("outputs", exist_ok=True)
+        nome_mes_slug = slugify_filename(nome_mes)
+        filename_parts = [f"Relatorio_{slugify_filename(display_nome)}", f"{nome_mes_slug}_{ano}"]
         
-    filename = "_".join(filename_parts) + ".pdf"
-    output_path = os.path.join("outputs", filename)
-    pdf_path = engine.render_to_pdf(relatorios_dados, display_nome, nome_mes, ano, output_path)
+        if centro_custo:
+            filename_parts.append(f"CC_{slugify_filename(centro_custo)}")
+        elif empresa:
+            filename_parts.append(f"EMP_{slugify_filename(empresa)}")
+            
+        filename = "_".join(filename_parts) + ".pdf"
+        output_path = os.path.join("outputs", filename)
+    
+        # Pipeline: cada relatório vai para o wkhtmltopdf assim que fica pronto, enquanto o seguinte
+        # é calculado; a montagem final segue a ordem canônica das páginas
+        logging.info(f"🔄 Gerando e renderizando {len(relatorios_ids)} relatórios em pipeline...")
+        relatorios_dados = itertools.chain(
+            [("Índice", indice_data)],
+            gerar_dados_relatorios(indicadores, relatorios_ids, display_nome, mes_atual, mes_anterior,
+                                   centro_custo, empresa, analise_text, plano),
+        )
+        engine = RenderingEngine()
+        pdf_path = engine.render_stream(relatorios_dados, display_nome, nome_mes, ano, output_path)
+    
+    cache = indicadores.estatisticas_cache()
+    logging.info(f"🗃️  Cache de indicadores: {cache['hits']} reaproveitados, {cache['misses']} calculados")
+    logar_resumo_consultas(db)
+    salvar_planos_explain(db, f"{display_nome}_{mes}_{ano}")
     
     # Retornar arquivo
     pdf_bytes = open(pdf_path, "rb").read()
@@ -413,15 +529,42 @@ def gerar_multiplos_pdfs(
     logging.info(f"Iniciando geração SEQUENCIAL de {total_centros} PDFs...")
     logging.info(f"Tempo máximo estimado: {total_centros * 60}s (~{total_centros} min)")
     
+    # Uma única instância de Indicadores e um único plano para todos os centros: o snapshot do fc
+    # (agrupado por centro_custo) e o DRE por empresa são carregados uma vez e fatiados em memória,
+    # e o que não depende do centro (Relatório 7) é calculado uma só vez. A sessão cobre apenas a
+    # carga em lote e os dados de todos os centros (o mesmo retrato para o ZIP inteiro); a
+    # renderização, que domina o tempo, roda depois, sem conexão fixada nem transação aberta.
+    indicadores = Indicadores(id_cliente, db)
+    dados_por_centro = {}
+    with sessao_relatorio(db):
+        planejar_relatorios(indicadores, relatorios_ids, mes_atual, mes_anterior, [(centro, centro) for centro in centros_custo])
+        sessao_valida = not db.sessao_invalida
+        for idx, centro in enumerate(centros_custo, 1):
+            try:
+                logging.info(f"[{idx}/{total_centros}] Calculando dados do centro: {centro}")
+                dados_por_centro[centro] = list(gerar_dados_relatorios(
+                    indicadores, relatorios_ids, f"{display_nome} - {centro}",
+                    mes_atual, mes_anterior, centro, centro, analise_text,
+                ))
+            except Exception as e:
+                logging.error(f"✗ [{idx}/{total_centros}] Erro ao calcular dados para {centro}: {str(e)}")
+                import traceback
+                logging.error(traceback.format_exc())
+                # Continua processando os outros
+            if sessao_valida and db.sessao_invalida:
+                sessao_valida = False
+                logging.warning(
+                    f"⚠️ Sessão do ZIP invalidada em {idx}/{total_centros} ({centro}): os centros seguintes "
+                    f"leem os dados atuais pelo pool, fora do retrato dos anteriores"
+                )
+    
     for idx, centro in enumerate(centros_custo, 1):
+        if centro not in dados_por_centro:
+            continue
         inicio_pdf = time.time()
         try:
             logging.info(f"[{idx}/{total_centros}] Gerando PDF para centro: {centro}")
-            
-            # Criar conexão nova para cada centro
-            db_centro = DatabaseConnection()
-            indicadores = Indicadores(id_cliente, db_centro)
-            
+        
             # Índice
             ids_escolhidos = set(relatorios_ids)
             indice_data = {
@@ -436,72 +579,54 @@ def gerar_multiplos_pdfs(
                 "Periodo": f"{nome_mes} {ano}",
                 "marca": MARCA_PADRAO,
             }
-            
-            relatorios_dados = [("Índice", indice_data)]
-            
-            # Gerar relatórios para este centro
-            for rel_id in relatorios_ids:
-                rel_label = RELATORIO_LABELS[rel_id]
-                rel_class = RELATORIO_CLASSES[rel_id]
-                relatorio = rel_class(indicadores, f"{display_nome} - {centro}")
-                
-                # Passar centro_custo/empresa para os métodos das classes de relatório
-                if rel_id in {1, 2, 3, 4, 5}:  # Relatórios de FC (aceita centro_custo)
-                    dados = relatorio.gerar_relatorio(mes_atual, mes_anterior, centro)
-                elif rel_id == 6:  # Relatório DRE (aceita empresa)
-                    dados = relatorio.gerar_relatorio(mes_atual, centro)
-                elif rel_id == 7:  # Relatório de indicadores (sem filtro)
-                    dados = relatorio.gerar_relatorio(mes_atual)
-                elif rel_id == 8:  # Notas do consultor (sem filtro)
-                    if analise_text:
-                        relatorio.salvar_analise(mes_atual, analise_text)
-                    dados = relatorio.gerar_relatorio(mes_atual)
-                
-                relatorios_dados.append((rel_label, dados))
-            
+        
             # Nome do arquivo individual
             filename = f"Relatorio_{slugify_filename(display_nome)}_{nome_mes_slug}_{ano}_CC_{slugify_filename(centro)}.pdf"
             output_path = os.path.join("outputs", filename)
-            
-            # Renderizar PDF
+        
+            # Renderizar os relatórios já calculados deste centro
             engine = RenderingEngine()
-            pdf_path = engine.render_to_pdf(relatorios_dados, f"{display_nome} - {centro}", nome_mes, ano, output_path)
-            
+            relatorios_dados = [("Índice", indice_data)] + dados_por_centro.pop(centro)
+            pdf_path = engine.render_stream(relatorios_dados, f"{display_nome} - {centro}", nome_mes, ano, output_path)
+        
             # Ler o PDF em bytes
             with open(pdf_path, 'rb') as pdf_file:
                 pdf_bytes = pdf_file.read()
-            
+        
             # Adicionar ao dicionário
             pdfs_gerados[filename] = pdf_bytes
-            
+        
             # Limpar arquivo temporário
             try:
                 os.remove(pdf_path)
             except:
                 pass
-            
+        
             # Liberar memória
             del relatorios_dados
             del engine
-            del indicadores
-            del db_centro
             gc.collect()
-            
+        
             tempo_pdf = time.time() - inicio_pdf
             logging.info(f"✓ [{idx}/{total_centros}] PDF gerado: {centro} ({len(pdf_bytes):,} bytes) em {tempo_pdf:.1f}s")
-            
+        
             # Verificar se está próximo do timeout (800s = 13min de margem)
             tempo_decorrido = time.time() - inicio_total
             if tempo_decorrido > 800:  # 13 minutos
                 logging.warning(f"⚠️ Timeout iminente ({tempo_decorrido:.0f}s). Parando em {idx}/{total_centros} PDFs.")
                 break
-            
+        
         except Exception as e:
             logging.error(f"✗ [{idx}/{total_centros}] Erro ao gerar PDF para {centro}: {str(e)}")
             import traceback
             logging.error(traceback.format_exc())
             # Continua processando os outros
     
+    cache = indicadores.estatisticas_cache()
+    logging.info(f"🗃️  Cache de indicadores: {cache['hits']} reaproveitados, {cache['misses']} calculados")
+    logar_resumo_consultas(db)
+    salvar_planos_explain(db, f"{display_nome}_{mes}_{ano}_centros")
+    
     if not pdfs_gerados:
         raise HTTPException(
             status_code=500,
@@ -620,7 +745,8 @@ def gerar_multiplos_pdfs(
 # Endpoint principal: gera PDF (POST recomendado)
 # ---------------------------
 @app.post("/v1/relatorios/pdf", dependencies=[Depends(verify_api_key)])
-def gerar_pdf(payload: RelatorioRequest):
+def gerar_pdf(payload: RelatorioRequest,
+              x_explain: Optional[str] = Header(None, description="'1' ativa a captura de EXPLAIN (ANALYZE, BUFFERS) das consultas")):
     logging.info(f"🚀 REQUISIÇÃO RECEBIDA: cliente={payload.id_cliente}, mes={payload.mes}, ano={payload.ano}, relatorios={payload.relatorios}, centro_custo={payload.centro_custo}")
     
     # 1) Período
@@ -640,9 +766,7 @@ def gerar_pdf(payload: RelatorioRequest):
     # Nome exibido sempre derivado do banco (ou fallback para Cliente_<id>)
     logging.info(f"🔍 Buscando informações do cliente no banco...")
     db_tmp = DatabaseConnection()
-    all_cli = buscar_clientes(db_tmp) or []
-    logging.info(f"✅ Encontrados {len(all_cli)} clientes no banco")
-    mapa = {c["id_cliente"]: c["nome"] for c in all_cli}
+    mapa = buscar_nomes_clientes(db_tmp, id_cliente[:1])  # apenas o cliente do nome, não a base inteira
     base = mapa.get(id_cliente[0], f"Cliente_{id_cliente[0]}")
     display_nome = f"{base}_Consolidado" if is_consolidado else base
     logging.info(f"📝 Nome do relatório: {display_nome}")
@@ -653,6 +777,8 @@ def gerar_pdf(payload: RelatorioRequest):
     # 4) Preparar geração
     logging.info(f"🔧 Criando conexão com banco de dados...")
     db = DatabaseConnection()
+    if (x_explain or "").lower() in ("1", "true", "sim"):
+        db.ativar_explain()
     
     # 4.1) NOVO: Verificar se deve filtrar por centro de custo
     if payload.centro_custo:
@@ -682,23 +808,7 @@ def gerar_pdf(payload: RelatorioRequest):
         )
     
     # 4.2) Geração padrão (sem filtro, todos os centros somados)
-    indicadores = Indicadores(id_cliente, db)
-
-    # Validar se o cliente possui dados válidos para o período
-    dados_validos, mensagem_erro = validar_dados_cliente(indicadores, mes_atual)
-    if not dados_validos:
-        raise HTTPException(
-            status_code=422, 
-            detail={
-                "error": "Dados insuficientes",
-                "message": mensagem_erro,
-                "cliente_id": id_cliente,
-                "periodo": f"{mes}/{ano}",
-                "code": "NO_DATA_AVAILABLE"
-            }
-        )
-
-    # Gerar relatório único
+    # Gerar relatório único (a validação dos dados do cliente é feita dentro dele)
     return gerar_relatorio_unico(
         db, id_cliente, display_nome, mes_atual, mes_anterior,
         payload.relatorios, analise_text, None, None, ano, mes
@@ -721,49 +831,9 @@ def buscar_centros_custo_disponiveis(db: DatabaseConnection, id_cliente: List[in
     Returns:
         Lista de strings com os centros de custo/empresas disponíveis
     """
-    from sqlalchemy import text
-    
-    # Buscar centros de custo da tabela FC
-    query_fc = text("""
-        SELECT DISTINCT centro_custo
-        FROM fc 
-        WHERE id_cliente = ANY (:id_cliente)
-          AND EXTRACT(YEAR FROM data) = :year
-          AND EXTRACT(MONTH FROM data) = :month
-          AND centro_custo IS NOT NULL
-          AND TRIM(centro_custo) != ''
-        ORDER BY centro_custo;
-    """)
-    
-    # Buscar empresas da tabela DRE
-    query_dre = text("""
-        SELECT DISTINCT empresa
-        FROM dre 
-        WHERE id_cliente = ANY (:id_cliente)
-          AND EXTRACT(YEAR FROM data) = :year
-          AND EXTRACT(MONTH FROM data) = :month
-          AND empresa IS NOT NULL
-          AND TRIM(empresa) != ''
-        ORDER BY empresa;
-    """)
-    
-    params = {
-        "id_cliente": id_cliente,
-        "year": ano,
-        "month": mes
-    }
-    
     try:
-        result_fc = db.execute_query(query_fc, params)
-        result_dre = db.execute_query(query_dre, params)
-        
-        centros_fc = [row["centro_custo"] for _, row in result_fc.iterrows()] if not result_fc.empty else []
-        empresas_dre = [row["empresa"] for _, row in result_dre.iterrows()] if not result_dre.empty else []
-        
-        # Unir as duas listas e remover duplicatas mantendo a ordem
-        todos = centros_fc + [e for e in empresas_dre if e not in centros_fc]
-        
-        return todos if todos else []
+        # Centros de custo (fc) e empresas (dre) em uma única consulta, com cache curto
+        return buscar_centros_custo(db, id_cliente, ano, mes)
         
     except Exception as e:
         logging.error(f"Erro ao buscar centros de custo: {str(e)}")
@@ -781,36 +851,19 @@ def validar_dados_cliente(indicadores: Indicadores, mes_atual: date) -> tuple[bo
         Tupla (dados_validos: bool, mensagem_erro: str)
     """
     try:
-        # Verificar receitas
-        receitas = indicadores.calcular_receitas_fc(mes_atual, '3.%')
-        receita_total = sum(float(r.get('total_categoria', 0)) for r in receitas) if receitas else 0
-        
-        # Verificar custos variáveis
-        custos = indicadores.calcular_custos_variaveis_fc(mes_atual, '4.%')
-        custos_total = sum(abs(float(c.get('total_categoria', 0))) for c in custos) if custos else 0
-        
-        # Verificar despesas fixas
-        despesas = indicadores.calcular_despesas_fixas_fc(mes_atual)
-        despesas_total = sum(abs(float(d.get('total_categoria', 0))) for d in despesas) if despesas else 0
+        # Uma consulta de existência (EXISTS) por nivel_1, em vez das agregações completas dos relatórios;
+        # custos e despesas filtrados pelos nivel_3_id do plano de contas (cache do processo)
+        dados = indicadores.verificar_dados_fc(mes_atual)
         
         # Validar se há pelo menos alguma movimentação financeira significativa
-        # Considera dados válidos se há receita OU movimentação de custos/despesas
-        has_receita = receita_total > 0
-        has_movimentacao = custos_total > 0 or despesas_total > 0
-        
-        if not has_receita and not has_movimentacao:
+        # Considera dados válidos se há receita OU movimentação de custos variáveis
+        if not dados["receita_positiva"] and not dados["custos_nao_zerados"]:
             # Se não há nenhuma movimentação, verificar se há pelo menos registros na base
-            if not receitas and not custos and not despesas:
+            if not dados["tem_receitas"] and not dados["tem_custos"] and not dados["tem_despesas"]:
                 return False, "Não foram encontrados dados financeiros para este cliente no período especificado."
-            else:
-                return False, "Os dados financeiros do cliente estão zerados para o período especificado."
+            return False, "Os dados financeiros do cliente estão zerados para o período especificado."
         
-        # Se há receita mas não há custos/despesas, pode ser válido (empresa sem custos no período)
-        # Se há custos/despesas mas não receita, pode indicar problema nos dados
-        if has_receita or has_movimentacao:
-            return True, ""
-            
-        return False, "Dados financeiros inconsistentes encontrados para o período."
+        return True, ""
         
     except Exception as e:
         return False, f"Erro ao validar dados do cliente: {str(e)}"
@@ -826,6 +879,7 @@ def gerar_pdf_get(
     ano: Optional[int] = None,
     relatorios: str = Query(..., description="Lista separada por vírgula. Ex: 7,8 ou 'Relatório 7, Relatório 8'"),
     analise_text: Optional[str] = None,
+    x_explain: Optional[str] = Header(None),
 ):
     # Converte os query params em payload Pydantic (validator normaliza relatorios para ints)
     payload = RelatorioRequest(
@@ -835,4 +889,4 @@ def gerar_pdf_get(
         relatorios=[x.strip() for x in relatorios.split(",") if x.strip()],
         analise_text=analise_text
     )
-    return gerar_pdf(payload)
+    return gerar_pdf(payload, x_explain)
@@ -0,0 +1,200 @@
+# src/core/cache.py
+import copy
+import functools
+import inspect
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Tuple, Union, List, Optional
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from config.settings import CACHE_CONFIG
+
+# Marcador de ausência (None é um resultado válido)
+AUSENTE = object()
+
+
+def normalizar_clientes(id_cliente: Union[int, List[int]]) -> Tuple[int, ...]:
+    """Conjunto de clientes em forma canônica (ordem não importa para `= ANY (:id_cliente)`)."""
+    if isinstance(id_cliente, (list, tuple, set)):
+        return tuple(sorted(set(id_cliente)))
+    return (id_cliente,)
+
+
+class CacheGlobal:
+    """Cache de resultados de Indicadores compartilhado entre requisições do processo.
+
+    Mantém até `max_entradas` resultados em memória com expulsão LRU e validade de
+    `ttl_segundos`. Com `caminho_sqlite`, os resultados também são gravados em um
+    arquivo SQLite e sobrevivem a reinícios do processo (e são compartilhados entre
+    workers na mesma máquina). Seguro para uso concorrente.
+    """
+
+    def __init__(self, max_entradas: int = 2000, ttl_segundos: float = 900, caminho_sqlite: Optional[str] = None):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.hits = 0
+        self.misses = 0
+        self._dados: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sqlite: Optional[sqlite3.Connection] = None
+        if caminho_sqlite:
+            self._sqlite = sqlite3.connect(caminho_sqlite, check_same_thread=False)
+            self._sqlite.execute(
+                "CREATE TABLE IF NOT EXISTS cache_indicadores ("
+                "chave TEXT PRIMARY KEY, expira_em REAL, usado_em REAL, valor BLOB)"
+            )
+            self._sqlite.commit()
+
+    def obter(self, chave: Any) -> Any:
+        """Retorna o valor guardado para `chave` ou `AUSENTE`."""
+        agora = time.time()
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is not None and item[0] > agora:
+                self._dados.move_to_end(chave)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._dados[chave]
+            valor = self._obter_sqlite(chave, agora)
+            if valor is AUSENTE:
+                self.misses += 1
+                return AUSENTE
+            self._guardar_memoria(chave, valor, agora)
+            self.hits += 1
+            return valor
+
+    def guardar(self, chave: Any, valor: Any) -> None:
+        """Guarda `valor` para `chave`, expulsando as entradas menos usadas se necessário."""
+        agora = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, valor, agora)
+            if self._sqlite is not None:
+                self._sqlite.execute(
+                    "INSERT OR REPLACE INTO cache_indicadores VALUES (?, ?, ?, ?)",
+                    (repr(chave), agora + self.ttl_segundos, agora, pickle.dumps(valor)),
+                )
+                self._sqlite.execute("DELETE FROM cache_indicadores WHERE expira_em <= ?", (agora,))
+                self._sqlite.execute(
+                    "DELETE FROM cache_indicadores WHERE chave IN ("
+                    "SELECT chave FROM cache_indicadores ORDER BY usado_em DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entradas,),
+                )
+                self._sqlite.commit()
+
+    def limpar(self) -> None:
+        """Remove todas as entradas (memória e SQLite)."""
+        with self._lock:
+            self._dados.clear()
+            if self._sqlite is not None:
+                self._sqlite.execute("DELETE FROM cache_indicadores")
+                self._sqlite.commit()
+
+    def _guardar_memoria(self, chave: Any, valor: Any, agora: float) -> None:
+        self._dados[chave] = (agora + self.ttl_segundos, valor)
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_entradas:
+            self._dados.popitem(last=False)
+
+    def _obter_sqlite(self, chave: Any, agora: float) -> Any:
+        if self._sqlite is None:
+            return AUSENTE
+        linha = self._sqlite.execute(
+            "SELECT valor FROM cache_indicadores WHERE chave = ? AND expira_em > ?", (repr(chave), agora)
+        ).fetchone()
+        if linha is None:
+            return AUSENTE
+        self._sqlite.execute("UPDATE cache_indicadores SET usado_em = ? WHERE chave = ?", (agora, repr(chave)))
+        self._sqlite.commit()
+        return pickle.loads(linha[0])
+
+
+_cache_global: Optional[CacheGlobal] = None
+_cache_global_lock = threading.Lock()
+
+
+def obter_cache_global() -> Optional[CacheGlobal]:
+    """Retorna o cache global do processo (criado na primeira chamada) ou None se desativado em CACHE_CONFIG."""
+    global _cache_global
+    if not CACHE_CONFIG["ativo"]:
+        return None
+    with _cache_global_lock:
+        if _cache_global is None:
+            _cache_global = CacheGlobal(
+                max_entradas=CACHE_CONFIG["max_entradas"],
+                ttl_segundos=CACHE_CONFIG["ttl_segundos"],
+                caminho_sqlite=CACHE_CONFIG["sqlite"],
+            )
+        return _cache_global
+
+
+def memoizar(metodo: Callable) -> Callable:
+    """Memoiza um método `calcular_*` de Indicadores na própria instância.
+
+    A chave é (método, clientes, argumentos com defaults aplicados), de modo que
+    `f(mes, '3.%')` e `f(mes, '3.%', None)` compartilham o mesmo resultado. O valor
+    guardado é uma cópia, para que alterações feitas pelos relatórios no resultado
+    não contaminem chamadas seguintes. Erros não são memoizados.
+
+    Se a instância tiver `cache_global`, a busca segue para o cache do processo, com a
+    versão dos dados do cliente (`versao_dados()`) incluída na chave: qualquer carga nova
+    em fc/dre/indicador (ou nos agregados mensais) e qualquer alteração do plano de contas
+    tornam as entradas antigas inalcançáveis.
+
+    Seguro para chamadas concorrentes na mesma instância (`calcular_em_paralelo`): o
+    acesso a `_cache` e aos contadores é protegido por `_cache_lock`.
+
+    A instância precisa ter `id_cliente`, `_cache`, `_cache_lock`, `cache_hits`,
+    `cache_misses`, `cache_global` e `versao_dados()`.
+    """
+    assinatura = inspect.signature(metodo)
+
+    @functools.wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        argumentos = assinatura.bind(self, *args, **kwargs)
+        argumentos.apply_defaults()
+        chave = (metodo.__name__, normalizar_clientes(self.id_cliente)) + tuple(
+            (nome, valor) for nome, valor in argumentos.arguments.items() if nome != "self"
+        )
+        try:
+            hash(chave)
+        except TypeError:
+            return metodo(self, *args, **kwargs)
+
+        with self._cache_lock:
+            if chave in self._cache:
+                self.cache_hits += 1
+                return copy.deepcopy(self._cache[chave])
+
+        chave_global = None
+        if self.cache_global is not None:
+            versao = self.versao_dados()  # pode desativar o cache global se a sonda falhar
+            if self.cache_global is not None:
+                chave_global = chave + (versao,)
+                resultado = self.cache_global.obter(chave_global)
+                if resultado is not AUSENTE:
+                    with self._cache_lock:
+                        self.cache_hits += 1
+                        self._cache[chave] = resultado
+                    return copy.deepcopy(resultado)
+
+        with self._cache_lock:
+            self.cache_misses += 1
+        resultado = metodo(self, *args, **kwargs)
+        guardado = copy.deepcopy(resultado)
+        with self._cache_lock:
+            self._cache[chave] = guardado
+        if chave_global is not None:
+            self.cache_global.guardar(chave_global, guardado)
+        return resultado
+
+    return wrapper
@@ -0,0 +1,143 @@
+# src/core/formulas_dre.py
+"""
+Fórmulas dos indicadores do DRE (Relatório 6), em forma declarativa.
+
+Cada fórmula é uma soma de termos, onde um termo é uma categoria do `dre` ou uma
+fórmula definida antes. A tabela é compilada uma vez em índices sobre uma matriz
+cuja última dimensão são as categorias, de modo que qualquer quantidade de
+empresas e meses é avaliada em uma única passada NumPy.
+
+As somas são feitas elemento a elemento, na mesma ordem (da esquerda para a direita)
+do cálculo escalar original, para que os valores em ponto flutuante sejam idênticos.
+"""
+
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+
+# (fórmula, termos): termos são categorias do dre ou fórmulas anteriores
+FORMULAS_DRE: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("faturamento", ("Receita de Vendas de Produtos", "Receita de Prestação de Serviços")),
+    ("deducoes_receita_bruta", (
+        "Descontos Incondicionais", "ICMS", "PIS", "COFINS", "ISS",
+        "Outros Tributos de Deduções de Vendas", "Devoluções de Vendas",
+    )),
+    ("custos_variaveis", ("Custos com Produtos e Serviços", "Custos Comerciais")),
+    ("despesas_fixas", (
+        "Despesas Administrativas", "Despesas com Pessoal", "Despesas com Serviços de Terceiros",
+        "Despesas com Materiais e Equipamentos", "Despesas de Marketing",
+        "Despesas com Desenvolvimento Empresarial",
+    )),
+    ("custos_variaveis_deducoes", ("custos_variaveis", "deducoes_receita_bruta")),
+    ("receitas_financeiras", ("Receitas Financeiras", "Rendimentos de Aplicações")),
+    ("despesas_financeiras", ("Despesas Financeiras", "Juros Bancários")),
+    ("impostos", ("IRPJ", "CSLL", "Simples Nacional")),
+    ("lucro_operacional", (
+        "faturamento", "deducoes_receita_bruta", "custos_variaveis", "despesas_fixas",
+        "receitas_financeiras", "despesas_financeiras", "impostos",
+    )),
+    ("investimentos", ("Investimentos em Bens Materiais", "Investimento em Imobilizado", "Investimento de Intangíveis")),
+    ("entradas_nao_operacionais", (
+        "Empréstimos bancários", "Venda de Imobilizados", "Devolução de Pagamentos",
+        "Outras entradas não operacionais",
+    )),
+    ("saidas_nao_operacionais", (
+        "Perdas Jurídicas", "Aplicações Financeiras", "Pagamento de Empréstimos", "Dívidas Passadas",
+        "Outras saídas não operacionais",
+    )),
+    ("lucro_liquido", (
+        "faturamento", "deducoes_receita_bruta", "custos_variaveis", "despesas_fixas",
+        "receitas_financeiras", "despesas_financeiras", "impostos", "investimentos",
+        "entradas_nao_operacionais", "saidas_nao_operacionais",
+        "Capitalização dos sócios",  # Aporte
+        "Distribuição de Lucros",
+    )),
+    ("ebitda", ("faturamento", "deducoes_receita_bruta", "custos_variaveis", "despesas_fixas")),
+)
+
+# (indicador exibido, fórmula ou categoria), na ordem do relatório
+INDICADORES_DRE: Tuple[Tuple[str, str], ...] = (
+    ("Faturamento", "faturamento"),
+    ("Deduções da Receita Bruta", "deducoes_receita_bruta"),
+    ("Custos Variáveis", "custos_variaveis"),
+    ("Despesas Fixas", "despesas_fixas"),
+    ("EBITDA", "ebitda"),
+    ("Custos Variáveis + Deduções da Receita", "custos_variaveis_deducoes"),
+    ("Custos com Produtos e Serviços", "Custos com Produtos e Serviços"),
+    ("Lucro Operacional", "lucro_operacional"),
+    ("Lucro Líquido", "lucro_liquido"),
+)
+
+
+class MotorDRE:
+    """Tabela de fórmulas do DRE compilada em índices de colunas.
+
+    Args:
+        formulas: Tuplas (fórmula, termos); um termo que não é fórmula anterior é uma categoria.
+        indicadores: Tuplas (nome exibido, fórmula ou categoria).
+        base_av: Fórmula usada como denominador da análise vertical.
+    """
+
+    def __init__(self, formulas: Sequence[Tuple[str, Sequence[str]]],
+                 indicadores: Sequence[Tuple[str, str]], base_av: str = "faturamento"):
+        nomes_formulas = {nome for nome, _ in formulas}
+        self.categorias: List[str] = []
+        for _, termos in formulas:
+            for termo in termos:
+                if termo not in nomes_formulas and termo not in self.categorias:
+                    self.categorias.append(termo)
+        for _, origem in indicadores:
+            if origem not in nomes_formulas and origem not in self.categorias:
+                self.categorias.append(origem)
+
+        # Colunas: categorias seguidas das fórmulas, na ordem de definição
+        posicoes = {categoria: i for i, categoria in enumerate(self.categorias)}
+        self._formulas: List[Tuple[int, ...]] = []
+        for nome, termos in formulas:
+            faltantes = [t for t in termos if t not in posicoes]
+            if faltantes:
+                raise ValueError(f"Fórmula '{nome}' usa termos não definidos: {faltantes}")
+            self._formulas.append(tuple(posicoes[t] for t in termos))
+            posicoes[nome] = len(posicoes)
+        self.indicadores: List[str] = [nome for nome, _ in indicadores]
+        self._saida: List[int] = [posicoes[origem] for _, origem in indicadores]
+        self._base_av: int = self.indicadores.index(
+            next(nome for nome, origem in indicadores if origem == base_av)
+        )
+
+    def matriz(self, dados: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """Monta a matriz (linhas × categorias) a partir de dicionários {categoria: valor}; ausentes valem 0."""
+        return np.array(
+            [[registro.get(categoria, 0.0) for categoria in self.categorias] for registro in dados],
+            dtype=float,
+        ).reshape(len(dados), len(self.categorias))
+
+    def avaliar(self, valores: np.ndarray) -> np.ndarray:
+        """Avalia as fórmulas sobre `valores` (..., categorias) e retorna (..., indicadores)."""
+        colunas = [valores[..., i] for i in range(len(self.categorias))]
+        for termos in self._formulas:
+            total = colunas[termos[0]]
+            for termo in termos[1:]:
+                total = total + colunas[termo]
+            colunas.append(total)
+        return np.stack([colunas[i] for i in self._saida], axis=-1)
+
+    def registros(self, linha: np.ndarray) -> List[Dict[str, Any]]:
+        """Converte uma linha avaliada em registros com 'indicador', 'valor' e 'av_dre'."""
+        base = float(linha[self._base_av])
+        registros = []
+        for nome, valor in zip(self.indicadores, linha):
+            valor = round(float(valor), 2)
+            av_dre = (valor / base) * 100 if base != 0 else 0.0
+            registros.append({
+                "indicador": nome,
+                "valor": valor,
+                "av_dre": round(av_dre, 1),  # Arredondar para 1 casa decimal, conforme o Figma
+            })
+        return registros
+
+    def calcular(self, dados: Mapping[str, Any]) -> List[Dict[str, Any]]:
+        """Indicadores de um único conjunto {categoria: valor}."""
+        return self.registros(self.avaliar(self.matriz([dados]))[0])
+
+
+MOTOR_DRE = MotorDRE(FORMULAS_DRE, INDICADORES_DRE)
@@ -1,24 +1,390 @@
 # src/core/indicadores.py
 from datetime import date
-from typing import Union, List, Dict, Any, Optional
+from typing import Union, List, Dict, Any, Optional, Callable, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import text
-import pandas as pd
+from dateutil.relativedelta import relativedelta
 import sys
 import os
+import threading
 
 # Garantir que o diretório raiz está no Python path
 root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
-from src.database.db_utils import DatabaseConnection
+from src.database.db_utils import DatabaseConnection, obter_versao_dados
+from src.database.filtros_sql import periodo_mes, filtro_periodo, filtro_centro_custo, filtro_empresa, filtro_nivel_1
+from src.core.snapshot_fc import SnapshotFC, analise_por_nivel_2, analise_investimentos
+from src.core.plano_de_contas import obter_cache_plano, somar_por_nivel_2
+from src.core.cache import memoizar, obter_cache_global, normalizar_clientes, CacheGlobal
+from src.core.utils import nulos_como_nan, safe_float, analise_janela_movel
+from src.core.formulas_dre import MOTOR_DRE
+from config.settings import AGREGADOS_CONFIG
+
+# Categorias dos totais do fc, na ordem de exibição: (categoria, nivel_1, sinal)
+CATEGORIAS_LUCRO_BRUTO = (
+    ('Receita', '3. Receitas', 1),
+    ('Custos Variáveis', '4. Custos Variáveis', -1),
+)
+CATEGORIAS_LUCRO_OPERACIONAL = CATEGORIAS_LUCRO_BRUTO + (
+    ('Despesas Fixas', '5. Despesas Fixas', -1),
+)
+CATEGORIAS_LUCRO_LIQUIDO = CATEGORIAS_LUCRO_OPERACIONAL + (
+    ('Investimentos', '6. Investimentos', -1),
+)
+CATEGORIAS_GERACAO_DE_CAIXA = CATEGORIAS_LUCRO_LIQUIDO + (
+    ('Entradas Não Operacionais', '7.1 Entradas Não Operacionais', 1),
+    ('Saídas Não Operacionais', '7.2 Saídas Não Operacionais', -1),
+)
 
 class Indicadores:
     def __init__(self, id_cliente: Union[int, List[int]], db_connection: DatabaseConnection):
         self.id_cliente = id_cliente
         self.db = db_connection
+        # Tabelas de origem: fc/dre brutos ou os agregados mensais (src/database/agregados_mensais.py)
+        self.tabela_fc = "fc_mensal" if AGREGADOS_CONFIG["ativo"] else "fc"
+        self.tabela_dre = "dre_mensal" if AGREGADOS_CONFIG["ativo"] else "dre"
+        self.snapshot: Optional[SnapshotFC] = None
+        # Modo lote do DRE: mês -> empresa (None = consolidado) -> {categoria: valor}
+        self._dre_por_empresa: Dict[date, Dict[Optional[str], Dict[str, Any]]] = {}
+        # Memoização por instância (uma instância por requisição de PDF)
+        self._cache: Dict[tuple, Any] = {}
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Cache entre requisições, validado pela versão dos dados do cliente
+        self.cache_global: Optional[CacheGlobal] = obter_cache_global()
+        self._versao_dados: Optional[tuple] = None
+        # Plano de contas (nivel_3_id -> nivel_2) e a sua versão, consultados uma vez por instância
+        self._plano: Optional[Dict[Tuple[int, str], List[Optional[str]]]] = None
+        self._versoes_plano: Optional[Dict[int, tuple]] = None
+
+    def calcular_em_paralelo(self, tarefas: List[Tuple[Callable, tuple]], max_paralelo: Optional[int] = None) -> int:
+        """Executa tarefas independentes (ex.: métodos `calcular_*`) em paralelo, limitado ao pool de conexões.
+
+        Os resultados ficam na memoização da instância, de modo que as chamadas seguintes
+        dos relatórios não voltam ao banco. Erros não interrompem as demais tarefas nem são
+        memoizados: a chamada do relatório repete a consulta e trata o erro como antes.
+
+        Dentro de `db.session()`, as tarefas simultâneas rodam na conexão fixada e em
+        conexões auxiliares com o mesmo retrato exportado; se o retrato não puder ser
+        exportado, `limite_conexoes()` retorna 1 e as tarefas rodam uma de cada vez.
+
+        Args:
+            tarefas: Lista de (função, argumentos).
+            max_paralelo: Máximo de tarefas simultâneas (padrão: tamanho do pool do banco).
+
+        Returns:
+            Quantidade de tarefas que falharam.
+        """
+        if not tarefas:
+            return 0
+        limite = max(1, min(max_paralelo or self.db.limite_conexoes(), len(tarefas)))
+        with ThreadPoolExecutor(max_workers=limite) as executor:
+            futuros = [executor.submit(funcao, *args) for funcao, args in tarefas]
+            return sum(1 for futuro in futuros if futuro.exception() is not None)
+
+    def estatisticas_cache(self) -> Dict[str, int]:
+        """Retorna os contadores da memoização: acertos, consultas executadas e entradas guardadas."""
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "entradas": len(self._cache)}
+
+    def limpar_cache(self) -> None:
+        """Descarta os resultados memoizados (ex.: após alterar dados no meio da requisição)."""
+        self._cache.clear()
+        self._dre_por_empresa.clear()
+        self._versao_dados = None
+        self._plano = None
+        self._versoes_plano = None
+
+    def versao_dados(self) -> tuple:
+        """Versão dos dados do cliente (fc, dre, indicador e plano de contas), consultada uma vez por instância.
+
+        A versão do plano é a mesma sonda usada pelo cache do plano de contas (`_versao_plano`).
+        Se a sonda falhar, o cache entre requisições é desativado para esta instância.
+        """
+        if self._versao_dados is None:
+            try:
+                self._versao_dados = obter_versao_dados(
+                    self.db, normalizar_clientes(self.id_cliente), agregados=AGREGADOS_CONFIG["ativo"]
+                ) + (("plano_de_contas", tuple(sorted(self._versao_plano().items()))),)
+            except Exception:
+                self.cache_global = None
+                self._versao_dados = ()
+        return self._versao_dados
+
+    def carregar_snapshot(self, inicio: date, fim: date) -> SnapshotFC:
+        """Ativa o modo snapshot: carrega o fc pré-agregado dos meses de `inicio` a `fim` em uma única consulta.
+
+        Enquanto ativo, os métodos `calcular_*_fc` cujos meses estejam dentro da janela são
+        respondidos em memória (mesma saída das consultas SQL); fora dela, consultam o banco.
+
+        Args:
+            inicio: Primeiro mês da janela.
+            fim: Último mês da janela (inclusive).
+
+        Returns:
+            O snapshot carregado.
+        """
+        self.snapshot = SnapshotFC.carregar(self.db, self.id_cliente, inicio, fim, self.tabela_fc, self._mapa_plano())
+        return self.snapshot
+
+    def _snapshot_cobre(self, *meses: Optional[date]) -> bool:
+        """Indica se o snapshot ativo cobre os meses (e os respectivos meses anteriores) de um cálculo."""
+        if self.snapshot is None:
+            return False
+        anteriores = [m - relativedelta(months=1) for m in meses if m is not None]
+        return self.snapshot.cobre(*meses, *anteriores)
+
+    def _consultar(self, query, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Executa a consulta direto no cursor (sem DataFrame) e retorna os registros como dicionários.
+
+        Colunas numéricas seguem a conversão de nulos do `read_sql_query` (ver `nulos_como_nan`),
+        mantendo idêntica a saída dos métodos.
+        """
+        registros = [linha._asdict() for linha in self.db.fetch_rows(query, params, preparada=True)]
+        numericas = [c for c in (registros[0] if registros else {}) if any(isinstance(r[c], float) for r in registros)]
+        return nulos_como_nan(registros, numericas)
+
+    def _somas_por_nivel_2(self, nivel_1: str, mes: date, mes_base: date,
+                           centro_custo: Optional[str]) -> Tuple[Dict[Any, Any], Dict[Any, Any], Any]:
+        """Somas por nivel_2 de um nivel_1 no mês e no mês base do AH, mais a receita do mês.
+
+        O fc é agregado por nivel_3_id no banco (sem JOIN) e mapeado para nivel_2 em memória
+        pelo cache do plano de contas. Valores chegam como Decimal, para que AV/AH sejam
+        idênticos aos calculados pelo banco.
+
+        Returns:
+            Tupla (somas do mês, somas do mês base, receita do mês).
+        """
+        query = text(f"""
+            SELECT 'atual' AS periodo, id_cliente, text(nivel_3_id) AS nivel_3_id, SUM(valor) AS valor
+            FROM {self.tabela_fc}
+            WHERE id_cliente = ANY (:id_cliente)
+              AND visao = 'Realizado'
+              AND nivel_1 = '{nivel_1}'
+              AND {filtro_periodo()}
+              {filtro_centro_custo(centro_custo)}
+            GROUP BY id_cliente, nivel_3_id
+            UNION ALL
+            SELECT 'anterior', id_cliente, text(nivel_3_id), SUM(valor)
+            FROM {self.tabela_fc}
+            WHERE id_cliente = ANY (:id_cliente)
+              AND visao = 'Realizado'
+              AND nivel_1 = '{nivel_1}'
+              AND {filtro_periodo('data', 'prev_')}
+              {filtro_centro_custo(centro_custo)}
+            GROUP BY id_cliente, nivel_3_id
+            UNION ALL
+            SELECT 'receita', NULL, NULL, SUM(valor)
+            FROM {self.tabela_fc}
+            WHERE id_cliente = ANY (:id_cliente)
+              AND visao = 'Realizado'
+              AND {filtro_periodo()}
+              AND nivel_1 = '3. Receitas'
+              {filtro_centro_custo(centro_custo)};
+        """)
+        params = {
+            "id_cliente": self.id_cliente,
+            **periodo_mes(mes),
+            **periodo_mes(mes_base, "prev_"),
+            "centro_custo": centro_custo if centro_custo else ""
+        }
+        linhas = self.db.fetch_rows(query, params, numeric_como_float=False, preparada=True)
+        mapa = self._mapa_plano()
+        atual = somar_por_nivel_2(((l.id_cliente, l.nivel_3_id, l.valor) for l in linhas if l.periodo == 'atual'), mapa)
+        anterior = somar_por_nivel_2(((l.id_cliente, l.nivel_3_id, l.valor) for l in linhas if l.periodo == 'anterior'), mapa)
+        receita = next((l.valor for l in linhas if l.periodo == 'receita'), None)
+        return atual, anterior, receita
+
+    def _versao_plano(self) -> Dict[int, tuple]:
+        """Versão do plano de contas de cada cliente (contagem e hash), consultada uma vez por instância."""
+        if self._versoes_plano is None:
+            self._versoes_plano = obter_cache_plano().versoes(self.db, normalizar_clientes(self.id_cliente))
+        return self._versoes_plano
+
+    def _mapa_plano(self) -> Dict[Tuple[int, str], List[Optional[str]]]:
+        """Mapeamento nivel_3_id -> nivel_2 dos clientes, obtido do cache do processo uma vez por instância."""
+        if self._plano is None:
+            self._plano = obter_cache_plano().mapa(self.db, normalizar_clientes(self.id_cliente), self._versao_plano())
+        return self._plano
+
+    def _totais_fc(self, categorias: tuple, mes: date, mes_base: date, centro_custo: Optional[str],
+                   com_lucro_liquido: bool = False) -> List[Dict[str, Any]]:
+        """Totais por categoria no mês, com AV e AH contra o mês base, em uma única varredura do fc.
+
+        Cada par (categoria, período) vira uma coluna `SUM(valor) FILTER (WHERE ...)`, compilada
+        a partir de `categorias`; AV e AH continuam calculados pelo banco, com a mesma aritmética
+        das consultas por categoria. Com `com_lucro_liquido`, Receita, Custos Variáveis, Despesas
+        Fixas e Investimentos são substituídos pela linha 'Lucro Líquido' (regras da Geração de Caixa).
+
+        Args:
+            categorias: Tuplas (categoria, nivel_1, sinal) na ordem de exibição.
+            mes: Mês calculado.
+            mes_base: Mês de comparação do AH.
+            centro_custo: Filtro opcional por centro de custo.
+            com_lucro_liquido: Se True, monta as linhas da Geração de Caixa.
+
+        Returns:
+            Registros com 'categoria', 'valor', 'av' e 'ah'.
+        """
+        colunas = []
+        valores = []
+        for ordem, (nome, nivel_1, sinal) in enumerate(categorias, 1):
+            for periodo, prefixo in (("atual", ""), ("anterior", "prev_")):
+                colunas.append(
+                    f"SUM(valor) FILTER (WHERE nivel_1 = '{nivel_1}' AND {filtro_periodo('data', prefixo)}) AS s{ordem}_{periodo}"
+                )
+            fator = "" if sinal > 0 else " * -1"
+            valores.append(f"('{nome}', {ordem}, s{ordem}_atual{fator}, s{ordem}_anterior{fator})")
+        niveis = ", ".join(f"'{nivel_1}'" for _, nivel_1, _ in categorias)
+        if com_lucro_liquido:
+            linhas_cte = """
+              linhas AS (
+                SELECT
+                  'Lucro Líquido' AS categoria,
+                  0 AS ordem,
+                  SUM(CASE
+                        WHEN categoria IN ('Receita') THEN valor
+                        WHEN categoria IN ('Custos Variáveis', 'Despesas Fixas', 'Investimentos') THEN -valor
+                        ELSE 0
+                      END) AS valor,
+                  SUM(CASE
+                        WHEN categoria IN ('Receita') THEN prev_valor
+                        WHEN categoria IN ('Custos Variáveis', 'Despesas Fixas', 'Investimentos') THEN -prev_valor
+                        ELSE 0
+                      END) AS prev_valor
+                FROM totais
+                WHERE categoria IN ('Receita', 'Custos Variáveis', 'Despesas Fixas', 'Investimentos')
+                UNION ALL
+                SELECT categoria, ordem, valor, prev_valor
+                FROM totais
+                WHERE categoria IN ('Entradas Não Operacionais', 'Saídas Não Operacionais')
+              ),"""
+        else:
+            linhas_cte = """
+              linhas AS (
+                SELECT categoria, ordem, valor, prev_valor FROM totais
+              ),"""
+        separador = ",\n                  "
+        query = text(f"""
+            WITH
+              somas AS (
+                SELECT
+                  {separador.join(colunas)}
+                FROM {self.tabela_fc}
+                WHERE id_cliente = ANY (:id_cliente)
+                  AND visao = 'Realizado'
+                  AND (({filtro_periodo()}) OR ({filtro_periodo('data', 'prev_')}))
+                  AND nivel_1 IN ({niveis})
+                  {filtro_centro_custo(centro_custo)}
+              ),
+              totais (categoria, ordem, valor, prev_valor) AS (
+                SELECT t.*
+                FROM somas
+                CROSS JOIN LATERAL (VALUES {", ".join(valores)}) AS t
+              ),{linhas_cte}
+              receita_total AS (
+                SELECT valor AS total
+                FROM totais
+                WHERE categoria = 'Receita'
+              )
+            SELECT
+              l.categoria,
+              l.valor,
+              CASE
+                WHEN rt.total = 0 THEN NULL
+                ELSE l.valor / rt.total * 100
+              END AS av,
+              CASE
+                WHEN l.prev_valor IS NULL OR l.prev_valor = 0 THEN NULL
+                WHEN l.categoria = 'Lucro Líquido' AND l.prev_valor < 0 AND l.valor > 0 THEN
+                  ((l.valor - l.prev_valor) / ABS(l.prev_valor)) * 100  -- Ajuste para quando o anterior é negativo
+                ELSE
+                  (l.valor / l.prev_valor - 1) * 100
+              END AS ah
+            FROM linhas l
+            CROSS JOIN receita_total rt
+            ORDER BY l.ordem;
+        """)
+        params = {
+            "id_cliente": self.id_cliente,
+            **periodo_mes(mes),
+            **periodo_mes(mes_base, "prev_"),
+            "centro_custo": centro_custo if centro_custo else ""
+        }
+        return self._consultar(query, params)
+
+# Validação
+    @memoizar
+    def verificar_dados_fc(self, mes: date, centro_custo: Optional[str] = None) -> Dict[str, bool]:
+        """Indica se há lançamentos de receitas, custos variáveis e despesas fixas no mês, e se não estão zerados.
+
+        Uma única consulta com EXISTS (o banco para na primeira linha encontrada pelo índice);
+        custos variáveis e despesas fixas só contam os nivel_3_id do plano de contas, passados
+        como lista (o mapeamento do cache do plano, sem JOIN). `custos_nao_zerados` indica algum
+        lançamento ≠ 0 (não soma por nivel_2). Com o snapshot ativo cobrindo o mês, a resposta
+        sai dos totais já carregados em memória.
+
+        Args:
+            mes: Data do mês a ser verificado.
+            centro_custo: Filtro opcional por centro de custo.
+
+        Returns:
+            Dicionário com 'tem_receitas', 'tem_custos', 'tem_despesas' (há linhas no mês),
+            'receita_positiva' (soma das receitas > 0) e 'custos_nao_zerados' (algum lançamento ≠ 0).
+
+        Raises:
+            ValueError: Se os parâmetros forem inválidos.
+            RuntimeError: Se houver erro na execução da consulta.
+        """
+        if not isinstance(mes, date):
+            raise ValueError("O parâmetro 'mes' deve ser um objeto date.")
+        if self._snapshot_cobre(mes):
+            receitas = self.snapshot.calcular_receitas_fc(mes, centro_custo)
+            custos = self.snapshot.calcular_custos_variaveis_fc(mes, centro_custo)
+            despesas = self.snapshot.calcular_despesas_fixas_fc(mes, centro_custo)
+            return {
+                "tem_receitas": bool(receitas),
+                "receita_positiva": sum(float(r["total_categoria"]) for r in receitas) > 0,
+                "tem_custos": bool(custos),
+                "custos_nao_zerados": any(abs(float(c["total_categoria"])) > 0 for c in custos),
+                "tem_despesas": bool(despesas),
+            }
+
+        def lancamentos(nivel_1: str, plano: bool = False) -> str:
+            # Com o plano, só nivel_3_id mapeados para algum nivel_2 contam, como no JOIN interno
+            no_plano = "AND id_cliente || '|' || text(nivel_3_id) = ANY (:plano)" if plano else ""
+            return f"""
+                FROM {self.tabela_fc}
+                WHERE id_cliente = ANY (:id_cliente)
+                  AND visao = 'Realizado'
+                  AND nivel_1 = '{nivel_1}'
+                  AND {filtro_periodo()}
+                  {filtro_centro_custo(centro_custo)}
+                  {no_plano}"""
+
+        query = text(f"""
+            SELECT
+              EXISTS (SELECT 1 {lancamentos('3. Receitas')}) AS tem_receitas,
+              COALESCE((SELECT SUM(valor) {lancamentos('3. Receitas')}), 0) > 0 AS receita_positiva,
+              EXISTS (SELECT 1 {lancamentos('4. Custos Variáveis', plano=True)}) AS tem_custos,
+              EXISTS (SELECT 1 {lancamentos('4. Custos Variáveis', plano=True)} AND valor <> 0) AS custos_nao_zerados,
+              EXISTS (SELECT 1 {lancamentos('5. Despesas Fixas', plano=True)}) AS tem_despesas;
+        """)
+        try:
+            params = {
+                "id_cliente": self.id_cliente,
+                **periodo_mes(mes),
+                "centro_custo": centro_custo if centro_custo else "",
+                "plano": [f"{id_cliente}|{nivel_3_id}" for id_cliente, nivel_3_id in self._mapa_plano()],
+            }
+            return dict(self.db.fetch_rows(query, params, preparada=True)[0]._asdict())
+        except Exception as e:
+            raise RuntimeError(f"Erro ao verificar dados do cliente: {str(e)}")
 
 # Relatório 1 (no relatorio esta inverso, receitas primeiro depois custos variaveis)
+    @memoizar
     def calcular_custos_variaveis_fc(self, mes: date, categoria_nivel_3: str, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula os 5 maiores totais de custos variáveis por nivel_2 em um mês.
 
@@ -38,87 +404,18 @@ class Indicadores:
             raise ValueError("O parâmetro 'mes' deve ser um objeto date.")
         if not isinstance(categoria_nivel_3, str):
             raise ValueError("O parâmetro 'categoria_nivel_3' deve ser uma string.")
-
-        query = text("""
-            WITH 
-                receita AS (
-                    SELECT SUM(valor) AS total_receita
-                    FROM fc
-                    WHERE id_cliente = ANY (:id_cliente)
-                      AND visao = 'Realizado'
-                      AND EXTRACT(YEAR FROM data) = :year
-                      AND EXTRACT(MONTH FROM data) = :month
-                      AND nivel_1 = '3. Receitas'
-                      AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)  -- NOVO FILTRO
-                ),
-                prev_custos AS (
-                    SELECT 
-                        p.nivel_2 AS categoria,
-                        SUM(f.valor) AS prev_valor
-                    FROM fc f
-                    JOIN plano_de_contas p
-                        ON f.id_cliente = p.id_cliente
-                        AND text(f.nivel_3_id) = p.nivel_3_id
-                    WHERE f.id_cliente = ANY (:id_cliente)
-                      AND f.visao = 'Realizado'
-                      AND f.nivel_1 = '4. Custos Variáveis'
-                      AND f.data < DATE_TRUNC('month', MAKE_DATE(:year, :month, 1))
-                      AND f.data >= DATE_TRUNC('month', MAKE_DATE(:year, :month, 1) - INTERVAL '1 month')
-                      AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-                    GROUP BY p.nivel_2
-                )
-            SELECT 
-                p.nivel_2 AS nivel_2,
-                SUM(f.valor) AS total_categoria,
-                CASE 
-                    WHEN r.total_receita = 0 THEN NULL 
-                    ELSE SUM(f.valor) / r.total_receita * 100
-                END AS av,
-                CASE 
-                    WHEN prev.prev_valor IS NULL OR prev.prev_valor = 0 THEN NULL 
-                    ELSE (SUM(f.valor) / prev.prev_valor - 1) * 100
-                END AS ah
-            FROM fc f
-            JOIN plano_de_contas p
-                ON f.id_cliente = p.id_cliente
-                AND text(f.nivel_3_id) = p.nivel_3_id
-            CROSS JOIN receita r
-            LEFT JOIN prev_custos prev 
-                ON prev.categoria = p.nivel_2
-            WHERE f.id_cliente = ANY (:id_cliente)
-                AND f.visao = 'Realizado'
-                AND f.nivel_1 = '4. Custos Variáveis'
-                AND EXTRACT(YEAR FROM f.data) = :year
-                AND EXTRACT(MONTH FROM f.data) = :month
-                AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-            GROUP BY p.nivel_2, r.total_receita, prev.prev_valor
-            ORDER BY total_categoria ASC;
-            
-        """)
-
-        params = {
-            "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
-            "centro_custo": centro_custo if centro_custo else ""
-        }
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_custos_variaveis_fc(mes, centro_custo)
 
         try:
-            resultado = self.db.execute_query(query, params)
-            return [
-                {
-                    "nivel_2": row["nivel_2"] or "Desconhecido",
-                    "total_categoria": float(row["total_categoria"]) if row["total_categoria"] is not None else 0,
-                    "av": float(row["av"]) if row["av"] is not None else 0,
-                    "ah": float(row["ah"]) if row["ah"] is not None else 0
-                }
-                for _, row in resultado.iterrows()
-            ] if not resultado.empty else []
+            atual, anterior, receita = self._somas_por_nivel_2(
+                '4. Custos Variáveis', mes, mes - relativedelta(months=1), centro_custo
+            )
+            return analise_por_nivel_2(atual, anterior, receita, "nivel_2", "total_categoria")
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular custos variáveis: {str(e)}")
 
+    @memoizar
     def calcular_receitas_fc(self, mes: date, categoria_nivel_3: str, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula os 5 maiores totais de receitas por categoria_nivel_3 em um mês.
 
@@ -138,30 +435,30 @@ class Indicadores:
             raise ValueError("O parâmetro 'mes' deve ser um objeto date.")
         if not isinstance(categoria_nivel_3, str):
             raise ValueError("O parâmetro 'categoria_nivel_3' deve ser uma string.")
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_receitas_fc(mes, centro_custo)
 
-        query = text("""
+        query = text(f"""
             WITH 
               receita_atual AS (
                 SELECT SUM(valor) AS total
-                FROM fc
+                FROM {self.tabela_fc}
                 WHERE id_cliente = ANY (:id_cliente)
                   AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
+                  AND {filtro_periodo()}
                   AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                  {filtro_centro_custo(centro_custo)}
               ),
               receita_anterior AS (
                 SELECT 
                   categoria_nivel_3,
                   SUM(valor) AS total_prev
-                FROM fc
+                FROM {self.tabela_fc}
                 WHERE id_cliente = ANY (:id_cliente)
                   AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
+                  AND {filtro_periodo('data', 'prev_')}
                   AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                  {filtro_centro_custo(centro_custo)}
                 GROUP BY categoria_nivel_3
               )
             SELECT
@@ -175,31 +472,28 @@ class Indicadores:
                 WHEN rp.total_prev IS NULL OR rp.total_prev = 0 THEN NULL
                 ELSE (SUM(f.valor) / rp.total_prev - 1) * 100
               END AS ah
-            FROM fc f
+            FROM {self.tabela_fc} f
             CROSS JOIN receita_atual ra
             LEFT JOIN receita_anterior rp 
               ON rp.categoria_nivel_3 = f.categoria_nivel_3
             WHERE f.id_cliente = ANY (:id_cliente)
               AND f.visao = 'Realizado'
-              AND EXTRACT(YEAR FROM f.data) = :year
-              AND EXTRACT(MONTH FROM f.data) = :month
+              AND {filtro_periodo('f.data')}
               AND f.nivel_1 = '3. Receitas'
-              AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
+              {filtro_centro_custo(centro_custo, 'f.centro_custo')}
             GROUP BY f.categoria_nivel_3, ra.total, rp.total_prev
             ORDER BY total_categoria DESC;
         """)
 
         params = {
             "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
+            **periodo_mes(mes),
+            **periodo_mes(mes - relativedelta(months=1), "prev_"),
             "centro_custo": centro_custo if centro_custo else ""
         }
 
         try:
-            resultado = self.db.execute_query(query, params)
+            resultado = self._consultar(query, params)
             return [
                 {
                     "categoria_nivel_3": row["categoria_nivel_3"],
@@ -207,12 +501,13 @@ class Indicadores:
                     "av": float(row["av"]) if row["av"] is not None else 0,
                     "ah": float(row["ah"]) if row["ah"] is not None else 0
                 }
-                for _, row in resultado.iterrows()
-            ] if not resultado.empty else []
+                for row in resultado
+            ] if resultado else []
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular receitas: {str(e)}")
             
 # Relatorio 2
+    @memoizar
     def calcular_lucro_bruto_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula as categorias de Lucro Bruto (Receitas e Custos Variáveis) do fluxo de caixa (fc) com AV e AH.
 
@@ -223,82 +518,10 @@ class Indicadores:
         Returns:
             Lista de dicionários com 'categoria', 'valor', 'av' (análise vertical), e 'ah' (análise horizontal).
         """
-        query = text("""
-            WITH
-              totais_atual AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              totais_anterior AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS prev_valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              receita_total AS (
-                SELECT valor AS total
-                FROM totais_atual
-                WHERE categoria = 'Receita'
-              )
-            SELECT
-              a.categoria,
-              a.valor,
-              CASE
-                WHEN rt.total = 0 THEN NULL
-                ELSE a.valor / rt.total * 100
-              END AS av,
-              CASE
-                WHEN p.prev_valor IS NULL OR p.prev_valor = 0 THEN NULL
-                ELSE (a.valor / p.prev_valor - 1) * 100
-              END AS ah
-            FROM totais_atual a
-            CROSS JOIN receita_total rt
-            LEFT JOIN totais_anterior p
-              ON p.categoria = a.categoria
-            ORDER BY 
-              CASE a.categoria
-                WHEN 'Receita' THEN 1
-                WHEN 'Custos Variáveis' THEN 2
-              END;
-        """)
-        params = {
-            "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
-            "centro_custo": centro_custo if centro_custo else ""
-        }
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_lucro_bruto_fc(mes, centro_custo)
         try:
-            result = self.db.execute_query(query, params)
+            result = self._totais_fc(CATEGORIAS_LUCRO_BRUTO, mes, mes - relativedelta(months=1), centro_custo)
             return [
                 {
                     "categoria": row["categoria"],
@@ -306,11 +529,12 @@ class Indicadores:
                     "av": float(row["av"]) if row["av"] is not None else 0,
                     "ah": float(row["ah"]) if row["ah"] is not None else 0
                 }
-                for _, row in result.iterrows()
-            ] if not result.empty else []
+                for row in result
+            ] if result else []
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular lucro bruto: {str(e)}")
 
+    @memoizar
     def calcular_despesas_fixas_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula as despesas fixas do fluxo de caixa (fc) por categoria nivel_2 com AV e AH.
 
@@ -321,84 +545,18 @@ class Indicadores:
         Returns:
             Lista de dicionários com 'categoria', 'valor', 'av' (análise vertical), e 'ah' (análise horizontal).
         """
-        query = text("""
-            WITH 
-              receita AS (
-                SELECT SUM(valor) AS total_receita
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              prev_despesas AS (
-                SELECT 
-                  p.nivel_2 AS categoria_nivel_2,
-                  SUM(f.valor) AS prev_valor
-                FROM fc f
-                JOIN plano_de_contas p
-                  ON f.id_cliente = p.id_cliente
-                  AND text(f.nivel_3_id) = p.nivel_3_id
-                WHERE f.id_cliente = ANY (:id_cliente)
-                  AND f.visao = 'Realizado'
-                  AND f.nivel_1 = '5. Despesas Fixas'
-                  AND EXTRACT(YEAR FROM f.data) = :prev_year
-                  AND EXTRACT(MONTH FROM f.data) = :prev_month
-                  AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-                GROUP BY p.nivel_2
-              )
-            SELECT 
-              p.nivel_2 AS categoria_nivel_2,
-              SUM(f.valor) AS total_valor,
-              CASE 
-                WHEN r.total_receita = 0 THEN NULL 
-                ELSE SUM(f.valor) / r.total_receita * 100
-              END AS av,
-              CASE 
-                WHEN prev.prev_valor IS NULL OR prev.prev_valor = 0 THEN NULL 
-                ELSE (SUM(f.valor) / prev.prev_valor - 1) * 100
-              END AS ah
-            FROM fc f
-            JOIN plano_de_contas p
-              ON f.id_cliente = p.id_cliente
-              AND text(f.nivel_3_id) = p.nivel_3_id
-            CROSS JOIN receita r
-            LEFT JOIN prev_despesas prev 
-              ON prev.categoria_nivel_2 = p.nivel_2
-            WHERE f.id_cliente = ANY (:id_cliente)
-              AND f.visao = 'Realizado'
-              AND f.nivel_1 = '5. Despesas Fixas'
-              AND EXTRACT(YEAR FROM f.data) = :year
-              AND EXTRACT(MONTH FROM f.data) = :month
-              AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-            GROUP BY p.nivel_2, r.total_receita, prev.prev_valor
-            ORDER BY total_valor ASC;
-        """)
-        params = {
-            "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
-            "centro_custo": centro_custo if centro_custo else ""
-        }
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_despesas_fixas_fc(mes, centro_custo)
         try:
-            result = self.db.execute_query(query, params)
-            return [
-                {
-                    "categoria": row["categoria_nivel_2"],
-                    "valor": float(row["total_valor"]) if row["total_valor"] is not None else 0,
-                    "av": float(row["av"]) if row["av"] is not None else 0,
-                    "ah": float(row["ah"]) if row["ah"] is not None else 0
-                }
-                for _, row in result.iterrows()
-            ] if not result.empty else []
+            atual, anterior, receita = self._somas_por_nivel_2(
+                '5. Despesas Fixas', mes, mes - relativedelta(months=1), centro_custo
+            )
+            return analise_por_nivel_2(atual, anterior, receita, "categoria", "valor")
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular despesas fixas: {str(e)}")
         
 #Relatorio 3
+    @memoizar
     def calcular_lucro_operacional_fc(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula Receita, Custos Variáveis, Despesas Fixas, AV e AH para o Lucro Operacional.
         
@@ -407,102 +565,12 @@ class Indicadores:
             mes_anterior: Data do mês anterior (opcional).
             centro_custo: Filtro opcional por centro de custo.
         """
-        query = text("""
-            WITH
-              totais_atual AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_atual
-                  AND EXTRACT(MONTH FROM data) = :mes_atual
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_atual
-                  AND EXTRACT(MONTH FROM data) = :mes_atual
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Despesas Fixas', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_atual
-                  AND EXTRACT(MONTH FROM data) = :mes_atual
-                  AND nivel_1 = '5. Despesas Fixas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              totais_anterior AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS prev_valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_anterior
-                  AND EXTRACT(MONTH FROM data) = :mes_anterior
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_anterior
-                  AND EXTRACT(MONTH FROM data) = :mes_anterior
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Despesas Fixas', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :ano_anterior
-                  AND EXTRACT(MONTH FROM data) = :mes_anterior
-                  AND nivel_1 = '5. Despesas Fixas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              receita_total AS (
-                SELECT valor AS total
-                FROM totais_atual
-                WHERE categoria = 'Receita'
-              )
-            SELECT
-              a.categoria,
-              a.valor,
-              CASE
-                WHEN rt.total = 0 THEN NULL
-                ELSE a.valor / rt.total * 100
-              END AS av,
-              CASE
-                WHEN p.prev_valor IS NULL OR p.prev_valor = 0 THEN NULL
-                ELSE (a.valor / p.prev_valor - 1) * 100
-              END AS ah
-            FROM totais_atual a
-            CROSS JOIN receita_total rt
-            LEFT JOIN totais_anterior p
-              ON p.categoria = a.categoria
-            ORDER BY 
-              CASE a.categoria
-                WHEN 'Receita' THEN 1
-                WHEN 'Custos Variáveis' THEN 2
-                WHEN 'Despesas Fixas' THEN 3
-              END;
-        """)
-        params = {
-            "id_cliente": self.id_cliente,
-            "ano_atual": mes_atual.year,
-            "mes_atual": mes_atual.month,
-            "ano_anterior": mes_anterior.year if mes_anterior else mes_atual.year,
-            "mes_anterior": mes_anterior.month if mes_anterior else mes_atual.month,
-            "centro_custo": centro_custo if centro_custo else ""
-        }
-        result = self.db.execute_query(query, params)
-        return result.to_dict('records') # type: ignore
+        if self._snapshot_cobre(mes_atual, mes_anterior):
+            return self.snapshot.calcular_lucro_operacional_fc(mes_atual, mes_anterior, centro_custo)
+        result = self._totais_fc(CATEGORIAS_LUCRO_OPERACIONAL, mes_atual, mes_anterior or mes_atual, centro_custo)
+        return result
 
+    @memoizar
     def calcular_investimentos_fc(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
           """Calcula categorias de Investimentos (nivel_2 6.1, 6.2, 6.3), com AV e AH.
           
@@ -511,76 +579,15 @@ class Indicadores:
               mes_anterior: Data do mês anterior (opcional).
               centro_custo: Filtro opcional por centro de custo.
           """
-          query = text("""
-              WITH 
-                receita AS (
-                  SELECT SUM(valor) AS total_receita
-                  FROM fc
-                  WHERE id_cliente = ANY (:id_cliente)
-                    AND visao = 'Realizado'
-                    AND EXTRACT(YEAR FROM data) = :ano_atual
-                    AND EXTRACT(MONTH FROM data) = :mes_atual
-                    AND nivel_1 = '3. Receitas'
-                    AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                ),
-                prev_custos AS (
-                  SELECT 
-                    p.nivel_2 AS categoria,
-                    SUM(f.valor) AS prev_valor
-                  FROM fc f
-                  JOIN plano_de_contas p
-                    ON f.id_cliente = p.id_cliente
-                    AND text(f.nivel_3_id) = p.nivel_3_id
-                  WHERE f.id_cliente = ANY (:id_cliente)
-                    AND f.visao = 'Realizado'
-                    AND f.nivel_1 = '6. Investimentos'
-                    AND EXTRACT(YEAR FROM f.data) = :ano_anterior
-                    AND EXTRACT(MONTH FROM f.data) = :mes_anterior
-                    AND p.nivel_2 LIKE 
-                      '6.%'
-                    AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-                  GROUP BY p.nivel_2
-                )
-              SELECT 
-                p.nivel_2 AS categoria,
-                SUM(f.valor) AS valor,
-                CASE 
-                  WHEN r.total_receita = 0 THEN NULL 
-                  ELSE SUM(f.valor) / r.total_receita * 100
-                END AS av,
-                CASE 
-                  WHEN prev.prev_valor IS NULL OR prev.prev_valor = 0 THEN NULL 
-                  ELSE (SUM(f.valor) / prev.prev_valor - 1) * 100
-                END AS ah
-              FROM fc f
-              JOIN plano_de_contas p
-                ON f.id_cliente = p.id_cliente
-                AND text(f.nivel_3_id) = p.nivel_3_id
-              CROSS JOIN receita r
-              LEFT JOIN prev_custos prev 
-                ON prev.categoria = p.nivel_2
-              WHERE f.id_cliente = ANY (:id_cliente)
-                AND f.visao = 'Realizado'
-                AND f.nivel_1 = '6. Investimentos'
-                AND EXTRACT(YEAR FROM f.data) = :ano_atual
-                AND EXTRACT(MONTH FROM f.data) = :mes_atual
-                AND p.nivel_2 LIKE '6.%'
-                AND (COALESCE(:centro_custo, '') = '' OR f.centro_custo = :centro_custo)
-              GROUP BY p.nivel_2, r.total_receita, prev.prev_valor
-              ORDER BY valor DESC;
-          """)
-          params = {
-              "id_cliente": self.id_cliente,
-              "ano_atual": mes_atual.year,
-              "mes_atual": mes_atual.month,
-              "ano_anterior": mes_anterior.year if mes_anterior else mes_atual.year,
-              "mes_anterior": mes_anterior.month if mes_anterior else mes_atual.month,
-              "centro_custo": centro_custo if centro_custo else ""
-          }
-          result = self.db.execute_query(query, params)
-          return result.to_dict('records') # type: ignore
+          if self._snapshot_cobre(mes_atual, mes_anterior):
+              return self.snapshot.calcular_investimentos_fc(mes_atual, mes_anterior, centro_custo)
+          atual, anterior, receita = self._somas_por_nivel_2(
+              '6. Investimentos', mes_atual, mes_anterior or mes_atual, centro_custo
+          )
+          return analise_investimentos(atual, anterior, receita)
         
   # Relatorio 4      
+    @memoizar
     def calcular_lucro_liquido_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
       """Calcula as categorias que compõem o Lucro Líquido (Receita, Custos Variáveis, Despesas Fixas, Investimentos) do fluxo de caixa (fc).
 
@@ -591,120 +598,10 @@ class Indicadores:
       Returns:
           Lista de dicionários com 'categoria', 'valor', 'av' (análise vertical), e 'ah' (análise horizontal).
       """
-      query = text("""
-          WITH
-            totais_atual AS (
-              SELECT 'Receita' AS categoria, SUM(valor) AS valor
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND nivel_1 = '3. Receitas'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Custos Variáveis', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND nivel_1 = '4. Custos Variáveis'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Despesas Fixas', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND nivel_1 = '5. Despesas Fixas'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Investimentos', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND nivel_1 = '6. Investimentos'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-            ),
-            totais_anterior AS (
-              SELECT 'Receita' AS categoria, SUM(valor) AS prev_valor
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :prev_year
-                AND EXTRACT(MONTH FROM data) = :prev_month
-                AND nivel_1 = '3. Receitas'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Custos Variáveis', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :prev_year
-                AND EXTRACT(MONTH FROM data) = :prev_month
-                AND nivel_1 = '4. Custos Variáveis'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Despesas Fixas', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :prev_year
-                AND EXTRACT(MONTH FROM data) = :prev_month
-                AND nivel_1 = '5. Despesas Fixas'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              UNION ALL
-              SELECT 'Investimentos', SUM(valor) * -1
-              FROM fc
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :prev_year
-                AND EXTRACT(MONTH FROM data) = :prev_month
-                AND nivel_1 = '6. Investimentos'
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-            ),
-            receita_total AS (
-              SELECT valor AS total
-              FROM totais_atual
-              WHERE categoria = 'Receita'
-            )
-          SELECT
-            a.categoria,
-            a.valor,
-            CASE
-              WHEN rt.total = 0 THEN NULL
-              ELSE a.valor / rt.total * 100
-            END AS av,
-            CASE
-              WHEN p.prev_valor IS NULL OR p.prev_valor = 0 THEN NULL
-              ELSE (a.valor / p.prev_valor - 1) * 100
-            END AS ah
-          FROM totais_atual a
-          CROSS JOIN receita_total rt
-          LEFT JOIN totais_anterior p
-            ON p.categoria = a.categoria
-          ORDER BY 
-            CASE a.categoria
-              WHEN 'Receita' THEN 1
-              WHEN 'Custos Variáveis' THEN 2
-              WHEN 'Despesas Fixas' THEN 3
-              WHEN 'Investimentos' THEN 4
-            END;
-      """)
-      params = {
-          "id_cliente": self.id_cliente,
-          "year": mes.year,
-          "month": mes.month,
-          "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-          "prev_month": mes.month - 1 if mes.month > 1 else 12,
-          "centro_custo": centro_custo if centro_custo else ""
-      }
+      if self._snapshot_cobre(mes):
+          return self.snapshot.calcular_lucro_liquido_fc(mes, centro_custo)
       try:
-          result = self.db.execute_query(query, params)
+          result = self._totais_fc(CATEGORIAS_LUCRO_LIQUIDO, mes, mes - relativedelta(months=1), centro_custo)
           return [
               {
                   "categoria": row["categoria"],
@@ -712,11 +609,12 @@ class Indicadores:
                   "av": float(row["av"]) if row["av"] is not None else 0,
                   "ah": float(row["ah"]) if row["ah"] is not None else 0
               }
-              for _, row in result.iterrows()
-          ] if not result.empty else []
+              for row in result
+          ] if result else []
       except Exception as e:
           raise RuntimeError(f"Erro ao calcular lucro líquido: {str(e)}")
 
+    @memoizar
     def calcular_entradas_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula as Entradas Não Operacionais do fluxo de caixa (fc) por categoria_nivel_3 com AV e AH.
 
@@ -727,47 +625,42 @@ class Indicadores:
         Returns:
             Lista de dicionários com 'categoria_nivel_3', 'total_valor', 'av', e 'ah'.
         """
-        query = text("""
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_entradas_nao_operacionais_fc(mes, centro_custo)
+        query = text(f"""
             WITH 
               receita_total AS (
                 SELECT 
                   SUM(valor) AS total_receita
-                FROM fc
+                FROM {self.tabela_fc}
                 WHERE id_cliente = ANY (:id_cliente)
                   AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND LOWER(TRIM(nivel_1)) = LOWER('3. Receitas')
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                  AND {filtro_periodo()}
+                  AND {filtro_nivel_1('3. Receitas')}
+                  {filtro_centro_custo(centro_custo)}
               ),
               prev_entradas AS (
                 SELECT 
                   LOWER(TRIM(categoria_nivel_3)) AS categoria_nivel_3,
                   SUM(valor) AS prev_valor
-                FROM fc
+                FROM {self.tabela_fc}
                 WHERE id_cliente = ANY (:id_cliente)
                   AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND LOWER(TRIM(nivel_1)) IN (
-                    LOWER('7.1 Entradas Não Operacionais')
-                  )
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                  AND {filtro_periodo('data', 'prev_')}
+                  AND {filtro_nivel_1('7.1 Entradas Não Operacionais')}
+                  {filtro_centro_custo(centro_custo)}
                 GROUP BY LOWER(TRIM(categoria_nivel_3))
               ),
               current_entradas AS (
                 SELECT 
                   LOWER(TRIM(categoria_nivel_3)) AS categoria_nivel_3,
                   SUM(valor) AS total_valor
-                FROM fc
+                FROM {self.tabela_fc}
                 WHERE id_cliente = ANY (:id_cliente)
                   AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND LOWER(TRIM(nivel_1)) IN (
-                    LOWER('7.1 Entradas Não Operacionais')
-                  )
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                  AND {filtro_periodo()}
+                  AND {filtro_nivel_1('7.1 Entradas Não Operacionais')}
+                  {filtro_centro_custo(centro_custo)}
                 GROUP BY LOWER(TRIM(categoria_nivel_3))
               )
             SELECT
@@ -789,14 +682,12 @@ class Indicadores:
         """)
         params = {
             "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
+            **periodo_mes(mes),
+            **periodo_mes(mes - relativedelta(months=1), "prev_"),
             "centro_custo": centro_custo if centro_custo else ""
         }
         try:
-            result = self.db.execute_query(query, params)
+            result = self._consultar(query, params)
             return [
                 {
                     "categoria_nivel_3": row["categoria_nivel_3"],
@@ -804,12 +695,13 @@ class Indicadores:
                     "av": float(row["av"]) if row["av"] is not None else 0,
                     "ah": float(row["ah"]) if row["ah"] is not None else 0
                 }
-                for _, row in result.iterrows()
-            ] if not result.empty else []
+                for row in result
+            ] if result else []
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular entradas não operacionais: {str(e)}")
           
 # Relatorio 5
+    @memoizar
     def calcular_saidas_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula o total de Saídas Não Operacionais do fluxo de caixa (fc).
 
@@ -820,36 +712,37 @@ class Indicadores:
         Returns:
             Lista com um dicionário contendo 'categoria' e 'valor'.
         """
-        query = text("""
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_saidas_nao_operacionais_fc(mes, centro_custo)
+        query = text(f"""
             SELECT
                 'Saídas Não Operacionais' AS categoria,
                 SUM(valor) AS total_valor
-            FROM fc
+            FROM {self.tabela_fc}
             WHERE id_cliente = ANY (:id_cliente)
               AND visao = 'Realizado'
-              AND EXTRACT(YEAR FROM data) = :year
-              AND EXTRACT(MONTH FROM data) = :month
-              AND LOWER(TRIM(nivel_1)) = LOWER('7.2 Saídas Não Operacionais')
-              AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo);
+              AND {filtro_periodo()}
+              AND {filtro_nivel_1('7.2 Saídas Não Operacionais')}
+              {filtro_centro_custo(centro_custo)};
         """)
         params = {
             "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
+            **periodo_mes(mes),
             "centro_custo": centro_custo if centro_custo else ""
         }
         try:
-            result = self.db.execute_query(query, params)
+            result = self._consultar(query, params)
             return [
                 {
                     "categoria": row["categoria"],
                     "valor": float(row["total_valor"]) if row["total_valor"] is not None else 0  # Ajustado para total_valor
                 }
-                for _, row in result.iterrows()
-            ] if not result.empty else [{"categoria": "Saídas Não Operacionais", "valor": 0.0}]
+                for row in result
+            ] if result else [{"categoria": "Saídas Não Operacionais", "valor": 0.0}]
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular saídas não operacionais: {str(e)}")
           
+    @memoizar
     def calcular_resultados_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
       """Calcula o Resultado Não Operacional (Entradas - Saídas) do fluxo de caixa por nivel_1 com AV e AH.
 
@@ -860,49 +753,42 @@ class Indicadores:
       Returns:
           Lista de dicionários com 'nivel_1', 'total_valor', 'av' e 'ah'.
       """
-      query = text("""
+      if self._snapshot_cobre(mes):
+          return self.snapshot.calcular_resultados_nao_operacionais_fc(mes, centro_custo)
+      query = text(f"""
           WITH 
             receita_total AS (
               SELECT 
                 SUM(valor) AS total_receita
-              FROM fc
+              FROM {self.tabela_fc}
               WHERE id_cliente = ANY (:id_cliente)
                 AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND LOWER(TRIM(nivel_1)) = LOWER('3. Receitas')
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                AND {filtro_periodo()}
+                AND {filtro_nivel_1('3. Receitas')}
+                {filtro_centro_custo(centro_custo)}
             ),
             prev_resultado AS (
               SELECT 
                 nivel_1,
                 SUM(valor) AS prev_valor
-              FROM fc
+              FROM {self.tabela_fc}
               WHERE id_cliente = ANY (:id_cliente)
                 AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :prev_year
-                AND EXTRACT(MONTH FROM data) = :prev_month
-                AND LOWER(TRIM(nivel_1)) IN (
-                  LOWER('7.1 Entradas Não Operacionais'),
-                  LOWER('7.2 Saídas Não Operacionais')
-                )
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                AND {filtro_periodo('data', 'prev_')}
+                AND {filtro_nivel_1('7.1 Entradas Não Operacionais', '7.2 Saídas Não Operacionais')}
+                {filtro_centro_custo(centro_custo)}
               GROUP BY nivel_1
             ),
             current_resultado AS (
               SELECT 
                 nivel_1,
                 SUM(valor) AS total_valor
-              FROM fc
+              FROM {self.tabela_fc}
               WHERE id_cliente = ANY (:id_cliente)
                 AND visao = 'Realizado'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND LOWER(TRIM(nivel_1)) IN (
-                  LOWER('7.1 Entradas Não Operacionais'),
-                  LOWER('7.2 Saídas Não Operacionais')
-                )
-                AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
+                AND {filtro_periodo()}
+                AND {filtro_nivel_1('7.1 Entradas Não Operacionais', '7.2 Saídas Não Operacionais')}
+                {filtro_centro_custo(centro_custo)}
               GROUP BY nivel_1
             )
           SELECT
@@ -924,14 +810,12 @@ class Indicadores:
       """)
       params = {
           "id_cliente": self.id_cliente,
-          "year": mes.year,
-          "month": mes.month,
-          "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-          "prev_month": mes.month - 1 if mes.month > 1 else 12,
+          **periodo_mes(mes),
+          **periodo_mes(mes - relativedelta(months=1), "prev_"),
           "centro_custo": centro_custo if centro_custo else ""
       }
       try:
-          result = self.db.execute_query(query, params)
+          result = self._consultar(query, params)
           return [
               {
                   "nivel_1": row["nivel_1"],
@@ -939,12 +823,13 @@ class Indicadores:
                   "av": float(row["av"]) if row["av"] is not None else 0,
                   "ah": float(row["ah"]) if row["ah"] is not None else 0
               }
-              for _, row in result.iterrows()
-          ] if not result.empty else []
+              for row in result
+          ] if result else []
       except Exception as e:
           raise RuntimeError(f"Erro ao calcular resultado não operacional: {str(e)}")
 
 
+    @memoizar
     def calcular_geracao_de_caixa_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Calcula as categorias que compõem a Geração de Caixa do fluxo de caixa (fc).
 
@@ -955,279 +840,344 @@ class Indicadores:
         Returns:
             Lista de dicionários com 'categoria', 'valor', 'av' (análise vertical), e 'ah' (análise horizontal).
         """
-        query = text("""
-            WITH
-              totais_atual AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Despesas Fixas', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '5. Despesas Fixas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Investimentos', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '6. Investimentos'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Entradas Não Operacionais', SUM(valor)
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '7.1 Entradas Não Operacionais'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Saídas Não Operacionais', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :year
-                  AND EXTRACT(MONTH FROM data) = :month
-                  AND nivel_1 = '7.2 Saídas Não Operacionais'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              totais_anterior AS (
-                SELECT 'Receita' AS categoria, SUM(valor) AS prev_valor
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '3. Receitas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Custos Variáveis', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '4. Custos Variáveis'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Despesas Fixas', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '5. Despesas Fixas'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Investimentos', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '6. Investimentos'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Entradas Não Operacionais', SUM(valor)
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '7.1 Entradas Não Operacionais'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-                UNION ALL
-                SELECT 'Saídas Não Operacionais', SUM(valor) * -1
-                FROM fc
-                WHERE id_cliente = ANY (:id_cliente)
-                  AND visao = 'Realizado'
-                  AND EXTRACT(YEAR FROM data) = :prev_year
-                  AND EXTRACT(MONTH FROM data) = :prev_month
-                  AND nivel_1 = '7.2 Saídas Não Operacionais'
-                  AND (COALESCE(:centro_custo, '') = '' OR centro_custo = :centro_custo)
-              ),
-              receita_total AS (
-                SELECT valor AS total
-                FROM totais_atual
-                WHERE categoria = 'Receita'
-              ),
-              lucro_liquido AS (
-                SELECT 
+        if self._snapshot_cobre(mes):
+            return self.snapshot.calcular_geracao_de_caixa_fc(mes, centro_custo)
+        try:
+            result = self._totais_fc(
+                CATEGORIAS_GERACAO_DE_CAIXA, mes, mes - relativedelta(months=1), centro_custo, com_lucro_liquido=True
+            )
+            return [
+                {
+                    "categoria": row["categoria"],
+                    "valor": float(row["valor"]) if row["valor"] is not None else 0,
+                    "av": float(row["av"]) if row["av"] is not None else 0,
+                    "ah": float(row["ah"]) if row["ah"] is not None else 0
+                }
+                for row in result
+            ] if result else []
+        except Exception as e:
+            raise RuntimeError(f"Erro ao calcular geração de caixa: {str(e)}")
+
+    @memoizar
+    def calcular_geracao_de_caixa_temporal_fc(self, mes_atual: date, centro_custo: Optional[str] = None,
+                                              meses: int = 3) -> List[Dict[str, Any]]:
+        """Calcula a Geração de Caixa dos últimos `meses` meses (ex.: 3, 6 ou 12), com AH, acumulado e média.
+
+        Os meses da janela e o mês base do AH do mais antigo (meses + 1) vêm de uma única
+        leitura: do snapshot, se ativo, ou de uma única consulta da série mensal. O total de
+        cada mês é calculado uma única vez e o AH, o acumulado e a média saem de
+        `analise_janela_movel` (somas de prefixo), de modo que o custo cresce um mês por mês.
+
+        Args:
+            mes_atual: Data do mês atual a ser considerado (a janela termina nele).
+            centro_custo: Filtro opcional por centro de custo.
+            meses: Tamanho da janela em meses.
+
+        Returns:
+            Lista de dicionários (mês atual primeiro) com 'mes', 'valor' (Geração de Caixa),
+            'ah' (análise horizontal), 'acumulado' e 'media' (da janela até o mês, em ordem cronológica).
+        """
+        mes_atual = mes_atual.replace(day=1)
+        # Mês base do AH seguido dos meses da janela, em ordem cronológica
+        serie_meses = [mes_atual - relativedelta(months=i) for i in range(meses, -1, -1)]
+
+        if self._snapshot_cobre(*serie_meses):
+            geracao_de_caixa_do_mes = lambda m: self.calcular_geracao_de_caixa_fc(m, centro_custo)
+        else:
+            serie = self.calcular_geracao_de_caixa_fc_periodo(serie_meses[0], serie_meses[-1], centro_custo)
+            geracao_de_caixa_do_mes = lambda m: serie.get(m, [])
+
+        # CORREÇÃO: Usar safe_float para lidar com valores NaN que estavam quebrando o cálculo
+        totais = [
+            sum(
+                safe_float(r.get("valor", 0)) if r.get("categoria") != "Saídas Não Operacionais"
+                else -safe_float(r.get("valor", 0))
+                for r in geracao_de_caixa_do_mes(mes)
+            )
+            for mes in serie_meses
+        ]
+
+        janela = [
+            {"mes": mes.strftime("%Y-%m"), **analise}
+            for mes, analise in zip(serie_meses[1:], analise_janela_movel(totais))
+        ]
+        return janela[::-1]
+
+
+# Séries mensais: uma consulta para um intervalo de meses, com AH via LAG()
+    def _serie_totais_fc(self, inicio: date, fim: date, categorias: tuple, centro_custo: Optional[str],
+                         com_lucro_liquido: bool = False) -> Dict[date, List[Dict[str, Any]]]:
+        """Totais por categoria mês a mês, de `inicio` a `fim` (inclusive), em uma única consulta.
+
+        A varredura começa um mês antes de `inicio`, para que o AH do primeiro mês também
+        venha do LAG(). Meses sem lançamentos aparecem com valor nulo, como nas consultas
+        de um mês. Com `com_lucro_liquido`, Receita, Custos Variáveis, Despesas Fixas e
+        Investimentos são substituídos pela linha 'Lucro Líquido' (regras da Geração de Caixa).
+
+        Args:
+            inicio: Primeiro mês da série.
+            fim: Último mês da série (inclusive).
+            categorias: Tuplas (categoria, nivel_1, sinal) na ordem de exibição.
+            centro_custo: Filtro opcional por centro de custo.
+            com_lucro_liquido: Se True, monta as linhas da Geração de Caixa.
+
+        Returns:
+            Dicionário mês -> registros com 'categoria', 'valor', 'av' e 'ah'.
+        """
+        if not isinstance(inicio, date) or not isinstance(fim, date):
+            raise ValueError("Os parâmetros 'inicio' e 'fim' devem ser objetos date.")
+        inicio, fim = inicio.replace(day=1), fim.replace(day=1)
+        if inicio > fim:
+            raise ValueError("O parâmetro 'inicio' deve ser anterior ou igual a 'fim'.")
+
+        valores_categorias = ", ".join(
+            f"('{nome}', '{nivel_1}', {sinal}, {ordem})" for ordem, (nome, nivel_1, sinal) in enumerate(categorias, 1)
+        )
+        if com_lucro_liquido:
+            linhas_cte = """
+              linhas AS (
+                SELECT
+                  mes,
                   'Lucro Líquido' AS categoria,
-                  SUM(CASE 
+                  0 AS ordem,
+                  SUM(CASE
                         WHEN categoria IN ('Receita') THEN valor
                         WHEN categoria IN ('Custos Variáveis', 'Despesas Fixas', 'Investimentos') THEN -valor
                         ELSE 0
                       END) AS valor
-                FROM totais_atual
+                FROM totais
                 WHERE categoria IN ('Receita', 'Custos Variáveis', 'Despesas Fixas', 'Investimentos')
+                GROUP BY mes
+                UNION ALL
+                SELECT mes, categoria, ordem, valor
+                FROM totais
+                WHERE categoria IN ('Entradas Não Operacionais', 'Saídas Não Operacionais')
+              ),"""
+        else:
+            linhas_cte = """
+              linhas AS (
+                SELECT mes, categoria, ordem, valor FROM totais
+              ),"""
+        query = text(f"""
+            WITH
+              meses AS (
+                SELECT generate_series(CAST(:serie_inicio AS date), CAST(:serie_ultimo AS date), INTERVAL '1 month')::date AS mes
               ),
-              lucro_liquido_prev AS (
-                SELECT 
-                  'Lucro Líquido' AS categoria,
-                  SUM(CASE 
-                        WHEN categoria IN ('Receita') THEN prev_valor
-                        WHEN categoria IN ('Custos Variáveis', 'Despesas Fixas', 'Investimentos') THEN -prev_valor
-                        ELSE 0
-                      END) AS prev_valor
-                FROM totais_anterior
-                WHERE categoria IN ('Receita', 'Custos Variáveis', 'Despesas Fixas', 'Investimentos')
+              categorias (categoria, nivel_1, sinal, ordem) AS (
+                VALUES {valores_categorias}
               ),
-              final AS (
-                SELECT 
+              somas AS (
+                SELECT DATE_TRUNC('month', data)::date AS mes, nivel_1, SUM(valor) AS valor
+                FROM {self.tabela_fc}
+                WHERE id_cliente = ANY (:id_cliente)
+                  AND visao = 'Realizado'
+                  AND {filtro_periodo('data', 'serie_')}
+                  AND nivel_1 IN (SELECT nivel_1 FROM categorias)
+                  {filtro_centro_custo(centro_custo)}
+                GROUP BY 1, 2
+              ),
+              totais AS (
+                SELECT m.mes, c.categoria, c.ordem, s.valor * c.sinal AS valor
+                FROM meses m
+                CROSS JOIN categorias c
+                LEFT JOIN somas s
+                  ON s.mes = m.mes
+                  AND s.nivel_1 = c.nivel_1
+              ),{linhas_cte}
+              analise AS (
+                SELECT
+                  l.mes,
                   l.categoria,
+                  l.ordem,
                   l.valor,
-                  CASE
-                    WHEN rt.total = 0 THEN NULL
-                    ELSE l.valor / rt.total * 100
-                  END AS av,
-                  CASE
-                    WHEN lp.prev_valor IS NULL OR lp.prev_valor = 0 THEN NULL
-                    WHEN lp.prev_valor < 0 AND l.valor > 0 THEN 
-                      ((l.valor - lp.prev_valor) / ABS(lp.prev_valor)) * 100  -- Ajuste para quando o anterior é negativo
-                    ELSE 
-                      (l.valor / lp.prev_valor - 1) * 100
-                  END AS ah
-                FROM lucro_liquido l
-                CROSS JOIN receita_total rt
-                LEFT JOIN lucro_liquido_prev lp
-                  ON lp.categoria = l.categoria
-                UNION ALL
-                SELECT 
-                  a.categoria,
-                  a.valor,
-                  CASE
-                    WHEN rt.total = 0 THEN NULL
-                    ELSE a.valor / rt.total * 100
-                  END AS av,
-                  CASE
-                    WHEN p.prev_valor IS NULL OR p.prev_valor = 0 THEN NULL
-                    ELSE (a.valor / p.prev_valor - 1) * 100
-                  END AS ah
-                FROM totais_atual a
-                CROSS JOIN receita_total rt
-                LEFT JOIN totais_anterior p
-                  ON p.categoria = a.categoria
-                WHERE a.categoria IN ('Entradas Não Operacionais', 'Saídas Não Operacionais')
+                  LAG(l.valor) OVER (PARTITION BY l.categoria ORDER BY l.mes) AS prev_valor,
+                  r.valor AS total_receita
+                FROM linhas l
+                JOIN totais r
+                  ON r.mes = l.mes
+                  AND r.categoria = 'Receita'
               )
             SELECT
+              mes,
               categoria,
               valor,
-              av,
-              ah
-            FROM final
-            ORDER BY 
-              CASE categoria
-                WHEN 'Lucro Líquido' THEN 1
-                WHEN 'Entradas Não Operacionais' THEN 2
-                WHEN 'Saídas Não Operacionais' THEN 3
-              END;
+              CASE
+                WHEN total_receita = 0 THEN NULL
+                ELSE valor / total_receita * 100
+              END AS av,
+              CASE
+                WHEN prev_valor IS NULL OR prev_valor = 0 THEN NULL
+                WHEN categoria = 'Lucro Líquido' AND prev_valor < 0 AND valor > 0 THEN
+                  ((valor - prev_valor) / ABS(prev_valor)) * 100
+                ELSE
+                  (valor / prev_valor - 1) * 100
+              END AS ah
+            FROM analise
+            WHERE mes >= :inicio
+            ORDER BY mes, ordem;
         """)
         params = {
             "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month,
-            "prev_year": mes.year if mes.month > 1 else mes.year - 1,
-            "prev_month": mes.month - 1 if mes.month > 1 else 12,
+            "inicio": inicio,
+            "serie_inicio": inicio - relativedelta(months=1),
+            "serie_ultimo": fim,
+            "serie_fim": fim + relativedelta(months=1),
             "centro_custo": centro_custo if centro_custo else ""
         }
         try:
-            result = self.db.execute_query(query, params)
-            return [
+            linhas = [linha._asdict() for linha in self.db.fetch_rows(query, params, preparada=True)]
+        except Exception as e:
+            raise RuntimeError(f"Erro ao calcular série mensal do fluxo de caixa: {str(e)}")
+
+        serie: Dict[date, List[Dict[str, Any]]] = {}
+        for linha in linhas:
+            mes = linha.pop("mes")
+            serie.setdefault(mes, []).append(linha)
+        # Conversão de nulos do pandas aplicada mês a mês, como em cada consulta de um mês
+        return {mes: nulos_como_nan(registros, ["valor", "av", "ah"]) for mes, registros in serie.items()}
+
+    @staticmethod
+    def _valores_ou_zero(serie: Dict[date, List[Dict[str, Any]]]) -> Dict[date, List[Dict[str, Any]]]:
+        """Aplica `float(v) if v is not None else 0` em valor/av/ah, como os métodos de um mês."""
+        return {
+            mes: [
                 {
                     "categoria": row["categoria"],
                     "valor": float(row["valor"]) if row["valor"] is not None else 0,
                     "av": float(row["av"]) if row["av"] is not None else 0,
                     "ah": float(row["ah"]) if row["ah"] is not None else 0
                 }
-                for _, row in result.iterrows()
-            ] if not result.empty else []
-        except Exception as e:
-            raise RuntimeError(f"Erro ao calcular geração de caixa: {str(e)}")
-
-    def calcular_geracao_de_caixa_temporal_fc(self, mes_atual: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Calcula a Geração de Caixa dos últimos 3 meses e a análise horizontal (ah) em relação ao mês anterior.
+                for row in registros
+            ]
+            for mes, registros in serie.items()
+        }
 
-        Args:
-            mes_atual: Data do mês atual a ser considerado (o intervalo será mes_atual e os 2 meses anteriores).
-            centro_custo: Filtro opcional por centro de custo.
+    @memoizar
+    def calcular_lucro_bruto_fc_periodo(self, inicio: date, fim: date, centro_custo: Optional[str] = None) -> Dict[date, List[Dict[str, Any]]]:
+        """Série mensal de `calcular_lucro_bruto_fc` de `inicio` a `fim` (inclusive) em uma consulta.
 
         Returns:
-            Lista de dicionários com 'mes', 'valor' (Geração de Caixa), e 'ah' (análise horizontal).
+            Dicionário mês -> mesma lista retornada por `calcular_lucro_bruto_fc(mes)`.
         """
-        # Definir os 3 meses a serem calculados
-        meses = []
-        for i in range(3):
-            ano = mes_atual.year if mes_atual.month > i else mes_atual.year - 1
-            mes = mes_atual.month - i if mes_atual.month > i else 12 - (i - mes_atual.month)
-            meses.append(date(ano, mes, 1))
-
-        # Calcular a Geração de Caixa para cada mês (e o mês anterior ao primeiro)
-        resultados_por_mes = []
-        for i, mes in enumerate(meses):
-            # Calcular a Geração de Caixa do mês atual
-            geracao_de_caixa = self.calcular_geracao_de_caixa_fc(mes, centro_custo)
-            
-            # CORREÇÃO: Usar safe_float para lidar com valores NaN que estavam quebrando o cálculo
-            from src.core.utils import safe_float
-            total = sum(
-                safe_float(r.get("valor", 0)) if r.get("categoria") != "Saídas Não Operacionais" 
-                else -safe_float(r.get("valor", 0))
-                for r in geracao_de_caixa
-            )
+        return self._valores_ou_zero(self._serie_totais_fc(inicio, fim, CATEGORIAS_LUCRO_BRUTO, centro_custo))
 
-            # Calcular o valor do mês anterior para o ah
-            mes_anterior = date(mes.year if mes.month > 1 else mes.year - 1,
-                             mes.month - 1 if mes.month > 1 else 12, 1)
-            geracao_de_caixa_anterior = self.calcular_geracao_de_caixa_fc(mes_anterior, centro_custo)
-            
-            # CORREÇÃO: Também usar safe_float aqui
-            total_anterior = sum(
-                safe_float(r.get("valor", 0)) if r.get("categoria") != "Saídas Não Operacionais" 
-                else -safe_float(r.get("valor", 0))
-                for r in geracao_de_caixa_anterior
-            )
+    @memoizar
+    def calcular_lucro_operacional_fc_periodo(self, inicio: date, fim: date, centro_custo: Optional[str] = None) -> Dict[date, List[Dict[str, Any]]]:
+        """Série mensal de `calcular_lucro_operacional_fc` (AH sempre contra o mês anterior).
 
-            # Calcular o ah com a nova lógica: variação percentual baseada no módulo
-            if total_anterior == 0:
-                ah = 0  # Caso especial: mês anterior zero ou infinito
-            else:
-                valor_abs_atual = abs(total)
-                valor_abs_anterior = abs(total_anterior)
-                ah = ((valor_abs_atual - valor_abs_anterior) / valor_abs_anterior) * 100
+        Returns:
+            Dicionário mês -> mesma lista retornada por `calcular_lucro_operacional_fc(mes, mes - 1 mês)`.
+        """
+        return self._serie_totais_fc(inicio, fim, CATEGORIAS_LUCRO_OPERACIONAL, centro_custo)
 
-            resultados_por_mes.append({
-                "mes": mes.strftime("%Y-%m"),
-                "valor": total,
-                "ah": ah
-            })
+    @memoizar
+    def calcular_lucro_liquido_fc_periodo(self, inicio: date, fim: date, centro_custo: Optional[str] = None) -> Dict[date, List[Dict[str, Any]]]:
+        """Série mensal de `calcular_lucro_liquido_fc` de `inicio` a `fim` (inclusive) em uma consulta.
 
-        return resultados_por_mes
+        Returns:
+            Dicionário mês -> mesma lista retornada por `calcular_lucro_liquido_fc(mes)`.
+        """
+        return self._valores_ou_zero(self._serie_totais_fc(inicio, fim, CATEGORIAS_LUCRO_LIQUIDO, centro_custo))
+
+    @memoizar
+    def calcular_geracao_de_caixa_fc_periodo(self, inicio: date, fim: date, centro_custo: Optional[str] = None) -> Dict[date, List[Dict[str, Any]]]:
+        """Série mensal de `calcular_geracao_de_caixa_fc` de `inicio` a `fim` (inclusive) em uma consulta.
 
+        Returns:
+            Dicionário mês -> mesma lista retornada por `calcular_geracao_de_caixa_fc(mes)`.
+        """
+        return self._valores_ou_zero(
+            self._serie_totais_fc(inicio, fim, CATEGORIAS_GERACAO_DE_CAIXA, centro_custo, com_lucro_liquido=True)
+        )
 
 #relatorio 6
+    def carregar_dre(self, meses: List[date]) -> Dict[date, Dict[Optional[str], Dict[str, Any]]]:
+        """Ativa o modo lote do DRE: soma as categorias de todas as empresas dos meses em uma única consulta.
+
+        Usa GROUPING SETS para obter, no mesmo passo, o total consolidado (chave None) e o
+        total de cada empresa, mês a mês. Enquanto ativo, `calcular_indicadores_dre` desses
+        meses é respondido em memória para qualquer empresa (mesma saída da consulta filtrada).
 
+        Args:
+            meses: Datas dos meses a serem carregados.
+
+        Returns:
+            Dicionário mês -> empresa -> {categoria: valor}.
+        """
+        meses = sorted({m.replace(day=1) for m in meses})
+        if not meses:
+            return {}
+        query = text(f"""
+          SELECT
+            DATE_TRUNC('month', data)::date AS mes,
+            GROUPING(empresa) AS consolidado,
+            empresa,
+            categoria,
+            sum(valor) AS valor
+          FROM {self.tabela_dre}
+          WHERE id_cliente = ANY (:id_cliente)
+            AND visao = 'Competência'
+            AND {filtro_periodo()}
+          GROUP BY GROUPING SETS ((DATE_TRUNC('month', data), empresa, categoria), (DATE_TRUNC('month', data), categoria));
+        """)
+        params = {
+            "id_cliente": self.id_cliente,
+            "inicio": meses[0],
+            "fim": meses[-1] + relativedelta(months=1)
+        }
+        try:
+            linhas = [linha._asdict() for linha in self.db.fetch_rows(query, params, preparada=True)]
+        except Exception as e:
+            raise RuntimeError(f"Erro ao consultar DRE: {str(e)}")
+
+        grupos: Dict[Tuple[date, Optional[str]], List[Dict[str, Any]]] = {}
+        for linha in linhas:
+            # Linhas com empresa NULL nunca atendem ao filtro `empresa = :empresa`
+            if linha["consolidado"] or linha["empresa"] is not None:
+                chave = (linha["mes"], None if linha["consolidado"] else linha["empresa"])
+                grupos.setdefault(chave, []).append(linha)
+        lotes: Dict[date, Dict[Optional[str], Dict[str, Any]]] = {mes: {None: {}} for mes in meses}
+        for (mes, empresa), registros in grupos.items():
+            if mes in lotes:
+                # Conversão de nulos aplicada por mês/empresa, como em cada consulta filtrada
+                lotes[mes][empresa] = {
+                    row["categoria"]: row["valor"] for row in nulos_como_nan(registros, ["valor"]) if row["valor"] is not None
+                }
+        self._dre_por_empresa.update(lotes)
+        return lotes
+
+    def carregar_dre_por_empresa(self, mes: date) -> Dict[Optional[str], Dict[str, Any]]:
+        """Modo lote do DRE para um único mês (ver `carregar_dre`); retorna empresa -> {categoria: valor}."""
+        return self.carregar_dre([mes])[mes.replace(day=1)]
+
+    def _dados_dre(self, mes: date, empresa: Optional[str] = None) -> Dict[str, Any]:
+        """Soma das categorias do DRE no mês ({categoria: valor}), do lote carregado ou do banco."""
+        lote = self._dre_por_empresa.get(mes.replace(day=1))
+        if lote is not None:
+            return dict(lote.get(empresa or None, {}))
+
+        query = text(f"""
+          SELECT categoria, sum(valor) AS valor
+          FROM {self.tabela_dre}
+          WHERE id_cliente = ANY (:id_cliente)
+            AND visao = 'Competência'
+            AND {filtro_periodo()}
+            {filtro_empresa(empresa)}
+          group by categoria;
+        """)
+        params = {
+            "id_cliente": self.id_cliente,
+            **periodo_mes(mes),
+            "empresa": empresa if empresa else ""
+        }
+        try:
+            result = self._consultar(query, params)
+            return {row["categoria"]: row["valor"] for row in result if row["valor"] is not None}
+        except Exception as e:
+            raise RuntimeError(f"Erro ao consultar DRE: {str(e)}")
+
+
+    @memoizar
     def calcular_indicadores_dre(self, mes: date, empresa: Optional[str] = None) -> List[Dict[str, Any]]:
             """Calcula os indicadores financeiros do DRE para um mês específico.
 
@@ -1238,122 +1188,41 @@ class Indicadores:
             Returns:
                 Lista de dicionários com os indicadores, valores e análise vertical (av_dre).
             """
-            
-            # Query para obter os dados do DRE
-            query = text("""
-              SELECT categoria, sum(valor) AS valor
-              FROM dre
-              WHERE id_cliente = ANY (:id_cliente)
-                AND visao = 'Competência'
-                AND EXTRACT(YEAR FROM data) = :year
-                AND EXTRACT(MONTH FROM data) = :month
-                AND (COALESCE(:empresa, '') = '' OR empresa = :empresa)
-              group by categoria;
-            """)
-            params = {
-                "id_cliente": self.id_cliente,
-                "year": mes.year,
-                "month": mes.month,
-                "empresa": empresa if empresa else ""
-            }
-            try:
-                result = self.db.execute_query(query, params)
-                dados_dre = {row["categoria"]: row["valor"] for _, row in result.iterrows() if row["valor"] is not None}
-            except Exception as e:
-                raise RuntimeError(f"Erro ao consultar DRE: {str(e)}")
-
-            # Inicializar valores com 0 para categorias que podem não existir
-            valores = {
-                "Receita de Vendas de Produtos":dados_dre.get("Receita de Vendas de Produtos",0.0),
-                "Receita de Prestação de Serviços": dados_dre.get("Receita de Prestação de Serviços", 0.0),
-                "Descontos Incondicionais": dados_dre.get("Descontos Incondicionais", 0.0),
-                "ICMS": dados_dre.get("ICMS", 0.0),
-                "PIS": dados_dre.get("PIS", 0.0),
-                "COFINS": dados_dre.get("COFINS", 0.0),
-                "ISS": dados_dre.get("ISS", 0.0),
-                "Simples Nacional": dados_dre.get("Simples Nacional", 0.0),
-                "Outros Tributos de Deduções de Vendas": dados_dre.get("Outros Tributos de Deduções de Vendas", 0.0),
-                "Devoluções de Vendas": dados_dre.get("Devoluções de Vendas", 0.0),
-                "Custos com Produtos e Serviços": dados_dre.get("Custos com Produtos e Serviços", 0.0),
-                "Custos Comerciais": dados_dre.get("Custos Comerciais", 0.0),
-                "Despesas Administrativas": dados_dre.get("Despesas Administrativas", 0.0),
-                "Despesas com Pessoal": dados_dre.get("Despesas com Pessoal", 0.0),
-                "Despesas com Serviços de Terceiros": dados_dre.get("Despesas com Serviços de Terceiros", 0.0),
-                "Despesas com Materiais e Equipamentos": dados_dre.get("Despesas com Materiais e Equipamentos", 0.0),
-                "Despesas de Marketing": dados_dre.get("Despesas de Marketing", 0.0),
-                "Despesas com Desenvolvimento Empresarial": dados_dre.get("Despesas com Desenvolvimento Empresarial", 0.0),
-                "Receitas Financeiras": dados_dre.get("Receitas Financeiras", 0.0),
-                "Rendimentos de Aplicações": dados_dre.get("Rendimentos de Aplicações", 0.0),
-                "Despesas Financeiras": dados_dre.get("Despesas Financeiras", 0.0),
-                "Juros Bancários": dados_dre.get("Juros Bancários", 0.0),
-                "IRPJ": dados_dre.get("IRPJ", 0.0),
-                "CSLL": dados_dre.get("CSLL", 0.0),
-                "Investimento de Intangíveis": dados_dre.get("Investimento de Intangíveis", 0.0),
-                "Investimento em Imobilizado": dados_dre.get("Investimento em Imobilizado", 0.0),
-                "Investimentos em Bens Materiais": dados_dre.get("Investimentos em Bens Materiais", 0.0),
-                "Outras saídas não operacionais": dados_dre.get("Outras saídas não operacionais", 0.0),
-                "Empréstimos bancários": dados_dre.get("Empréstimos bancários", 0.0),
-                "Venda de Imobilizados": dados_dre.get("Venda de Imobilizados", 0.0),
-                "Devolução de Pagamentos": dados_dre.get("Devolução de Pagamentos", 0.0),
-                "Outras entradas não operacionais": dados_dre.get("Outras entradas não operacionais", 0.0),
-                "Perdas Jurídicas": dados_dre.get("Perdas Jurídicas", 0.0),
-                "Aplicações Financeiras": dados_dre.get("Aplicações Financeiras", 0.0),
-                "Pagamento de Empréstimos": dados_dre.get("Pagamento de Empréstimos", 0.0),
-                "Dívidas Passadas": dados_dre.get("Dívidas Passadas", 0.0),
-                "Outras saídas não operacionais": dados_dre.get("Outras saídas não operacionais", 0.0),
-                "Aporte": dados_dre.get("Capitalização dos sócios", 0.0),
-                "Distribuição de Lucros": dados_dre.get("Distribuição de Lucros", 0.0)
-                
-            }
+            return MOTOR_DRE.calcular(self._dados_dre(mes, empresa))
 
-            # Cálculos dos indicadores
-            faturamento = (valores["Receita de Vendas de Produtos"] + valores["Receita de Prestação de Serviços"])
-            deducoes_receita_bruta = (valores["Descontos Incondicionais"] + valores["ICMS"] + valores["PIS"] +
-                                    valores["COFINS"] + valores["ISS"] +
-                                    valores["Outros Tributos de Deduções de Vendas"] + valores["Devoluções de Vendas"])
-            custos_variaveis = (valores["Custos com Produtos e Serviços"] + valores["Custos Comerciais"])
-            despesas_fixas = (valores["Despesas Administrativas"] + valores["Despesas com Pessoal"] +
-                            valores["Despesas com Serviços de Terceiros"] + valores["Despesas com Materiais e Equipamentos"] +
-                            valores["Despesas de Marketing"] + valores["Despesas com Desenvolvimento Empresarial"])
-            custos_variaveis_deducoes = custos_variaveis + deducoes_receita_bruta
-            receitas_financeiras = valores["Receitas Financeiras"] + valores["Rendimentos de Aplicações"]
-            despesas_financeiras = valores["Despesas Financeiras"] + valores["Juros Bancários"]
-            impostos = (valores["IRPJ"] + valores["CSLL"] + valores["Simples Nacional"])
-            lucro_operacional = (faturamento + deducoes_receita_bruta + custos_variaveis + despesas_fixas +
-                                receitas_financeiras + despesas_financeiras + impostos)
-            investimentos = valores["Investimentos em Bens Materiais"] + valores["Investimento em Imobilizado"] + valores["Investimento de Intangíveis"]
-            entradas_nao_operacionais = valores["Empréstimos bancários"] + valores["Venda de Imobilizados"] + valores["Devolução de Pagamentos"] + valores["Outras entradas não operacionais"]
-            saidas_nao_operacionais = valores["Perdas Jurídicas"] + valores["Aplicações Financeiras"] + valores["Pagamento de Empréstimos"] + valores["Dívidas Passadas"] + valores["Outras saídas não operacionais"]
-            aporte = valores["Aporte"]
-            distribuicao_de_lucros = valores["Distribuição de Lucros"]
-            lucro_liquido = (faturamento + deducoes_receita_bruta + custos_variaveis + despesas_fixas + receitas_financeiras + despesas_financeiras 
-                             + impostos + investimentos +entradas_nao_operacionais + saidas_nao_operacionais + aporte + distribuicao_de_lucros)
-            ebitda = (faturamento + deducoes_receita_bruta + custos_variaveis + despesas_fixas)
-            #ebitda = (receitas_financeiras + despesas_financeiras + impostos)
-            # Lista única de indicadores com análise vertical (av_dre)
-            indicadores = [
-                {"indicador": "Faturamento", "valor": round(faturamento, 2)},
-                {"indicador": "Deduções da Receita Bruta", "valor": round(deducoes_receita_bruta, 2)},
-                {"indicador": "Custos Variáveis", "valor": round(custos_variaveis, 2)},
-                {"indicador": "Despesas Fixas", "valor": round(despesas_fixas, 2)},
-                {"indicador": "EBITDA", "valor": round(ebitda, 2)},
-                {"indicador": "Custos Variáveis + Deduções da Receita", "valor": round(custos_variaveis_deducoes, 2)},
-                {"indicador": "Custos com Produtos e Serviços", "valor": round(valores["Custos com Produtos e Serviços"], 2)},
-                {"indicador": "Lucro Operacional", "valor": round(lucro_operacional, 2)},
-                {"indicador": "Lucro Líquido", "valor": round(lucro_liquido, 2)}
-            ]
+    def calcular_indicadores_dre_lote(self, meses: List[date],
+                                      empresas: Optional[List[Optional[str]]] = None
+                                      ) -> Dict[date, Dict[Optional[str], List[Dict[str, Any]]]]:
+        """Indicadores do DRE de várias empresas e meses em uma consulta e uma passada vetorizada.
 
-            # Calcular análise vertical (av_dre) para cada indicador
-            for indicador in indicadores:
-                if faturamento != 0:
-                    av_dre = (indicador["valor"] / faturamento) * 100
-                else:
-                    av_dre = 0.0
-                indicador["av_dre"] = round(av_dre, 1)  # Arredondar para 1 casa decimal, conforme o Figma
+        Os meses ainda não carregados vêm de um único `carregar_dre`; os valores formam uma
+        matriz (empresa × mês × categoria) avaliada pelo `MOTOR_DRE` de uma vez.
 
-            return indicadores
+        Args:
+            meses: Datas dos meses a serem calculados.
+            empresas: Empresas desejadas (None = consolidado e todas as empresas com lançamentos).
+
+        Returns:
+            Dicionário mês -> empresa (None = consolidado) -> registros de `calcular_indicadores_dre`.
+        """
+        meses = sorted({m.replace(day=1) for m in meses})
+        faltantes = [m for m in meses if m not in self._dre_por_empresa]
+        if faltantes:
+            self.carregar_dre(faltantes)
+        if empresas is None:
+            empresas = [None] + sorted({e for m in meses for e in self._dre_por_empresa[m] if e is not None})
+        empresas = [e or None for e in empresas]
+
+        dados = [self._dre_por_empresa[m].get(e, {}) for e in empresas for m in meses]
+        matriz = MOTOR_DRE.matriz(dados).reshape(len(empresas), len(meses), len(MOTOR_DRE.categorias))
+        avaliados = MOTOR_DRE.avaliar(matriz)
+        return {
+            mes: {empresa: MOTOR_DRE.registros(avaliados[i, j]) for i, empresa in enumerate(empresas)}
+            for j, mes in enumerate(meses)
+        }
 
   #indicadores do b.i:
+    @memoizar
     def calcular_indicadores_operacionais(self, mes: date) -> List[Dict[str, Any]]:
         """Calcula os indicadores operacionais e seus valores para um cliente e mês específico, somando valores de indicadores com o mesmo nome.
 
@@ -1363,7 +1232,7 @@ class Indicadores:
         Returns:
             Lista de dicionários com 'indicador', 'total_valor', 'bom', 'ruim', 'sentido' e 'unidade'.
         """
-        query = text("""
+        query = text(f"""
             SELECT
                 indicador,
                 bom,
@@ -1373,8 +1242,7 @@ class Indicadores:
                 COALESCE(SUM(valor), 0) AS total_valor
             FROM indicador
             WHERE id_cliente = ANY (:id_cliente)
-              AND EXTRACT(YEAR FROM data) = :year
-              AND EXTRACT(MONTH FROM data) = :month
+              AND {filtro_periodo()}
               AND bom IS NOT NULL
               AND ruim IS NOT NULL
             GROUP BY indicador, bom, ruim, sentido, unidade
@@ -1382,11 +1250,10 @@ class Indicadores:
         """)
         params = {
             "id_cliente": self.id_cliente,
-            "year": mes.year,
-            "month": mes.month
+            **periodo_mes(mes),
         }
         try:
-            result = self.db.execute_query(query, params)
+            result = self._consultar(query, params)
             return [
                 {
                     "indicador": row["indicador"],
@@ -1396,7 +1263,7 @@ class Indicadores:
                     "sentido": row["sentido"],
                     "unidade": row["unidade"]
                 }
-                for _, row in result.iterrows()
-            ] if not result.empty else []
+                for row in result
+            ] if result else []
         except Exception as e:
             raise RuntimeError(f"Erro ao calcular indicadores operacionais: {str(e)}")
@@ -0,0 +1,124 @@
+# src/core/modelos.py
+"""
+Modelo tipado dos dados dos relatórios de fluxo de caixa (1 a 5).
+
+`Categoria` e `Subcategoria` substituem os dicionários literais com chaves repetidas
+que `calcular_outras_categorias`, as classes de relatório e os renderizadores montavam.
+São subclasses de `dict` com `__slots__` vazio (nenhum atributo além do próprio
+dicionário) e campos declarados: a criação confere os campos obrigatórios e recusa
+campos desconhecidos, e os valores também podem ser lidos como atributo (`item.valor`).
+
+Como continuam sendo dicionários, `json.dumps`, `isinstance(item, dict)`, os
+renderizadores e os templates tratam as instâncias como antes. Só entram as chaves
+informadas na criação, inclusive as informadas com None, exatamente como nos
+dicionários literais (ex.: a categoria "Saídas Não Operacionais" não tem subcategorias).
+
+O pacote inteiro de um relatório, (dados, notas), pode ser serializado em bytes com
+`serializar_relatorio`, para guardar em cache ou enviar para outro processo. Para
+comparar dois relatórios, `como_dict` devolve a mesma estrutura com dicionários simples.
+"""
+
+import pickle
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+class _Registro(dict):
+    """Dicionário com os campos anotados na subclasse (nomes e ordem dos argumentos posicionais).
+
+    Campos listados em `_opcionais` podem ficar de fora; os demais são obrigatórios.
+    """
+
+    __slots__ = ()
+    _campos: Tuple[str, ...] = ()
+    _opcionais: Tuple[str, ...] = ()
+    _permitidos: FrozenSet[str] = frozenset()
+    _obrigatorios: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._campos = tuple(cls.__dict__.get("__annotations__", {}))
+        cls._permitidos = frozenset(cls._campos)
+        cls._obrigatorios = frozenset(cls._campos) - frozenset(cls._opcionais)
+
+    def __init__(self, *args: Any, **campos: Any) -> None:
+        if args:
+            if len(args) > len(self._campos):
+                raise TypeError(f"{type(self).__name__}() recebeu {len(args)} argumentos posicionais; máximo {len(self._campos)}")
+            repetidos = [campo for campo in self._campos[:len(args)] if campo in campos]
+            if repetidos:
+                raise TypeError(f"{type(self).__name__}() recebeu o(s) campo(s) {', '.join(repetidos)} duas vezes")
+            campos = {**dict(zip(self._campos, args)), **campos}
+        chaves = campos.keys()
+        if not chaves <= self._permitidos:
+            raise TypeError(f"{type(self).__name__}() não tem o(s) campo(s) {', '.join(chaves - self._permitidos)}")
+        if not self._obrigatorios <= chaves:
+            raise TypeError(f"{type(self).__name__}() sem o(s) campo(s) obrigatório(s) {', '.join(self._obrigatorios - chaves)}")
+        # Chaves na ordem em que foram informadas, como no dicionário literal equivalente
+        super().__init__(campos)
+
+    def __getattr__(self, nome: str) -> Any:
+        # Chamado apenas para nomes que não são atributos da classe: os campos
+        if nome in self._campos:
+            return self.get(nome)
+        raise AttributeError(f"'{type(self).__name__}' não tem o atributo '{nome}'")
+
+    def __setitem__(self, chave: str, valor: Any) -> None:
+        if chave not in self._campos:
+            raise KeyError(chave)
+        super().__setitem__(chave, valor)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({super().__repr__()})"
+
+
+class Subcategoria(_Registro):
+    """Linha de uma categoria: valor, AV, AH e representatividade (barra_rep apenas no relatório 5)."""
+
+    __slots__ = ()
+    _opcionais = ("barra_rep",)
+
+    subcategoria: str
+    valor: float
+    av: float
+    ah: float
+    representatividade: float
+    barra_rep: Optional[float]
+
+
+class Categoria(_Registro):
+    """Bloco de um relatório (ex.: Receitas, Custos Variáveis) com o total e as subcategorias."""
+
+    __slots__ = ()
+    _opcionais = ("av_categoria", "subcategorias", "analise_temporal")
+
+    categoria: str
+    valor: float
+    av_categoria: Optional[float]
+    subcategorias: List[Subcategoria]
+    analise_temporal: Dict[str, Any]
+
+
+def como_dict(dados: Any) -> Any:
+    """Converte recursivamente `Categoria`/`Subcategoria` (em listas, tuplas e dicts) para dicionários simples."""
+    if isinstance(dados, dict):
+        return {chave: como_dict(valor) for chave, valor in dados.items()}
+    if isinstance(dados, (list, tuple)):
+        return type(dados)(como_dict(valor) for valor in dados)
+    return dados
+
+
+def serializar_relatorio(dados: Any) -> bytes:
+    """Serializa os dados de um relatório (ex.: a tupla (categorias, notas)) em bytes.
+
+    O pickle grava cada nome de campo uma única vez (as repetições viram referências),
+    de modo que as chaves repetidas das categorias quase não pesam no resultado.
+    """
+    return pickle.dumps(dados, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def desserializar_relatorio(conteudo: bytes) -> Any:
+    """Reconstrói os dados serializados por `serializar_relatorio`.
+
+    Usa pickle: só deve receber bytes gerados pela própria aplicação (cache, fila de workers).
+    """
+    return pickle.loads(conteudo)
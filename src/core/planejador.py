@@ -0,0 +1,165 @@
+# src/core/planejador.py
+"""
+Planejador das consultas dos relatórios.
+
+Cada classe `RelatorioN` declara, em `requisitos(...)`, os cálculos de `Indicadores` de que
+precisa (método, argumentos, origem e meses lidos). O planejador junta os requisitos dos
+relatórios escolhidos, remove os repetidos e busca tudo de uma vez no agrupamento mais barato:
+
+- fc: um único snapshot cobrindo a união dos meses (e os meses base do AH);
+- dre: um único lote (`carregar_dre`) com todos os meses, consolidado e por empresa;
+- demais origens (ex.: indicador): uma consulta por requisito distinto.
+
+As cargas rodam em paralelo; em seguida cada requisito é calculado uma única vez e fica na
+memoização de `Indicadores`. Os relatórios continuam chamando `Indicadores` diretamente, com
+os mesmos argumentos declarados: é a memoização que entrega a cada um a sua parte dos dados,
+sem nova consulta. Um relatório novo só precisa declarar os seus requisitos: o que ele tiver
+em comum com os demais não gera trabalho repetido no banco.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from dateutil.relativedelta import relativedelta
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.core.indicadores import Indicadores
+
+
+class Requisito(NamedTuple):
+    """Um cálculo de `Indicadores` de que um relatório precisa.
+
+    Attributes:
+        indicador: Nome do método de `Indicadores` (ex.: 'calcular_receitas_fc').
+        args: Argumentos posicionais, iguais aos usados por `gerar_relatorio` (inclui o filtro),
+            para casar com a memoização.
+        origem: Tabela de origem ('fc', 'dre' ou 'indicador').
+        meses: Meses calculados; no fc, o mês anterior de cada um (base do AH) também é lido.
+    """
+    indicador: str
+    args: tuple
+    origem: str
+    meses: Tuple[date, ...]
+
+
+def requisito_fc(indicador: str, *args: Any, meses: Optional[Tuple[date, ...]] = None) -> Requisito:
+    """Requisito do fc; por padrão, o mês calculado é o primeiro argumento."""
+    return Requisito(indicador, args, "fc", meses or (args[0],))
+
+
+class PlanoRelatorios:
+    """Requisitos distintos dos relatórios escolhidos e os requisitos de cada relatório."""
+
+    def __init__(self, por_relatorio: Dict[Any, List[Requisito]]):
+        self.por_relatorio = por_relatorio
+        # União sem repetidos, na ordem de declaração
+        self.requisitos: List[Requisito] = list(dict.fromkeys(
+            requisito for requisitos in por_relatorio.values() for requisito in requisitos
+        ))
+
+    def meses(self, origem: str) -> List[date]:
+        """Meses distintos calculados pelos requisitos de uma origem, em ordem crescente."""
+        return sorted({m.replace(day=1) for r in self.requisitos if r.origem == origem for m in r.meses})
+
+    def janela_fc(self) -> Optional[Tuple[date, date]]:
+        """(início, fim) do snapshot do fc: da base do AH do mês mais antigo ao mês mais recente."""
+        meses = self.meses("fc")
+        if not meses:
+            return None
+        return meses[0] - relativedelta(months=1), meses[-1]
+
+    def resumo(self) -> Dict[str, int]:
+        """Quantidade de requisitos declarados e distintos (a diferença é o trabalho que deixou de ser repetido)."""
+        declarados = sum(len(r) for r in self.por_relatorio.values())
+        return {"declarados": declarados, "distintos": len(self.requisitos)}
+
+
+class PlanejadorRelatorios:
+    """Planeja e executa as consultas de um conjunto de relatórios sobre uma instância de `Indicadores`.
+
+    Args:
+        indicadores: Instância de Indicadores compartilhada pelos relatórios.
+    """
+
+    def __init__(self, indicadores: Indicadores):
+        self.indicadores = indicadores
+        # Cargas em lote já feitas (ou tentadas): ('fc', janela) e ('dre', meses)
+        self._cargas_feitas: set = set()
+
+    @staticmethod
+    def planejar(relatorios: Dict[Any, Any], mes_atual: date, mes_anterior: date,
+                 filtros: Iterable[Tuple[Optional[str], Optional[str]]] = ((None, None),)) -> PlanoRelatorios:
+        """Junta os requisitos declarados pelas classes de relatório.
+
+        Args:
+            relatorios: {chave do relatório: classe}; classes sem `requisitos` não consultam Indicadores.
+            mes_atual: Mês do relatório.
+            mes_anterior: Mês anterior (base do AH).
+            filtros: Pares (centro_custo, empresa) a planejar; um par por PDF (ex.: um por centro no ZIP).
+
+        Returns:
+            O plano, com os requisitos de cada relatório e a união sem repetidos.
+        """
+        por_relatorio: Dict[Any, List[Requisito]] = {}
+        for centro_custo, empresa in filtros:
+            for chave, classe in relatorios.items():
+                if not hasattr(classe, "requisitos"):
+                    continue
+                requisitos = classe.requisitos(mes_atual, mes_anterior, centro_custo=centro_custo, empresa=empresa)
+                por_relatorio.setdefault(chave, []).extend(requisitos)
+        return PlanoRelatorios(por_relatorio)
+
+    def executar(self, plano: PlanoRelatorios, chave: Any = None) -> int:
+        """Busca os dados do plano: cargas em lote em paralelo e, depois, cada requisito distinto uma vez.
+
+        Com `chave`, busca apenas o que o relatório indicado usa, para que a geração possa ser
+        feita relatório a relatório (ex.: renderizar o primeiro enquanto o seguinte consulta o
+        banco). As cargas em lote cobrem sempre o plano inteiro e são feitas uma única vez.
+
+        Falhas de carga apenas levam os requisitos de volta às consultas individuais; falhas de
+        requisitos não são memoizadas e o relatório repete a chamada e trata o erro como antes.
+
+        Returns:
+            Quantidade de requisitos que falharam.
+        """
+        indicadores = self.indicadores
+        requisitos = plano.requisitos if chave is None else list(dict.fromkeys(plano.por_relatorio.get(chave, [])))
+        origens = {r.origem for r in requisitos}
+        cargas = []
+        janela = plano.janela_fc()
+        if "fc" in origens and janela is not None and ("fc", janela) not in self._cargas_feitas:
+            self._cargas_feitas.add(("fc", janela))
+            cargas.append((self._carregar_fc, janela))
+        meses_dre = tuple(plano.meses("dre"))
+        if "dre" in origens and meses_dre and ("dre", meses_dre) not in self._cargas_feitas:
+            self._cargas_feitas.add(("dre", meses_dre))
+            cargas.append((self._carregar_dre, (list(meses_dre),)))
+        # Requisitos de outras origens não têm carga em lote: entram junto com as cargas
+        avulsos = [r for r in requisitos if r.origem not in ("fc", "dre")]
+        falhas = indicadores.calcular_em_paralelo(cargas + [self._chamada(r) for r in avulsos])
+
+        # fc e dre já estão em memória: cada requisito é calculado uma vez e memoizado
+        em_lote = [r for r in requisitos if r.origem in ("fc", "dre")]
+        falhas += indicadores.calcular_em_paralelo([self._chamada(r) for r in em_lote])
+        return falhas
+
+    def _chamada(self, requisito: Requisito) -> tuple:
+        return getattr(self.indicadores, requisito.indicador), requisito.args
+
+    def _carregar_fc(self, inicio: date, fim: date) -> None:
+        try:
+            self.indicadores.carregar_snapshot(inicio, fim)
+        except Exception as e:
+            logging.warning(f"Snapshot do fluxo de caixa indisponível, usando consultas individuais: {str(e)}")
+
+    def _carregar_dre(self, meses: List[date]) -> None:
+        try:
+            self.indicadores.carregar_dre(meses)
+        except Exception as e:
+            logging.warning(f"DRE em lote indisponível, usando consultas individuais: {str(e)}")
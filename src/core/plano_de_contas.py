@@ -0,0 +1,115 @@
+# src/core/plano_de_contas.py
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.database.db_utils import DatabaseConnection
+from src.core.snapshot_fc import somar
+
+# Versão do plano de cada cliente: quantidade de linhas e hash do conteúdo
+QUERY_VERSAO_PLANO = text("""
+    SELECT
+      id_cliente,
+      COUNT(*) AS linhas,
+      md5(string_agg(COALESCE(nivel_3_id, '') || '|' || COALESCE(nivel_2, ''), ',' ORDER BY nivel_3_id, nivel_2)) AS hash
+    FROM plano_de_contas
+    WHERE id_cliente = ANY (:id_cliente)
+    GROUP BY id_cliente;
+""")
+
+QUERY_PLANO = text("""
+    SELECT id_cliente, nivel_3_id, nivel_2
+    FROM plano_de_contas
+    WHERE id_cliente = ANY (:id_cliente)
+      AND nivel_3_id IS NOT NULL;
+""")
+
+
+class CachePlanoDeContas:
+    """Mapeamento nivel_3_id -> nivel_2 do plano de contas, por cliente, compartilhado no processo.
+
+    O plano muda raramente: a cada uso, uma sonda barata (contagem e hash por cliente) decide
+    quais clientes precisam ser recarregados. O mapeamento reproduz o
+    `JOIN plano_de_contas p ON f.id_cliente = p.id_cliente AND text(f.nivel_3_id) = p.nivel_3_id`,
+    inclusive linhas duplicadas no plano (cada ocorrência conta uma vez).
+    """
+
+    def __init__(self):
+        self._planos: Dict[int, Tuple[Any, Dict[str, List[Optional[str]]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def versoes(db: DatabaseConnection, id_cliente: Iterable[int]) -> Dict[int, Tuple[int, Optional[str]]]:
+        """Versão do plano de cada cliente, {id_cliente: (linhas, hash)}; (0, None) para clientes sem plano."""
+        clientes = sorted(set(id_cliente))
+        versoes = {
+            linha.id_cliente: (linha.linhas, linha.hash)
+            for linha in db.fetch_rows(QUERY_VERSAO_PLANO, {"id_cliente": clientes})
+        }
+        return {c: versoes.get(c, (0, None)) for c in clientes}
+
+    def mapa(self, db: DatabaseConnection, id_cliente: Iterable[int],
+             versoes: Optional[Dict[int, Tuple[int, Optional[str]]]] = None) -> Dict[Tuple[int, str], List[Optional[str]]]:
+        """Retorna {(id_cliente, nivel_3_id): [nivel_2, ...]} dos clientes, recarregando os desatualizados.
+
+        `versoes` (de `versoes`) evita repetir a sonda quando o chamador já a consultou.
+        """
+        clientes = sorted(set(id_cliente))
+        if versoes is None:
+            versoes = self.versoes(db, clientes)
+        with self._lock:
+            desatualizados = [
+                c for c in clientes
+                if c not in self._planos or self._planos[c][0] != versoes.get(c, (0, None))
+            ]
+        if desatualizados:
+            novos: Dict[int, Dict[str, List[Optional[str]]]] = {c: {} for c in desatualizados}
+            for linha in db.fetch_rows(QUERY_PLANO, {"id_cliente": desatualizados}):
+                novos[linha.id_cliente].setdefault(linha.nivel_3_id, []).append(linha.nivel_2)
+            with self._lock:
+                for c in desatualizados:
+                    self._planos[c] = (versoes.get(c, (0, None)), novos[c])
+        with self._lock:
+            return {
+                (c, nivel_3_id): niveis_2
+                for c in clientes
+                for nivel_3_id, niveis_2 in self._planos[c][1].items()
+            }
+
+    def limpar(self) -> None:
+        """Descarta todos os planos guardados."""
+        with self._lock:
+            self._planos.clear()
+
+
+_cache_plano = CachePlanoDeContas()
+
+
+def obter_cache_plano() -> CachePlanoDeContas:
+    """Retorna o cache de plano de contas do processo."""
+    return _cache_plano
+
+
+def somar_por_nivel_2(linhas: Iterable[Tuple[int, Optional[str], Any]],
+                      mapa: Dict[Tuple[int, str], List[Optional[str]]]) -> Dict[Optional[str], Any]:
+    """Agrupa somas por (id_cliente, nivel_3_id) em somas por nivel_2, como o JOIN com o plano de contas.
+
+    Args:
+        linhas: Tuplas (id_cliente, nivel_3_id em texto, soma).
+        mapa: Mapeamento retornado por `CachePlanoDeContas.mapa`.
+
+    Returns:
+        {nivel_2: soma}; nivel_3_id sem correspondência no plano é descartado (JOIN interno).
+    """
+    grupos: Dict[Optional[str], List[Any]] = {}
+    for id_cliente, nivel_3_id, valor in linhas:
+        for nivel_2 in mapa.get((id_cliente, nivel_3_id), []):
+            grupos.setdefault(nivel_2, []).append(valor)
+    return {nivel_2: somar(valores) for nivel_2, valores in grupos.items()}
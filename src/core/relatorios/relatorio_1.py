@@ -2,8 +2,10 @@
 from datetime import date
 from typing import Optional, List, Dict, Any
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito, requisito_fc
 from dateutil.relativedelta import relativedelta
-from src.core.utils import calcular_outras_categorias, safe_float
+from src.core.utils import calcular_outras_categorias_lote, safe_float
+from src.core.modelos import Categoria
 import math
 
 class Relatorio1:
@@ -21,6 +23,17 @@ class Relatorio1:
         except (TypeError, ValueError):
             return default
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        mes_anterior = mes_anterior or mes_atual - relativedelta(months=1)
+        return [
+            requisito_fc(indicador, mes, categoria, centro_custo)
+            for mes in (mes_atual, mes_anterior)
+            for indicador, categoria in (("calcular_receitas_fc", '3.%'), ("calcular_custos_variaveis_fc", '4.%'))
+        ]
+
     def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Generates Report 1 with revenues, variable costs, and their representativeness.
 
@@ -47,31 +60,33 @@ class Relatorio1:
         receita_total_anterior = sum(self.safe_float(r.get('total_categoria', 0)) for r in receitas_mes_anterior) if receitas_mes_anterior else 0
         custos_total_anterior = sum(self.safe_float(c.get('total_categoria', 0)) for c in custos_mes_anterior) if custos_mes_anterior else 0
 
-        # Calculate subcategories with "Outras categorias" for Receitas
-        receitas_categoria = calcular_outras_categorias(
-            items=receitas,
-            items_anterior=receitas_mes_anterior,
-            total_atual=receita_total,
-            total_anterior=receita_total_anterior,
-            receita_total=receita_total,  # Pass receita_total for AV calculation
-            chave_valor="total_categoria",
-            chave_nome="categoria_nivel_3",
-            top_n=3,
-            usar_valor_abs=False
-        )
-
-        # Calculate subcategories with "Outras categorias" for Custos Variáveis
-        custos_variaveis = calcular_outras_categorias(
-            items=custos,
-            items_anterior=custos_mes_anterior,
-            total_atual=custos_total,
-            total_anterior=custos_total_anterior,
-            receita_total=receita_total,  # Pass receita_total for AV calculation
-            chave_valor="total_categoria",
-            chave_nome="nivel_2",
-            top_n=3,
-            usar_valor_abs=True
-        )
+        # Calculate subcategories with "Outras categorias" for Receitas and Custos Variáveis (single batch)
+        receitas_categoria, custos_variaveis = calcular_outras_categorias_lote([
+            # Receitas
+            dict(
+                items=receitas,
+                items_anterior=receitas_mes_anterior,
+                total_atual=receita_total,
+                total_anterior=receita_total_anterior,
+                receita_total=receita_total,  # Pass receita_total for AV calculation
+                chave_valor="total_categoria",
+                chave_nome="categoria_nivel_3",
+                top_n=3,
+                usar_valor_abs=False
+            ),
+            # Custos Variáveis
+            dict(
+                items=custos,
+                items_anterior=custos_mes_anterior,
+                total_atual=custos_total,
+                total_anterior=custos_total_anterior,
+                receita_total=receita_total,  # Pass receita_total for AV calculation
+                chave_valor="total_categoria",
+                chave_nome="nivel_2",
+                top_n=3,
+                usar_valor_abs=True
+            ),
+        ])
 
         # Identify the most representative categories
         receitas_ordenadas = sorted(receitas_categoria, key=lambda x: x['representatividade'], reverse=True)
@@ -100,16 +115,16 @@ class Relatorio1:
             notas_automatizadas = "Não há dados disponíveis para o período selecionado."
 
         return [
-            {
-                "categoria": "Receitas",
-                "valor": receita_total,
-                "subcategorias": receitas_categoria,
-            },
-            {
-                "categoria": "Custos Variáveis",
-                "valor": custos_total,
-                "subcategorias": custos_variaveis,
-            }
+            Categoria(
+                categoria="Receitas",
+                valor=receita_total,
+                subcategorias=receitas_categoria,
+            ),
+            Categoria(
+                categoria="Custos Variáveis",
+                valor=custos_total,
+                subcategorias=custos_variaveis,
+            )
         ], {
             "notas": notas_automatizadas
         }
\ No newline at end of file
@@ -2,14 +2,27 @@
 from datetime import date
 from typing import Optional, List, Dict, Any
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito, requisito_fc
 from dateutil.relativedelta import relativedelta
-from src.core.utils import calcular_outras_categorias, safe_float
+from src.core.utils import calcular_outras_categorias_lote, safe_float
+from src.core.modelos import Categoria
 
 class Relatorio2:
     def __init__(self, indicadores: Indicadores, nome_cliente: str):
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        mes_anterior = mes_anterior or mes_atual - relativedelta(months=1)
+        return [
+            requisito_fc(indicador, mes, centro_custo)
+            for mes in (mes_atual, mes_anterior)
+            for indicador in ("calcular_lucro_bruto_fc", "calcular_despesas_fixas_fc")
+        ]
+
     def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Gera o relatório 2 com lucro bruto, despesas fixas e suas representatividades.
 
@@ -43,31 +56,33 @@ class Relatorio2:
         lucro_bruto_anterior_total = receita_total_anterior - custos_total_anterior
         despesas_fixas_anterior_total = sum(abs(r['valor']) for r in despesas_fixas_anterior) if despesas_fixas_anterior else 0
 
-        # Calcula subcategorias com "Outras categorias" para Lucro Bruto
-        lucro_bruto_categorias = calcular_outras_categorias(
-            items=lucro_bruto,
-            items_anterior=lucro_bruto_anterior,
-            total_atual=lucro_bruto_total,
-            total_anterior=lucro_bruto_anterior_total,
-            receita_total=receita_total,
-            chave_valor="valor",
-            chave_nome="categoria",
-            top_n=3,
-            usar_valor_abs=False
-        )
-
-        # Calcula subcategorias com "Outras categorias" para Despesas Fixas
-        despesas_fixas_categorias = calcular_outras_categorias(
-            items=despesas_fixas,
-            items_anterior=despesas_fixas_anterior,
-            total_atual=despesas_fixas_total,
-            total_anterior=despesas_fixas_anterior_total,
-            receita_total=receita_total,
-            chave_valor="valor",
-            chave_nome="categoria",
-            top_n=3,
-            usar_valor_abs=True
-        )
+        # Calcula as subcategorias com "Outras categorias" de todas as seções em um único lote
+        lucro_bruto_categorias, despesas_fixas_categorias = calcular_outras_categorias_lote([
+            # Lucro Bruto
+            dict(
+                items=lucro_bruto,
+                items_anterior=lucro_bruto_anterior,
+                total_atual=lucro_bruto_total,
+                total_anterior=lucro_bruto_anterior_total,
+                receita_total=receita_total,
+                chave_valor="valor",
+                chave_nome="categoria",
+                top_n=3,
+                usar_valor_abs=False
+            ),
+            # Despesas Fixas
+            dict(
+                items=despesas_fixas,
+                items_anterior=despesas_fixas_anterior,
+                total_atual=despesas_fixas_total,
+                total_anterior=despesas_fixas_anterior_total,
+                receita_total=receita_total,
+                chave_valor="valor",
+                chave_nome="categoria",
+                top_n=3,
+                usar_valor_abs=True
+            ),
+        ])
 
         # Calcula AV para lucro bruto (em relação à receita total)
         lucro_bruto_av = round((lucro_bruto_total / receita_total * 100) if receita_total != 0 else 0, 2)
@@ -106,18 +121,18 @@ class Relatorio2:
             notas_automatizadas = "Não há dados disponíveis para o período selecionado."
 
         return [
-            {
-                "categoria": "Lucro Bruto",
-                "valor": lucro_bruto_total,
-                "av_categoria": lucro_bruto_av,
-                "subcategorias": lucro_bruto_categorias,
-            },
-            {
-                "categoria": "Despesas Fixas",
-                "valor": -despesas_fixas_total,  # Despesas são negativas
-                "av_categoria": despesas_fixas_av,
-                "subcategorias": despesas_fixas_categorias,
-            }
+            Categoria(
+                categoria="Lucro Bruto",
+                valor=lucro_bruto_total,
+                av_categoria=lucro_bruto_av,
+                subcategorias=lucro_bruto_categorias,
+            ),
+            Categoria(
+                categoria="Despesas Fixas",
+                valor=-despesas_fixas_total,  # Despesas são negativas
+                av_categoria=despesas_fixas_av,
+                subcategorias=despesas_fixas_categorias,
+            )
         ], {
             "notas": notas_automatizadas
         }
\ No newline at end of file
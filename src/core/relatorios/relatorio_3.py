@@ -2,14 +2,27 @@
 from datetime import date
 from typing import Optional, List, Dict, Any
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito, requisito_fc
 from dateutil.relativedelta import relativedelta
-from src.core.utils import calcular_outras_categorias, safe_float
+from src.core.utils import calcular_outras_categorias_lote, safe_float
+from src.core.modelos import Categoria
 
 class Relatorio3:
     def __init__(self, indicadores: Indicadores, nome_cliente: str):
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        mes_anterior = mes_anterior or mes_atual - relativedelta(months=1)
+        return [
+            requisito_fc(indicador, mes, base, centro_custo, meses=(mes, base) if base else (mes,))
+            for mes, base in ((mes_atual, mes_anterior), (mes_anterior, None))
+            for indicador in ("calcular_lucro_operacional_fc", "calcular_investimentos_fc")
+        ]
+
     def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Gera o relatório 3 com lucro operacional, investimentos e suas representatividades.
 
@@ -50,31 +63,33 @@ class Relatorio3:
         lucro_operacional_anterior = receita_anterior - custos_variaveis_anterior - despesas_fixas_anterior
         investimentos_anterior = sum(abs(safe_float(r['valor'])) for r in investimentos_anterior_resultado)
 
-        # Calcular subcategorias com "Outras categorias" para Lucro Operacional
-        lucro_operacional_categorias = calcular_outras_categorias(
-            items=lucro_operacional_resultado,
-            items_anterior=lucro_operacional_anterior_resultado,
-            total_atual=lucro_operacional_atual,
-            total_anterior=lucro_operacional_anterior,
-            receita_total=receita_atual,
-            chave_valor="valor",
-            chave_nome="categoria",
-            top_n=3,
-            usar_valor_abs=False  # Ordenação natural para Receita, Custos, Despesas
-        )
-
-        # Calcular subcategorias com "Outras categorias" para Investimentos
-        investimentos_categorias = calcular_outras_categorias(
-            items=investimentos_resultado,
-            items_anterior=investimentos_anterior_resultado,
-            total_atual=investimentos_atual,
-            total_anterior=investimentos_anterior,
-            receita_total=receita_atual,
-            chave_valor="valor",
-            chave_nome="categoria",
-            top_n=3,
-            usar_valor_abs=True  # Ordenação por valor absoluto
-        )
+        # Calcula as subcategorias com "Outras categorias" de todas as seções em um único lote
+        lucro_operacional_categorias, investimentos_categorias = calcular_outras_categorias_lote([
+            # Lucro Operacional
+            dict(
+                items=lucro_operacional_resultado,
+                items_anterior=lucro_operacional_anterior_resultado,
+                total_atual=lucro_operacional_atual,
+                total_anterior=lucro_operacional_anterior,
+                receita_total=receita_atual,
+                chave_valor="valor",
+                chave_nome="categoria",
+                top_n=3,
+                usar_valor_abs=False  # Ordenação natural para Receita, Custos, Despesas
+            ),
+            # Investimentos
+            dict(
+                items=investimentos_resultado,
+                items_anterior=investimentos_anterior_resultado,
+                total_atual=investimentos_atual,
+                total_anterior=investimentos_anterior,
+                receita_total=receita_atual,
+                chave_valor="valor",
+                chave_nome="categoria",
+                top_n=3,
+                usar_valor_abs=True  # Ordenação por valor absoluto
+            ),
+        ])
 
         # Calcula AV para lucro operacional
         lucro_operacional_av = round((lucro_operacional_atual / receita_atual * 100) if receita_atual != 0 else 0, 2)
@@ -112,18 +127,18 @@ class Relatorio3:
             notas_automatizadas = "Não há dados disponíveis para o período selecionado."
 
         return [
-            {
-                "categoria": "Lucro Operacional",
-                "valor": lucro_operacional_atual,
-                "av_categoria": lucro_operacional_av,
-                "subcategorias": lucro_operacional_categorias,
-            },
-            {
-                "categoria": "Investimentos",
-                "valor": investimentos_atual,
-                "av_categoria": investimentos_av,
-                "subcategorias": investimentos_categorias,
-            }
+            Categoria(
+                categoria="Lucro Operacional",
+                valor=lucro_operacional_atual,
+                av_categoria=lucro_operacional_av,
+                subcategorias=lucro_operacional_categorias,
+            ),
+            Categoria(
+                categoria="Investimentos",
+                valor=investimentos_atual,
+                av_categoria=investimentos_av,
+                subcategorias=investimentos_categorias,
+            )
         ], {
             "notas": notas_automatizadas
         }
\ No newline at end of file
@@ -4,13 +4,27 @@ from typing import Optional, List, Dict, Any
 import math
 from dateutil.relativedelta import relativedelta
 from src.core.indicadores import Indicadores
-from src.core.utils import calcular_outras_categorias, safe_float
+from src.core.planejador import Requisito, requisito_fc
+from src.core.utils import calcular_outras_categorias_lote, safe_float
+from src.core.modelos import Categoria
 
 class Relatorio4:
     def __init__(self, indicadores: Indicadores, nome_cliente: str):
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        mes_anterior = mes_anterior or mes_atual - relativedelta(months=1)
+        return [
+            requisito_fc(indicador, mes, centro_custo)
+            for mes in (mes_atual, mes_anterior)
+            for indicador in ("calcular_lucro_liquido_fc", "calcular_entradas_nao_operacionais_fc",
+                              "calcular_resultados_nao_operacionais_fc")
+        ]
+
     def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
         """Gera o relatório 4 com lucro líquido, entradas e resultados não operacionais.
 
@@ -62,46 +76,49 @@ class Relatorio4:
         entradas_nao_operacionais_anterior_total = sum(safe_float(e["total_valor"]) for e in entradas_nao_operacionais_anterior_resultado)
         resultados_nao_operacionais_anterior_total = sum(safe_float(r["total_valor"]) for r in resultados_nao_operacionais_anterior_resultado)
 
-        # Calcular subcategorias com "Outras categorias"
-        lucro_liquido_categorias = calcular_outras_categorias(
-            items=lucro_liquido_resultado,
-            items_anterior=lucro_liquido_anterior_resultado,
-            total_atual=lucro_liquido_atual,
-            total_anterior=lucro_liquido_anterior,
-            receita_total=receita_atual,
-            chave_valor="valor",
-            chave_nome="categoria",
-            top_n=4,  # Alterado de 3 para 4 para incluir todas as categorias: Receita, Custos Variáveis, Despesas Fixas, Investimentos
-            usar_valor_abs=False  # Ordenação natural para Receita, Custos, Despesas, Investimentos
-        )
-
-        entradas_nao_operacionais_categorias = calcular_outras_categorias(
-            items=[{"categoria_nivel_3": e["categoria_nivel_3"], "valor": e["total_valor"], "av": e["av"], "ah": e["ah"]} 
-                   for e in entradas_nao_operacionais_resultado],
-            items_anterior=[{"categoria_nivel_3": e["categoria_nivel_3"], "valor": e["total_valor"], "av": e["av"], "ah": e["ah"]} 
-                            for e in entradas_nao_operacionais_anterior_resultado],
-            total_atual=entradas_nao_operacionais_total,
-            total_anterior=entradas_nao_operacionais_anterior_total,
-            receita_total=receita_atual,
-            chave_valor="valor",
-            chave_nome="categoria_nivel_3",
-            top_n=3,
-            usar_valor_abs=True  # Ordenação por valor absoluto
-        )
-
-        resultados_nao_operacionais_categorias = calcular_outras_categorias(
-            items=[{"nivel_1": r["nivel_1"], "valor": r["total_valor"], "av": r["av"], "ah": r["ah"]} 
-                   for r in resultados_nao_operacionais_resultado],
-            items_anterior=[{"nivel_1": r["nivel_1"], "valor": r["total_valor"], "av": r["av"], "ah": r["ah"]} 
-                            for r in resultados_nao_operacionais_anterior_resultado],
-            total_atual=resultados_nao_operacionais_total,
-            total_anterior=resultados_nao_operacionais_anterior_total,
-            receita_total=receita_atual,
-            chave_valor="valor",
-            chave_nome="nivel_1",
-            top_n=3,
-            usar_valor_abs=True  # Ordenação por valor absoluto
-        )
+        # Calcula as subcategorias com "Outras categorias" de todas as seções em um único lote
+        lucro_liquido_categorias, entradas_nao_operacionais_categorias, resultados_nao_operacionais_categorias = calcular_outras_categorias_lote([
+            # Lucro Líquido
+            dict(
+                items=lucro_liquido_resultado,
+                items_anterior=lucro_liquido_anterior_resultado,
+                total_atual=lucro_liquido_atual,
+                total_anterior=lucro_liquido_anterior,
+                receita_total=receita_atual,
+                chave_valor="valor",
+                chave_nome="categoria",
+                top_n=4,  # Alterado de 3 para 4 para incluir todas as categorias: Receita, Custos Variáveis, Despesas Fixas, Investimentos
+                usar_valor_abs=False  # Ordenação natural para Receita, Custos, Despesas, Investimentos
+            ),
+            # Entradas Não Operacionais
+            dict(
+                items=[{"categoria_nivel_3": e["categoria_nivel_3"], "valor": e["total_valor"], "av": e["av"], "ah": e["ah"]} 
+                       for e in entradas_nao_operacionais_resultado],
+                items_anterior=[{"categoria_nivel_3": e["categoria_nivel_3"], "valor": e["total_valor"], "av": e["av"], "ah": e["ah"]} 
+                                for e in entradas_nao_operacionais_anterior_resultado],
+                total_atual=entradas_nao_operacionais_total,
+                total_anterior=entradas_nao_operacionais_anterior_total,
+                receita_total=receita_atual,
+                chave_valor="valor",
+                chave_nome="categoria_nivel_3",
+                top_n=3,
+                usar_valor_abs=True  # Ordenação por valor absoluto
+            ),
+            # Resultados Não Operacionais
+            dict(
+                items=[{"nivel_1": r["nivel_1"], "valor": r["total_valor"], "av": r["av"], "ah": r["ah"]} 
+                       for r in resultados_nao_operacionais_resultado],
+                items_anterior=[{"nivel_1": r["nivel_1"], "valor": r["total_valor"], "av": r["av"], "ah": r["ah"]} 
+                                for r in resultados_nao_operacionais_anterior_resultado],
+                total_atual=resultados_nao_operacionais_total,
+                total_anterior=resultados_nao_operacionais_anterior_total,
+                receita_total=receita_atual,
+                chave_valor="valor",
+                chave_nome="nivel_1",
+                top_n=3,
+                usar_valor_abs=True  # Ordenação por valor absoluto
+            ),
+        ])
 
         # Identificar a subcategoria mais representativa
         primeira_cat_entradas = max(
@@ -144,24 +161,24 @@ class Relatorio4:
             notas_automatizadas = "Não há dados disponíveis para o período selecionado."
 
         return [
-            {
-                "categoria": "Lucro Líquido",
-                "valor": lucro_liquido_atual,
-                "av_categoria": av_lucro_liquido,
-                "subcategorias": lucro_liquido_categorias,
-            },
-            {
-                "categoria": "Entradas Não Operacionais",
-                "valor": entradas_nao_operacionais_total,
-                "av_categoria": av_entradas_nao_operacionais,
-                "subcategorias": entradas_nao_operacionais_categorias,
-            },
-            {
-                "categoria": "Resultados Não Operacionais",
-                "valor": resultados_nao_operacionais_total,
-                "av_categoria": av_resultados_nao_operacionais,
-                "subcategorias": resultados_nao_operacionais_categorias,
-            }
+            Categoria(
+                categoria="Lucro Líquido",
+                valor=lucro_liquido_atual,
+                av_categoria=av_lucro_liquido,
+                subcategorias=lucro_liquido_categorias,
+            ),
+            Categoria(
+                categoria="Entradas Não Operacionais",
+                valor=entradas_nao_operacionais_total,
+                av_categoria=av_entradas_nao_operacionais,
+                subcategorias=entradas_nao_operacionais_categorias,
+            ),
+            Categoria(
+                categoria="Resultados Não Operacionais",
+                valor=resultados_nao_operacionais_total,
+                av_categoria=av_resultados_nao_operacionais,
+                subcategorias=resultados_nao_operacionais_categorias,
+            )
         ], {
             "notas": notas_automatizadas
         }
\ No newline at end of file
@@ -2,21 +2,45 @@
 from datetime import date
 from typing import Optional, List, Dict, Any
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito, requisito_fc
 from dateutil.relativedelta import relativedelta
 from src.core.utils import safe_float
+from src.core.modelos import Categoria, Subcategoria
+from config.settings import RELATORIO5_CONFIG
 
 class Relatorio5:
     def __init__(self, indicadores: Indicadores, nome_cliente: str):
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
-    def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None,
+                   meses_analise: Optional[int] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        mes_anterior = mes_anterior or mes_atual - relativedelta(months=1)
+        meses_analise = meses_analise or RELATORIO5_CONFIG["meses_analise_temporal"]
+        return [
+            requisito_fc(indicador, mes, centro_custo)
+            for mes in (mes_atual, mes_anterior)
+            for indicador in ("calcular_saidas_nao_operacionais_fc", "calcular_geracao_de_caixa_fc")
+        ] + [
+            requisito_fc("calcular_receitas_fc", mes_atual, '3.%', centro_custo),
+            requisito_fc("calcular_lucro_liquido_fc", mes_atual, centro_custo),  # alternativa para a receita total
+            # Meses da análise temporal e o mês base do AH (também lido com o seu mês anterior)
+            requisito_fc("calcular_geracao_de_caixa_temporal_fc", mes_atual, centro_custo, meses_analise,
+                         meses=tuple(mes_atual - relativedelta(months=i) for i in range(meses_analise + 1))),
+        ]
+
+    def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None, centro_custo: Optional[str] = None,
+                        meses_analise: Optional[int] = None) -> List[Dict[str, Any]]:
         """Gera o relatório financeiro 5 - Fechamento de Fluxo de Caixa.
 
         Args:
             mes_atual: Data do mês a ser calculado.
             mes_anterior: Data do mês anterior (não usado diretamente, incluído para consistência).
             centro_custo: Optional filter by cost center.
+            meses_analise: Meses da análise temporal (ex.: 3, 6 ou 12); padrão em RELATORIO5_CONFIG.
 
         Returns:
             Lista de dicionários com categorias, valores, subcategorias e análise temporal.
@@ -24,6 +48,7 @@ class Relatorio5:
          # Calcula mês anterior automaticamente se não for passado
         if mes_anterior is None:
             mes_anterior = mes_atual - relativedelta(months=1)
+        meses_analise = meses_analise or RELATORIO5_CONFIG["meses_analise_temporal"]
 
         # Parte 1: Cálculo das categorias principais (Saídas Não Operacionais e Geração de Caixa)
         try:
@@ -112,31 +137,27 @@ class Relatorio5:
             if total_valores_absolutos > 0:
                 barra_rep = round((abs(valor) / total_valores_absolutos) * 100, 2)
                 
-            geracao_de_caixa_categorias.append({
-                "subcategoria": r.get("categoria", "N/A"),
-                "valor": valor,
-                "av": round(av, 2),
-                "ah": round(ah, 2),
-                "representatividade": representatividade_av,  # CORRIGIDO: usar AV do indicador
-                "barra_rep": barra_rep  # NOVO: adicionar barra_rep seguindo padrão dos outros relatórios
-            })
-
-        # Parte 2: Análise Temporal da Geração de Caixa (3 meses) - MELHORADO: usar safe_float
+            geracao_de_caixa_categorias.append(Subcategoria(
+                subcategoria=r.get("categoria", "N/A"),
+                valor=valor,
+                av=round(av, 2),
+                ah=round(ah, 2),
+                representatividade=representatividade_av,  # CORRIGIDO: usar AV do indicador
+                barra_rep=barra_rep  # NOVO: adicionar barra_rep seguindo padrão dos outros relatórios
+            ))
+
+        # Parte 2: Análise Temporal da Geração de Caixa (janela de `meses_analise` meses, mês atual primeiro)
         try:
-            analise_temporal_resultado = self.indicadores.calcular_geracao_de_caixa_temporal_fc(mes_atual, centro_custo)
+            analise_temporal_resultado = self.indicadores.calcular_geracao_de_caixa_temporal_fc(
+                mes_atual, centro_custo, meses_analise
+            )
         except Exception:
             analise_temporal_resultado = []
 
-        # Calcular a média da Geração de Caixa dos 3 meses - MELHORADO: usar safe_float
+        # Média da Geração de Caixa da janela, já calculada pela análise temporal (somas de prefixo)
         media_geracao_de_caixa = 0.0
         if analise_temporal_resultado:
-            valores_validos = []
-            for r in analise_temporal_resultado:
-                valor = safe_float(r.get("valor", 0))
-                valores_validos.append(valor)
-            
-            if valores_validos:
-                media_geracao_de_caixa = sum(valores_validos) / len(valores_validos)
+            media_geracao_de_caixa = safe_float(analise_temporal_resultado[0].get("media", 0))
 
         # Calcula variações (AH) - MELHORADO: usar safe_float para tratar valores inválidos
         geracao_caixa_ah = 0
@@ -147,15 +168,10 @@ class Relatorio5:
             except (ZeroDivisionError, TypeError, ValueError):
                 geracao_caixa_ah = 0
 
-        # NOVO: Calcular caixa acumulado - MELHORADO: usar safe_float
+        # NOVO: Caixa acumulado da janela (acumulado do mês atual) - MELHORADO: usar safe_float
         caixa_acumulado = 0
         if analise_temporal_resultado:
-            valores_acumulados = []
-            for r in analise_temporal_resultado:
-                valor = safe_float(r.get("valor", 0))
-                valores_acumulados.append(valor)
-            
-            caixa_acumulado = sum(valores_acumulados)
+            caixa_acumulado = safe_float(analise_temporal_resultado[0].get("acumulado", 0))
 
         # NOVO: Formatar as notas automáticas seguindo o padrão solicitado - MELHORADO: usar safe_float
         if total_geracao_de_caixa != 0 and receita_total != 0:
@@ -199,7 +215,8 @@ class Relatorio5:
             meses_processados.append({
                 "mes": r.get("mes", ""),
                 "valor": round(valor, 2),
-                "ah": round(ah, 2)
+                "ah": round(ah, 2),
+                "acumulado": round(safe_float(r.get("acumulado", 0)), 2)
             })
 
         # CORRIGIDO: Calcular AV da categoria principal seguindo padrão dos outros relatórios
@@ -208,20 +225,20 @@ class Relatorio5:
             av_categoria = round(safe_float((total_geracao_de_caixa / receita_total) * 100), 2)
 
         return [
-            {
-                "categoria": "Saídas Não Operacionais",
-                "valor": saidas_valor
-            },
-            {
-                "categoria": "Geração de Caixa",
-                "valor": total_geracao_de_caixa,
-                "av_categoria": av_categoria,  # CORRIGIDO: usar percentual em relação à receita
-                "subcategorias": geracao_de_caixa_categorias,
-                "analise_temporal": {
+            Categoria(
+                categoria="Saídas Não Operacionais",
+                valor=saidas_valor
+            ),
+            Categoria(
+                categoria="Geração de Caixa",
+                valor=total_geracao_de_caixa,
+                av_categoria=av_categoria,  # CORRIGIDO: usar percentual em relação à receita
+                subcategorias=geracao_de_caixa_categorias,
+                analise_temporal={
                     "meses": meses_processados,
                     "media": round(safe_float(media_geracao_de_caixa), 2)
                 }
-            }
+            )
         ], {
             "notas": notas_automatizadas
         }
\ No newline at end of file
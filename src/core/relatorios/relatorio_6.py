@@ -1,9 +1,10 @@
 from datetime import date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import math
 import numpy as np
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito
 from src.core.utils import safe_float
 
 # Configurar logging para depuração
@@ -15,6 +16,12 @@ class Relatorio6:
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        return [Requisito("calcular_indicadores_dre", (mes_atual, empresa), "dre", (mes_atual,))]
+
     def gerar_relatorio(self, mes: date, empresa: str = None) -> tuple[List[Dict[str, Any]], Dict[str, str]]:
         """Gera o relatório financeiro 6 - Indicadores DRE.
 
@@ -3,12 +3,19 @@ from datetime import date
 from typing import Optional, List, Dict, Any, Tuple
 from src.core.utils import safe_float 
 from src.core.indicadores import Indicadores
+from src.core.planejador import Requisito
 
 class Relatorio7:
     def __init__(self, indicadores: Indicadores, nome_cliente: str):
         self.indicadores = indicadores
         self.nome_cliente = nome_cliente
 
+    @staticmethod
+    def requisitos(mes_atual: date, mes_anterior: Optional[date] = None,
+                   centro_custo: Optional[str] = None, empresa: Optional[str] = None) -> List[Requisito]:
+        """Cálculos de Indicadores usados por `gerar_relatorio` (ver src/core/planejador.py)."""
+        return [Requisito("calcular_indicadores_operacionais", (mes_atual,), "indicador", (mes_atual,))]
+
     def gerar_relatorio(self, mes_atual: date, mes_anterior: Optional[date] = None) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
         """Gera o relatório financeiro 7 com indicadores operacionais e seus valores.
 
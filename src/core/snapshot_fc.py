@@ -0,0 +1,435 @@
+# src/core/snapshot_fc.py
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from typing import Union, List, Dict, Any, Optional, Iterable, Tuple
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import text
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.database.db_utils import DatabaseConnection
+from src.core.utils import nulos_como_nan
+
+# Níveis cujos relatórios agrupam por nivel_2 do plano de contas
+NIVEIS_COM_PLANO = ('4. Custos Variáveis', '5. Despesas Fixas', '6. Investimentos')
+
+# Uma única varredura do fc: soma por cliente/nivel_3_id/mês/nivel_1/categoria/centro e,
+# a partir dela, dois recortes: 'fc' (por categoria_nivel_3) e 'nivel_3' (por cliente e nivel_3_id,
+# apenas nos níveis com plano), que `SnapshotFC.carregar` agrupa por nivel_2 com o cache do plano de
+# contas, sem JOIN com plano_de_contas. `{tabela_fc}` é o fc bruto ou o agregado mensal fc_mensal.
+QUERY_SNAPSHOT_FC = """
+    WITH base AS (
+        SELECT
+            f.id_cliente,
+            f.nivel_3_id,
+            DATE_TRUNC('month', f.data)::date AS mes,
+            f.nivel_1,
+            f.categoria_nivel_3,
+            f.centro_custo,
+            SUM(f.valor) AS valor
+        FROM {tabela_fc} f
+        WHERE f.id_cliente = ANY (:id_cliente)
+          AND f.visao = 'Realizado'
+          AND f.data >= :inicio
+          AND f.data < :fim
+        GROUP BY 1, 2, 3, 4, 5, 6
+    )
+    SELECT 'fc' AS origem, NULL AS id_cliente, b.mes, b.nivel_1, NULL AS nivel_3_id, b.categoria_nivel_3, b.centro_custo, SUM(b.valor) AS valor
+    FROM base b
+    GROUP BY b.mes, b.nivel_1, b.categoria_nivel_3, b.centro_custo
+    UNION ALL
+    SELECT 'nivel_3' AS origem, b.id_cliente, b.mes, b.nivel_1, text(b.nivel_3_id), NULL, b.centro_custo, SUM(b.valor)
+    FROM base b
+    WHERE b.nivel_1 IN ('4. Custos Variáveis', '5. Despesas Fixas', '6. Investimentos')
+    GROUP BY b.id_cliente, b.nivel_3_id, b.mes, b.nivel_1, b.centro_custo;
+"""
+
+
+def mes_anterior(mes: date) -> date:
+    """Retorna o primeiro dia do mês anterior a `mes`."""
+    return mes.replace(day=1) - relativedelta(months=1)
+
+
+def normalizar(texto: Optional[str]) -> Optional[str]:
+    """Equivalente Python de LOWER(TRIM(texto)) do Postgres."""
+    return texto.strip(' ').lower() if texto is not None else None
+
+
+def somar(valores: Iterable[Any]) -> Any:
+    """Equivalente de SUM(): ignora nulos e retorna None se não houver valores."""
+    total = None
+    for v in valores:
+        if v is None:
+            continue
+        total = v if total is None else total + v
+    return total
+
+
+def negar(valor: Any) -> Any:
+    """Equivalente de `valor * -1` (NULL permanece NULL)."""
+    return valor * -1 if valor is not None else None
+
+
+def _peso_e_primeiro_digito(valor: Decimal) -> Tuple[int, int]:
+    """Peso e primeiro dígito de um NUMERIC na base 10000 usada internamente pelo Postgres."""
+    if valor == 0:
+        return 0, 0
+    valor = abs(valor)
+    peso = valor.adjusted() // 4
+    return peso, int(valor.scaleb(-4 * peso))
+
+
+def dividir(dividendo: Any, divisor: Any) -> Any:
+    """Divisão com a mesma escala de resultado do NUMERIC do Postgres (select_div_scale).
+
+    Garante que AV/AH calculados em memória sejam idênticos, até o último dígito,
+    aos calculados pelo banco. Valores não-Decimal usam a divisão comum.
+    """
+    if not (isinstance(dividendo, Decimal) and isinstance(divisor, Decimal)):
+        return dividendo / divisor
+    peso1, digito1 = _peso_e_primeiro_digito(dividendo)
+    peso2, digito2 = _peso_e_primeiro_digito(divisor)
+    peso_quociente = peso1 - peso2 - (1 if digito1 <= digito2 else 0)
+    escala = max(16 - peso_quociente * 4, -dividendo.as_tuple().exponent, -divisor.as_tuple().exponent, 0)
+    with localcontext() as ctx:
+        ctx.prec = 1000
+        return (dividendo / divisor).quantize(Decimal(1).scaleb(-escala), rounding=ROUND_HALF_UP)
+
+
+def calcular_av(valor: Any, total: Any) -> Any:
+    """Análise vertical: CASE WHEN total = 0 THEN NULL ELSE valor / total * 100 END."""
+    if valor is None or total is None or total == 0:
+        return None
+    return dividir(valor, total) * 100
+
+
+def calcular_ah(valor: Any, anterior: Any) -> Any:
+    """Análise horizontal: CASE WHEN anterior IS NULL OR anterior = 0 THEN NULL ELSE (valor / anterior - 1) * 100 END."""
+    if valor is None or anterior is None or anterior == 0:
+        return None
+    return (dividir(valor, anterior) - 1) * 100
+
+
+def ordenar(registros: List[Dict[str, Any]], chave: str, decrescente: bool) -> List[Dict[str, Any]]:
+    """Ordena como o Postgres: nulos por último em ASC e primeiro em DESC."""
+    nulos = [r for r in registros if r[chave] is None]
+    valores = sorted((r for r in registros if r[chave] is not None), key=lambda r: r[chave], reverse=decrescente)
+    return nulos + valores if decrescente else valores + nulos
+
+
+def _para_float(registros: List[Dict[str, Any]], colunas: List[str], padrao: Any = 0) -> List[Dict[str, Any]]:
+    """Aplica `float(v) if v is not None else padrao` após a conversão estilo pandas."""
+    nulos_como_nan(registros, colunas)
+    for r in registros:
+        for coluna in colunas:
+            r[coluna] = float(r[coluna]) if r[coluna] is not None else padrao
+    return registros
+
+
+def analise_por_nivel_2(atual: Dict[Any, Any], anterior: Dict[Any, Any], receita: Any,
+                        chave_nome: str, chave_valor: str) -> List[Dict[str, Any]]:
+    """Linhas de custos variáveis/despesas fixas a partir das somas por nivel_2 do mês e do mês anterior.
+
+    Mesma saída das consultas com JOIN em plano_de_contas: AV sobre a receita do mês, AH contra
+    o mês anterior, ordenação por valor ascendente e conversão dos nulos como o pandas.
+    """
+    linhas = ordenar(SnapshotFC._comparar(atual, anterior, receita), "valor", decrescente=False)
+    _para_float(linhas, ["valor", "av", "ah"])
+    return [
+        {
+            chave_nome: (l["chave"] or "Desconhecido") if chave_nome == "nivel_2" else l["chave"],
+            chave_valor: l["valor"],
+            "av": l["av"],
+            "ah": l["ah"],
+        }
+        for l in linhas
+    ]
+
+
+def analise_investimentos(atual: Dict[Any, Any], anterior: Dict[Any, Any], receita: Any) -> List[Dict[str, Any]]:
+    """Linhas de investimentos (nivel_2 '6.%') a partir das somas por nivel_2 do mês e do mês base do AH."""
+    def investimentos(somas: Dict[Any, Any]) -> Dict[Any, Any]:
+        return {k: v for k, v in somas.items() if k is not None and k.startswith('6.')}
+    linhas = ordenar(SnapshotFC._comparar(investimentos(atual), investimentos(anterior), receita), "valor", decrescente=True)
+    linhas = [{"categoria": l["chave"], "valor": l["valor"], "av": l["av"], "ah": l["ah"]} for l in linhas]
+    return nulos_como_nan(linhas, ["valor", "av", "ah"])
+
+
+class SnapshotFC:
+    """Fotografia pré-agregada do fluxo de caixa (fc) para uma janela de meses.
+
+    Carregada com uma única consulta, responde em memória a todos os métodos
+    `calcular_*_fc` de `Indicadores` com a mesma saída das consultas SQL originais,
+    inclusive para qualquer filtro de centro de custo.
+    """
+
+    def __init__(self, id_cliente: Union[int, List[int]], inicio: date, fim: date, linhas: List[Tuple]):
+        self.id_cliente = id_cliente
+        self.inicio = inicio.replace(day=1)
+        self.fim = fim.replace(day=1)
+        self._linhas: Dict[Tuple[str, date], List[Tuple]] = {}
+        for origem, mes, nivel_1, nivel_2, categoria_nivel_3, centro_custo, valor in linhas:
+            self._linhas.setdefault((origem, mes), []).append(
+                (nivel_1, nivel_2, categoria_nivel_3, centro_custo, valor)
+            )
+
+    @classmethod
+    def carregar(cls, db: DatabaseConnection, id_cliente: Union[int, List[int]], inicio: date, fim: date,
+                 tabela_fc: str = "fc", plano: Optional[Dict[Tuple[int, str], List[Optional[str]]]] = None) -> "SnapshotFC":
+        """Executa a consulta única do snapshot para os meses de `inicio` a `fim` (inclusive).
+
+        `tabela_fc` permite ler do agregado mensal (fc_mensal) em vez do fc bruto. As somas por
+        nivel_3_id são agrupadas por nivel_2 com `plano` (mapeamento de `CachePlanoDeContas.mapa`;
+        se omitido, obtido do cache do processo), como nos cálculos fora do snapshot.
+
+        Raises:
+            RuntimeError: Se houver erro na execução da consulta.
+        """
+        params = {
+            "id_cliente": id_cliente,
+            "inicio": inicio.replace(day=1),
+            "fim": fim.replace(day=1) + relativedelta(months=1),
+        }
+        try:
+            resultado = db.fetch_rows(
+                text(QUERY_SNAPSHOT_FC.format(tabela_fc=tabela_fc)), params, numeric_como_float=False, preparada=True
+            )
+        except Exception as e:
+            raise RuntimeError(f"Erro ao carregar snapshot do fluxo de caixa: {str(e)}")
+        if plano is None:
+            from src.core.plano_de_contas import obter_cache_plano  # importado aqui: plano_de_contas importa este módulo
+            from src.core.cache import normalizar_clientes
+            plano = obter_cache_plano().mapa(db, normalizar_clientes(id_cliente))
+        linhas = []
+        # (mes, nivel_1, nivel_2, centro_custo) -> valores, como o JOIN interno com o plano de contas
+        por_nivel_2: Dict[Tuple, List[Any]] = {}
+        for row in resultado:
+            mes = row.mes.date() if hasattr(row.mes, "date") else row.mes
+            if row.origem == 'fc':
+                linhas.append(('fc', mes, row.nivel_1, None, row.categoria_nivel_3, row.centro_custo, row.valor))
+                continue
+            for nivel_2 in plano.get((row.id_cliente, row.nivel_3_id), []):
+                por_nivel_2.setdefault((mes, row.nivel_1, nivel_2, row.centro_custo), []).append(row.valor)
+        linhas.extend(
+            ('plano', mes, nivel_1, nivel_2, None, centro_custo, somar(valores))
+            for (mes, nivel_1, nivel_2, centro_custo), valores in por_nivel_2.items()
+        )
+        return cls(id_cliente, inicio, fim, linhas)
+
+    def cobre(self, *meses: Optional[date]) -> bool:
+        """Indica se todos os meses informados estão dentro da janela do snapshot."""
+        return all(m is None or self.inicio <= m.replace(day=1) <= self.fim for m in meses)
+
+    # ------------------------------------------------------------------
+    # Primitivas de agregação
+    # ------------------------------------------------------------------
+    def _filtrar(self, origem: str, mes: date, centro_custo: Optional[str]) -> List[Tuple]:
+        linhas = self._linhas.get((origem, mes.replace(day=1)), [])
+        if centro_custo:
+            return [l for l in linhas if l[3] == centro_custo]
+        return linhas
+
+    def total(self, mes: date, nivel_1: str, centro_custo: Optional[str] = None, normalizado: bool = False) -> Any:
+        """SUM(valor) de um nivel_1 no mês (comparação exata ou via LOWER(TRIM()))."""
+        alvo = normalizar(nivel_1) if normalizado else nivel_1
+        return somar(
+            v for n1, _, _, _, v in self._filtrar('fc', mes, centro_custo)
+            if (normalizar(n1) if normalizado else n1) == alvo
+        )
+
+    def _agrupar(self, origem: str, mes: date, centro_custo: Optional[str], filtro, chave) -> Dict[Any, Any]:
+        grupos: Dict[Any, List[Any]] = {}
+        for linha in self._filtrar(origem, mes, centro_custo):
+            if filtro(linha):
+                grupos.setdefault(chave(linha), []).append(linha[4])
+        return {k: somar(v) for k, v in grupos.items()}
+
+    def por_nivel_2(self, mes: date, nivel_1: str, centro_custo: Optional[str] = None) -> Dict[Any, Any]:
+        """Somas por nivel_2 do plano de contas (equivalente ao JOIN com plano_de_contas)."""
+        return self._agrupar('plano', mes, centro_custo, lambda l: l[0] == nivel_1, lambda l: l[1])
+
+    def por_categoria(self, mes: date, nivel_1: str, centro_custo: Optional[str] = None, normalizado: bool = False) -> Dict[Any, Any]:
+        """Somas por categoria_nivel_3 (normalizada com LOWER(TRIM()) se `normalizado`)."""
+        if normalizado:
+            alvo = normalizar(nivel_1)
+            return self._agrupar('fc', mes, centro_custo, lambda l: normalizar(l[0]) == alvo, lambda l: normalizar(l[2]))
+        return self._agrupar('fc', mes, centro_custo, lambda l: l[0] == nivel_1, lambda l: l[2])
+
+    def por_nivel_1(self, mes: date, niveis: Iterable[str], centro_custo: Optional[str] = None) -> Dict[Any, Any]:
+        """Somas por nivel_1 bruto, filtrando por LOWER(TRIM(nivel_1)) IN (...)."""
+        alvos = {normalizar(n) for n in niveis}
+        return self._agrupar('fc', mes, centro_custo, lambda l: normalizar(l[0]) in alvos, lambda l: l[0])
+
+    @staticmethod
+    def _comparar(atual: Dict[Any, Any], anterior: Dict[Any, Any], receita: Any) -> List[Dict[str, Any]]:
+        """Monta (chave, valor, av, ah) como o LEFT JOIN com o período anterior (NULL não casa)."""
+        return [
+            {
+                "chave": chave,
+                "valor": valor,
+                "av": calcular_av(valor, receita),
+                "ah": calcular_ah(valor, anterior.get(chave) if chave is not None else None),
+            }
+            for chave, valor in atual.items()
+        ]
+
+    def _totais(self, mes: date, categorias: List[Tuple[str, str, bool]], centro_custo: Optional[str]) -> Dict[str, Any]:
+        """Totais por categoria exibida: (nome, nivel_1, inverter_sinal)."""
+        return {
+            nome: negar(self.total(mes, nivel_1, centro_custo)) if inverter else self.total(mes, nivel_1, centro_custo)
+            for nome, nivel_1, inverter in categorias
+        }
+
+    def _categorias_com_analise(self, mes_atual: date, mes_base: date, categorias: List[Tuple[str, str, bool]],
+                                centro_custo: Optional[str]) -> List[Dict[str, Any]]:
+        atual = self._totais(mes_atual, categorias, centro_custo)
+        anterior = self._totais(mes_base, categorias, centro_custo)
+        receita = atual.get('Receita')
+        return [
+            {
+                "categoria": nome,
+                "valor": atual[nome],
+                "av": calcular_av(atual[nome], receita),
+                "ah": calcular_ah(atual[nome], anterior[nome]),
+            }
+            for nome, _, _ in categorias
+        ]
+
+    # ------------------------------------------------------------------
+    # Equivalentes dos métodos de Indicadores
+    # ------------------------------------------------------------------
+    def calcular_custos_variaveis_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._por_nivel_2_com_analise(mes, '4. Custos Variáveis', "nivel_2", "total_categoria", centro_custo)
+
+    def calcular_despesas_fixas_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self._por_nivel_2_com_analise(mes, '5. Despesas Fixas', "categoria", "valor", centro_custo)
+
+    def _por_nivel_2_com_analise(self, mes: date, nivel_1: str, chave_nome: str, chave_valor: str,
+                                 centro_custo: Optional[str]) -> List[Dict[str, Any]]:
+        return analise_por_nivel_2(
+            self.por_nivel_2(mes, nivel_1, centro_custo),
+            self.por_nivel_2(mes_anterior(mes), nivel_1, centro_custo),
+            self.total(mes, '3. Receitas', centro_custo),
+            chave_nome,
+            chave_valor,
+        )
+
+    def calcular_receitas_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        linhas = self._comparar(
+            self.por_categoria(mes, '3. Receitas', centro_custo),
+            self.por_categoria(mes_anterior(mes), '3. Receitas', centro_custo),
+            self.total(mes, '3. Receitas', centro_custo),
+        )
+        linhas = ordenar(linhas, "valor", decrescente=True)
+        _para_float(linhas, ["valor", "av", "ah"])
+        return [
+            {"categoria_nivel_3": l["chave"], "total_categoria": l["valor"], "av": l["av"], "ah": l["ah"]}
+            for l in linhas
+        ]
+
+    def calcular_lucro_bruto_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        linhas = self._categorias_com_analise(mes, mes_anterior(mes), [
+            ('Receita', '3. Receitas', False),
+            ('Custos Variáveis', '4. Custos Variáveis', True),
+        ], centro_custo)
+        return _para_float(linhas, ["valor", "av", "ah"])
+
+    def calcular_lucro_operacional_fc(self, mes_atual: date, mes_anterior: Optional[date] = None,
+                                      centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        linhas = self._categorias_com_analise(mes_atual, mes_anterior or mes_atual, [
+            ('Receita', '3. Receitas', False),
+            ('Custos Variáveis', '4. Custos Variáveis', True),
+            ('Despesas Fixas', '5. Despesas Fixas', True),
+        ], centro_custo)
+        return nulos_como_nan(linhas, ["valor", "av", "ah"])
+
+    def calcular_investimentos_fc(self, mes_atual: date, mes_anterior: Optional[date] = None,
+                                  centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        return analise_investimentos(
+            self.por_nivel_2(mes_atual, '6. Investimentos', centro_custo),
+            self.por_nivel_2(mes_anterior or mes_atual, '6. Investimentos', centro_custo),
+            self.total(mes_atual, '3. Receitas', centro_custo),
+        )
+
+    def calcular_lucro_liquido_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        linhas = self._categorias_com_analise(mes, mes_anterior(mes), [
+            ('Receita', '3. Receitas', False),
+            ('Custos Variáveis', '4. Custos Variáveis', True),
+            ('Despesas Fixas', '5. Despesas Fixas', True),
+            ('Investimentos', '6. Investimentos', True),
+        ], centro_custo)
+        return _para_float(linhas, ["valor", "av", "ah"])
+
+    def calcular_entradas_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        nivel_1 = '7.1 Entradas Não Operacionais'
+        linhas = self._comparar(
+            self.por_categoria(mes, nivel_1, centro_custo, normalizado=True),
+            self.por_categoria(mes_anterior(mes), nivel_1, centro_custo, normalizado=True),
+            self.total(mes, '3. Receitas', centro_custo, normalizado=True),
+        )
+        linhas = ordenar(linhas, "valor", decrescente=True)
+        _para_float(linhas, ["valor", "av", "ah"])
+        return [
+            {"categoria_nivel_3": l["chave"], "total_valor": l["valor"], "av": l["av"], "ah": l["ah"]}
+            for l in linhas
+        ]
+
+    def calcular_saidas_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        valor = self.total(mes, '7.2 Saídas Não Operacionais', centro_custo, normalizado=True)
+        return [{"categoria": "Saídas Não Operacionais", "valor": float(valor) if valor is not None else 0}]
+
+    def calcular_resultados_nao_operacionais_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        niveis = ('7.1 Entradas Não Operacionais', '7.2 Saídas Não Operacionais')
+        linhas = self._comparar(
+            self.por_nivel_1(mes, niveis, centro_custo),
+            self.por_nivel_1(mes_anterior(mes), niveis, centro_custo),
+            self.total(mes, '3. Receitas', centro_custo, normalizado=True),
+        )
+        linhas = ordenar(linhas, "valor", decrescente=True)
+        _para_float(linhas, ["valor", "av", "ah"])
+        return [
+            {"nivel_1": l["chave"], "total_valor": l["valor"], "av": l["av"], "ah": l["ah"]}
+            for l in linhas
+        ]
+
+    def calcular_geracao_de_caixa_fc(self, mes: date, centro_custo: Optional[str] = None) -> List[Dict[str, Any]]:
+        categorias = [
+            ('Receita', '3. Receitas', False),
+            ('Custos Variáveis', '4. Custos Variáveis', True),
+            ('Despesas Fixas', '5. Despesas Fixas', True),
+            ('Investimentos', '6. Investimentos', True),
+            ('Entradas Não Operacionais', '7.1 Entradas Não Operacionais', False),
+            ('Saídas Não Operacionais', '7.2 Saídas Não Operacionais', True),
+        ]
+        atual = self._totais(mes, categorias, centro_custo)
+        anterior = self._totais(mes_anterior(mes), categorias, centro_custo)
+
+        def lucro_liquido(totais: Dict[str, Any]) -> Any:
+            # Receita - (Custos Variáveis + Despesas Fixas + Investimentos), ignorando nulos como o SUM()
+            return somar([totais['Receita']] + [
+                negar(totais[nome]) for nome in ('Custos Variáveis', 'Despesas Fixas', 'Investimentos')
+            ])
+
+        receita = atual['Receita']
+        lucro, lucro_prev = lucro_liquido(atual), lucro_liquido(anterior)
+        if lucro is None or lucro_prev is None or lucro_prev == 0:
+            ah_lucro = None
+        elif lucro_prev < 0 and lucro > 0:
+            ah_lucro = dividir(lucro - lucro_prev, abs(lucro_prev)) * 100
+        else:
+            ah_lucro = (dividir(lucro, lucro_prev) - 1) * 100
+
+        linhas = [{"categoria": 'Lucro Líquido', "valor": lucro, "av": calcular_av(lucro, receita), "ah": ah_lucro}]
+        for nome in ('Entradas Não Operacionais', 'Saídas Não Operacionais'):
+            linhas.append({
+                "categoria": nome,
+                "valor": atual[nome],
+                "av": calcular_av(atual[nome], receita),
+                "ah": calcular_ah(atual[nome], anterior[nome]),
+            })
+        return _para_float(linhas, ["valor", "av", "ah"])
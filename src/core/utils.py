@@ -4,7 +4,9 @@ from typing import List, Dict, Any
 import math
 
 import math
-from typing import Any, Union
+from itertools import accumulate
+from typing import Any, Sequence, Union
+from src.core.modelos import Subcategoria
 
 def safe_float(value: Any, default: float = 0.0) -> Union[float, str]:
     """
@@ -33,10 +35,14 @@ def calcular_outras_categorias(
     chave_nome: str = "categoria",
     top_n: int = 3,
     usar_valor_abs: bool = False
-) -> List[Dict[str, Any]]:
+) -> List[Subcategoria]:
     """
     Calcula subcategorias principais e agrupa o restante em 'Outras categorias'.
 
+    Cada valor passa por `safe_float` uma única vez; a ordenação é feita sobre os índices
+    (estável, como ordenar os dicionários) e as somas seguem a ordem de ordenação, de modo
+    que o resultado é idêntico ao da ordenação dos próprios itens.
+
     Args:
         items: Lista de dicionários com os dados do período atual.
         items_anterior: Lista de dicionários com os dados do período anterior.
@@ -49,47 +55,37 @@ def calcular_outras_categorias(
         usar_valor_abs: Se True, usa valor absoluto para ordenação e cálculos.
 
     Returns:
-        Lista de dicionários com subcategorias, incluindo 'Outras categorias' se aplicável.
+        Lista de `Subcategoria` (legíveis como dicionário), incluindo 'Outras categorias' se aplicável.
     """
-    # Ordena itens por valor (absoluto, se especificado)
-    ordenados = sorted(
-        items,
-        key=lambda x: abs(safe_float(x.get(chave_valor, 0))) if usar_valor_abs else safe_float(x.get(chave_valor, 0)),
-        reverse=True
-    )
-    
+    valores = [safe_float(item.get(chave_valor, 0)) for item in items]
+    # Valor usado na ordenação e nas somas (absoluto, se especificado)
+    chaves = [abs(v) for v in valores] if usar_valor_abs else valores
+    ordem = sorted(range(len(items)), key=chaves.__getitem__, reverse=True)
+
     # Calcula totais das subcategorias
-    total_subcategorias = sum(
-        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
-        for item in items
-    ) if items else 0
+    total_subcategorias = sum(chaves) if items else 0
 
     # Gera lista de subcategorias principais (top N)
     resultado = [
-        {
-            "subcategoria": item.get(chave_nome, "N/A"),
-            "valor": safe_float(item.get(chave_valor, 0)),
-            "av": round(safe_float(item.get("av", 0)), 2),
-            "ah": round(safe_float(item.get("ah", 0)), 2),
-            "representatividade": round(
-                (abs(safe_float(item.get(chave_valor, 0))) / total_subcategorias) * 100, 2
+        Subcategoria(
+            subcategoria=items[i].get(chave_nome, "N/A"),
+            valor=valores[i],
+            av=round(safe_float(items[i].get("av", 0)), 2),
+            ah=round(safe_float(items[i].get("ah", 0)), 2),
+            representatividade=round(
+                (abs(valores[i]) / total_subcategorias) * 100, 2
             ) if total_subcategorias != 0 else 0
-        } for item in ordenados[:top_n]
+        ) for i in ordem[:top_n]
     ]
 
-    # Calcula valores para "Outras categorias"
-    outras_valor = sum(
-        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
-        for item in ordenados[top_n:]
-    ) if len(ordenados) > top_n else 0
+    # Calcula valores para "Outras categorias", somando na ordem de ordenação
+    outras_valor = sum(chaves[i] for i in ordem[top_n:]) if len(ordem) > top_n else 0
 
+    chaves_anterior = [safe_float(item.get(chave_valor, 0)) for item in items_anterior]
+    if usar_valor_abs:
+        chaves_anterior = [abs(v) for v in chaves_anterior]
     outras_anterior = sum(
-        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
-        for item in sorted(
-            items_anterior,
-            key=lambda x: abs(safe_float(x.get(chave_valor, 0))) if usar_valor_abs else safe_float(x.get(chave_valor, 0)),
-            reverse=True
-        )[top_n:]
+        sorted(chaves_anterior, reverse=True)[top_n:]
     ) if len(items_anterior) > top_n else 0
 
     # Calcula AV (em relação à receita total) e AH para "Outras categorias"
@@ -102,14 +98,72 @@ def calcular_outras_categorias(
 
     # Adiciona "Outras categorias" se houver valores
     if outras_valor != 0:  # Alterado para != 0 para capturar valores negativos
-        resultado.append({
-            "subcategoria": "Outras categorias",
-            "valor": -outras_valor if usar_valor_abs else outras_valor,
-            "av": outras_av,
-            "ah": outras_ah,
-            "representatividade": round(
+        resultado.append(Subcategoria(
+            subcategoria="Outras categorias",
+            valor=-outras_valor if usar_valor_abs else outras_valor,
+            av=outras_av,
+            ah=outras_ah,
+            representatividade=round(
                 (abs(outras_valor) / total_subcategorias) * 100, 2
             ) if total_subcategorias != 0 else 0
+        ))
+
+    return resultado
+
+
+def calcular_outras_categorias_lote(grupos: Sequence[Dict[str, Any]]) -> List[List[Subcategoria]]:
+    """
+    `calcular_outras_categorias` para vários grupos (ex.: as seções de um relatório) em uma única chamada.
+
+    Args:
+        grupos: Um dicionário por grupo, com os mesmos argumentos nomeados de `calcular_outras_categorias`.
+
+    Returns:
+        Lista com o resultado de cada grupo, na ordem recebida.
+    """
+    return [calcular_outras_categorias(**grupo) for grupo in grupos]
+
+
+def analise_janela_movel(totais: Sequence[float]) -> List[Dict[str, float]]:
+    """
+    AH, acumulado e média de uma janela de meses a partir de uma única série de totais.
+
+    Cada total entra uma única vez: o AH compara totais vizinhos e o acumulado e a média
+    saem das somas de prefixo da janela, de modo que aumentar a janela (3, 6, 12 meses)
+    acrescenta um total por mês, sem recalcular os anteriores.
+
+    Args:
+        totais: Totais mensais em ordem cronológica; o primeiro é o mês base (anterior à
+            janela), usado apenas no AH do primeiro mês.
+
+    Returns:
+        Um dicionário por mês da janela, em ordem cronológica, com 'valor', 'ah' (variação
+        do módulo em relação ao mês anterior, 0 se o anterior for zero), 'acumulado' (soma
+        desde o início da janela) e 'media' (média desde o início da janela).
+    """
+    prefixos = list(accumulate(totais[1:]))
+    resultado = []
+    for i, (anterior, total) in enumerate(zip(totais, totais[1:])):
+        resultado.append({
+            "valor": total,
+            "ah": ((abs(total) - abs(anterior)) / abs(anterior)) * 100 if anterior != 0 else 0,
+            "acumulado": prefixos[i],
+            "media": prefixos[i] / (i + 1),
         })
+    return resultado
 
-    return resultado
\ No newline at end of file
+def nulos_como_nan(registros: List[Dict[str, Any]], colunas: List[str]) -> List[Dict[str, Any]]:
+    """
+    Reproduz a conversão do pandas (read_sql_query) para colunas numéricas.
+    - Se a coluna tiver algum valor não nulo no resultado, os nulos viram NaN.
+    - Se todos os valores forem nulos, a coluna mantém None.
+    Mantém idêntica a saída dos cálculos feitos fora do DataFrame.
+    """
+    for coluna in colunas:
+        if any(r.get(coluna) is not None for r in registros):
+            for r in registros:
+                if r.get(coluna) is None:
+                    r[coluna] = nan
+                else:
+                    r[coluna] = float(r[coluna])
+    return registros
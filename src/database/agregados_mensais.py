@@ -0,0 +1,200 @@
+# src/database/agregados_mensais.py
+"""
+Atualização incremental dos agregados mensais fc_mensal e dre_mensal.
+
+As tabelas (DDL em src/queries/AGREGADOS_MENSAIS.txt) guardam as somas mensais de fc/dre
+com as mesmas colunas usadas por Indicadores. A cada execução, compara a impressão digital
+de cada par cliente/mês com a registrada em agregados_mensais_controle e recalcula apenas os
+pares alterados, novos ou removidos. A impressão digital é o md5 das linhas agregadas (colunas
+agrupadas e soma): um lançamento movido para outra categoria, centro de custo ou visão com o
+mesmo valor, ou correções que se compensam entre grupos, também mudam o resultado.
+
+Uso (após cada carga do ETL):
+    python -m src.database.agregados_mensais [--clientes 10,20] [--desde 2025-01-01]
+"""
+
+import argparse
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.database.db_utils import DatabaseConnection
+
+# tabela de origem -> (tabela agregada, colunas agrupadas além de id_cliente/data)
+AGREGADOS = {
+    "fc": ("fc_mensal", ("visao", "nivel_1", "nivel_3_id", "categoria_nivel_3", "centro_custo")),
+    "dre": ("dre_mensal", ("visao", "empresa", "categoria")),
+}
+
+
+def _filtros(id_cliente: Optional[List[int]], desde: Optional[date]) -> str:
+    # Cláusulas omitidas quando não há filtro (mesmo padrão de filtros_sql)
+    clausulas = []
+    if id_cliente:
+        clausulas.append("AND id_cliente = ANY (:id_cliente)")
+    if desde:
+        clausulas.append("AND data >= :desde")
+    return "\n              ".join(clausulas)
+
+
+def pares_alterados(db: DatabaseConnection, origem: str, id_cliente: Optional[List[int]] = None,
+                    desde: Optional[date] = None) -> List[Tuple]:
+    """Pares cliente/mês cuja impressão digital mudou desde a última atualização.
+
+    Args:
+        db: Instância de DatabaseConnection.
+        origem: 'fc' ou 'dre'.
+        id_cliente: Restringe a estes clientes (None = todos).
+        desde: Ignora meses anteriores a esta data (None = todo o histórico).
+
+    Returns:
+        Lista de (id_cliente, mes, linhas, soma, hash); `linhas` é None quando o mês sumiu da origem.
+    """
+    filtros = _filtros(id_cliente, desde)
+    grupo = ", ".join(AGREGADOS[origem][1])
+    query = text(f"""
+        WITH
+          grupos AS (
+            SELECT id_cliente, DATE_TRUNC('month', data)::date AS mes, {grupo},
+                   COUNT(*) AS linhas, SUM(valor) AS valor
+            FROM {origem}
+            WHERE TRUE
+              {filtros}
+            GROUP BY 1, 2, {grupo}
+          ),
+          atual AS (
+            -- ROW(...)::text distingue NULL de texto vazio; ordenado para ser determinístico
+            SELECT id_cliente, mes, SUM(linhas) AS linhas, SUM(valor) AS soma,
+                   md5(string_agg(ROW({grupo}, valor)::text, ',' ORDER BY ROW({grupo}, valor)::text)) AS hash
+            FROM grupos
+            GROUP BY 1, 2
+          ),
+          controle AS (
+            SELECT id_cliente, data AS mes, linhas, hash
+            FROM agregados_mensais_controle
+            WHERE tabela = :origem
+              {filtros}
+          )
+        SELECT
+          COALESCE(a.id_cliente, c.id_cliente) AS id_cliente,
+          COALESCE(a.mes, c.mes) AS mes,
+          a.linhas,
+          a.soma,
+          a.hash
+        FROM atual a
+        FULL JOIN controle c
+          ON c.id_cliente = a.id_cliente
+          AND c.mes = a.mes
+        WHERE a.linhas IS DISTINCT FROM c.linhas
+           OR a.hash IS DISTINCT FROM c.hash
+        ORDER BY 1, 2;
+    """)
+    params = {"origem": origem, "id_cliente": id_cliente, "desde": desde}
+    return [tuple(linha) for linha in db.fetch_rows(query, params, numeric_como_float=False)]
+
+
+def atualizar_agregado(db: DatabaseConnection, origem: str, id_cliente: Optional[List[int]] = None,
+                       desde: Optional[date] = None) -> int:
+    """Recalcula, em uma transação, os pares cliente/mês alterados de um agregado.
+
+    Args:
+        db: Instância de DatabaseConnection.
+        origem: 'fc' ou 'dre'.
+        id_cliente: Restringe a estes clientes (None = todos).
+        desde: Ignora meses anteriores a esta data (None = todo o histórico).
+
+    Returns:
+        Quantidade de pares cliente/mês recalculados.
+
+    Raises:
+        ValueError: Se a origem for inválida.
+        RuntimeError: Se houver erro na atualização.
+    """
+    if origem not in AGREGADOS:
+        raise ValueError(f"Origem inválida para agregado mensal: {origem}")
+    destino, colunas = AGREGADOS[origem]
+    grupo = ", ".join(colunas)
+
+    try:
+        pares = pares_alterados(db, origem, id_cliente, desde)
+        if not pares:
+            return 0
+        params = {
+            "origem": origem,
+            "ids": [p[0] for p in pares],
+            "meses": [p[1] for p in pares],
+            "linhas": [p[2] for p in pares],
+            "somas": [p[3] for p in pares],
+            "hashes": [p[4] for p in pares],
+        }
+        pares_cte = "WITH pares AS (SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:meses AS date[])) AS p(id_cliente, mes))"
+        with db.engine.begin() as conn:
+            conn.execute(text(f"""
+                {pares_cte}
+                DELETE FROM {destino} d
+                USING pares p
+                WHERE d.id_cliente = p.id_cliente
+                  AND d.data = p.mes;
+            """), params)
+            conn.execute(text(f"""
+                {pares_cte}
+                INSERT INTO {destino} (id_cliente, data, {grupo}, valor)
+                SELECT o.id_cliente, p.mes, {", ".join("o." + c for c in colunas)}, SUM(o.valor)
+                FROM {origem} o
+                JOIN pares p
+                  ON o.id_cliente = p.id_cliente
+                  AND o.data >= p.mes
+                  AND o.data < p.mes + INTERVAL '1 month'
+                GROUP BY o.id_cliente, p.mes, {", ".join("o." + c for c in colunas)};
+            """), params)
+            conn.execute(text(f"""
+                WITH pares AS (
+                    SELECT * FROM unnest(CAST(:ids AS integer[]), CAST(:meses AS date[]),
+                                         CAST(:linhas AS bigint[]), CAST(:somas AS numeric[]),
+                                         CAST(:hashes AS text[]))
+                        AS p(id_cliente, mes, linhas, soma, hash)
+                ),
+                removidos AS (
+                    DELETE FROM agregados_mensais_controle c
+                    USING pares p
+                    WHERE c.tabela = :origem
+                      AND c.id_cliente = p.id_cliente
+                      AND c.data = p.mes
+                      AND p.linhas IS NULL
+                )
+                INSERT INTO agregados_mensais_controle (tabela, id_cliente, data, linhas, soma, hash, atualizado_em)
+                SELECT :origem, id_cliente, mes, linhas, soma, hash, now()
+                FROM pares
+                WHERE linhas IS NOT NULL
+                ON CONFLICT (tabela, id_cliente, data)
+                DO UPDATE SET linhas = EXCLUDED.linhas, soma = EXCLUDED.soma, hash = EXCLUDED.hash,
+                              atualizado_em = EXCLUDED.atualizado_em;
+            """), params)
+        return len(pares)
+    except Exception as e:
+        raise RuntimeError(f"Erro ao atualizar {destino}: {str(e)}")
+
+
+def atualizar_agregados_mensais(db: DatabaseConnection, id_cliente: Optional[List[int]] = None,
+                                desde: Optional[date] = None) -> Dict[str, int]:
+    """Atualiza fc_mensal e dre_mensal; retorna a quantidade de pares cliente/mês recalculados por tabela."""
+    return {destino: atualizar_agregado(db, origem, id_cliente, desde) for origem, (destino, _) in AGREGADOS.items()}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Atualiza os agregados mensais fc_mensal e dre_mensal.")
+    parser.add_argument("--clientes", help="IDs separados por vírgula (padrão: todos)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primeiro mês a verificar, AAAA-MM-DD (padrão: todos)")
+    args = parser.parse_args()
+    ids = [int(x) for x in args.clientes.split(",") if x.strip().isdigit()] if args.clientes else None
+    for tabela, pares in atualizar_agregados_mensais(DatabaseConnection(), ids, args.desde).items():
+        logging.info(f"{tabela}: {pares} pares cliente/mês recalculados")
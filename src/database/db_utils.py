@@ -1,33 +1,563 @@
 #src/database/db_utils.py
-import pandas as pd
-from sqlalchemy import create_engine, text
-from typing import Optional, Union, Dict, List, Tuple
+from sqlalchemy import create_engine, event, text
+from psycopg2.extensions import DECIMAL, new_type, register_type
+from psycopg2.extras import NamedTupleCursor
+from typing import Optional, Union, Dict, List, Tuple, Any, Iterator
+from contextlib import contextmanager
 from datetime import date
+import bisect
+import functools
+import logging
+import hashlib
+import re
 import sys
 import os
+import threading
+import time
 
 # Garantir que o diretório raiz está no Python path
 root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
-from config.settings import DB_CONFIG
+from config.settings import DB_CONFIG, POOL_CONFIG
+from src.database.explain import CapturaExplain
+
+# NUMERIC -> float direto no driver (mesmo valor que o pandas obtinha convertendo o Decimal)
+NUMERIC_COMO_FLOAT = new_type(DECIMAL.values, "NUMERIC_COMO_FLOAT", lambda valor, cursor: float(valor) if valor is not None else None)
+
+class MetricasPool:
+    """Medidores do pool de conexões do processo: conexões em uso e espera pelo checkout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.em_uso = 0
+        self.em_uso_max = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.em_uso_max = max(self.em_uso_max, self.em_uso)
+
+    def registrar_checkin(self) -> None:
+        with self._lock:
+            self.em_uso -= 1
+
+    def registrar_espera(self, segundos: float) -> None:
+        with self._lock:
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "em_uso": self.em_uso,
+                "em_uso_max": self.em_uso_max,
+                "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "espera_max_ms": round(self.espera_max * 1000, 2),
+            }
+
+
+def _congelar(valor: Any) -> Any:
+    """Forma hashable de um parâmetro de consulta (listas viram tuplas)."""
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, set):
+        return frozenset(_congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    return valor
+
+
+class ConsultasEmVoo:
+    """Coalescência de consultas idênticas em andamento ("single-flight").
+
+    Chamadas concorrentes com a mesma consulta (SQL compilado e parâmetros) aguardam
+    a execução já em andamento e recebem o mesmo resultado (ou o mesmo erro), em vez
+    de repetir a consulta no Postgres. Nada é guardado após o término da execução.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo: Dict[Any, Dict[str, Any]] = {}
+        self.executadas = 0
+        self.compartilhadas = 0
+
+    def executar(self, chave: Any, funcao) -> Any:
+        """Executa `funcao()` ou aguarda a execução em andamento com a mesma `chave`."""
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = {"pronto": threading.Event(), "resultado": None, "erro": None}
+                self._em_voo[chave] = voo
+                self.executadas += 1
+            else:
+                self.compartilhadas += 1
+        if not lider:
+            voo["pronto"].wait()
+            if voo["erro"] is not None:
+                raise voo["erro"]
+            return list(voo["resultado"])
+
+        try:
+            voo["resultado"] = funcao()
+            return list(voo["resultado"])
+        except Exception as e:
+            voo["erro"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+            voo["pronto"].set()
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "consultas_executadas": self.executadas,
+                "consultas_compartilhadas": self.compartilhadas,
+                "consultas_em_voo": len(self._em_voo),
+            }
+
+
+class RetratosCompartilhados:
+    """Retratos exportados pelas sessões abertas no processo, para sessões que começam logo depois.
+
+    Uma sessão nova importa o retrato de outra aberta há menos de
+    POOL_CONFIG["retrato_compartilhado_ms"]: as duas veem os mesmos dados e suas consultas
+    idênticas podem ser coalescidas (ver `DatabaseConnection.fetch_rows`). Cada entrada
+    guarda a raiz (primeiro retrato exportado da cadeia) e o momento da exportação da raiz,
+    de modo que a idade do retrato compartilhado nunca passa da janela.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retratos: Dict[str, Tuple[str, float]] = {}
+
+    def registrar(self, snapshot: str, raiz: str, criado_em: float) -> None:
+        with self._lock:
+            self._retratos[snapshot] = (raiz, criado_em)
+
+    def remover(self, snapshot: str) -> None:
+        with self._lock:
+            self._retratos.pop(snapshot, None)
+
+    def recente(self, janela_s: float) -> Optional[Tuple[str, str, float]]:
+        """(snapshot, raiz, criado_em) da raiz mais nova exportada dentro da janela; None se não houver."""
+        limite = time.monotonic() - janela_s
+        with self._lock:
+            candidatos = [(criado_em, snapshot, raiz) for snapshot, (raiz, criado_em) in self._retratos.items()
+                          if criado_em >= limite]
+        if not candidatos:
+            return None
+        criado_em, snapshot, raiz = max(candidatos)
+        return snapshot, raiz, criado_em
+
+
+# Parâmetros no formato pyformat do psycopg2, como gerados pela compilação do SQLAlchemy
+_PARAMETRO_PYFORMAT = re.compile(r"%\((\w+)\)s")
+
+
+@functools.lru_cache(maxsize=512)
+def comando_preparado(sql: str) -> Tuple[str, str, str]:
+    """Nome, PREPARE e EXECUTE de uma consulta compilada (parâmetros `%(nome)s` viram `$n`).
+
+    O nome deriva do hash do SQL, de modo que o mesmo texto reaproveita o mesmo
+    comando preparado em cada conexão.
+    """
+    nomes: List[str] = []
+
+    def posicional(m) -> str:
+        if m.group(1) not in nomes:
+            nomes.append(m.group(1))
+        return f"${nomes.index(m.group(1)) + 1}"
+
+    corpo = _PARAMETRO_PYFORMAT.sub(posicional, sql).replace("%%", "%").strip().rstrip(";")
+    nome = "q_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:20]
+    execute = f"EXECUTE {nome}" + (f" ({', '.join(f'%({n})s' for n in nomes)})" if nomes else "")
+    return nome, f"PREPARE {nome} AS {corpo}", execute
+
+
+class MetricasPreparadas:
+    """Contadores dos comandos preparados: preparações, reaproveitamentos do plano e recusas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.preparacoes = 0
+        self.reusos = 0
+        self.recusadas = 0
+        # Consultas que o Postgres não conseguiu preparar (ex.: tipo de parâmetro indeterminado)
+        self.nao_preparaveis: set = set()
+
+    def registrar(self, contador: str) -> None:
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def recusar(self, nome: str) -> None:
+        with self._lock:
+            self.recusadas += 1
+            self.nao_preparaveis.add(nome)
+
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "preparadas_criadas": self.preparacoes,
+                "preparadas_reusadas": self.reusos,
+                "preparadas_recusadas": self.recusadas,
+            }
+
+
+# Limites superiores (ms) das faixas do histograma de tempo das consultas
+FAIXAS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def rotulo_chamador() -> str:
+    """Rótulo de uma consulta: o método `calcular_*`/`carregar_*` mais próximo na pilha de chamadas.
+
+    Sem um desses métodos na pilha, usa a primeira função fora deste módulo.
+    """
+    frame = sys._getframe(1)
+    externo = None
+    while frame is not None:
+        if frame.f_code.co_filename != __file__:
+            nome = frame.f_code.co_name
+            if nome.startswith(("calcular_", "carregar_")):
+                return nome
+            if externo is None:
+                externo = nome
+        frame = frame.f_back
+    return externo or "desconhecido"
+
+
+def bytes_texto(linhas: List[Tuple]) -> int:
+    """Estimativa dos bytes recebidos: tamanho da representação em texto de cada valor (protocolo texto do psycopg2)."""
+    return sum(len(str(valor).encode("utf-8")) for linha in linhas for valor in linha if valor is not None)
+
+
+class MetricasConsultas:
+    """Tempo, linhas e bytes das consultas por rótulo, com histograma de tempo (faixas em FAIXAS_MS)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_rotulo: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(self, rotulo: str, segundos: float, linhas: int, bytes_recebidos: int) -> None:
+        ms = segundos * 1000
+        with self._lock:
+            m = self._por_rotulo.get(rotulo)
+            if m is None:
+                m = self._por_rotulo[rotulo] = {
+                    "consultas": 0, "tempo_total_ms": 0.0, "tempo_max_ms": 0.0,
+                    "linhas": 0, "bytes": 0, "histograma": [0] * (len(FAIXAS_MS) + 1),
+                }
+            m["consultas"] += 1
+            m["tempo_total_ms"] += ms
+            m["tempo_max_ms"] = max(m["tempo_max_ms"], ms)
+            m["linhas"] += linhas
+            m["bytes"] += bytes_recebidos
+            m["histograma"][bisect.bisect_left(FAIXAS_MS, ms)] += 1
+
+    def resumo(self) -> Dict[str, Any]:
+        """Totais e métricas por rótulo (do mais lento para o mais rápido em tempo total)."""
+        faixas = [f"<={limite}ms" for limite in FAIXAS_MS] + [f">{FAIXAS_MS[-1]}ms"]
+        with self._lock:
+            por_rotulo = {
+                rotulo: {
+                    "consultas": m["consultas"],
+                    "tempo_total_ms": round(m["tempo_total_ms"], 2),
+                    "tempo_medio_ms": round(m["tempo_total_ms"] / m["consultas"], 2),
+                    "tempo_max_ms": round(m["tempo_max_ms"], 2),
+                    "linhas": m["linhas"],
+                    "bytes": m["bytes"],
+                    "histograma": {faixa: n for faixa, n in zip(faixas, m["histograma"]) if n},
+                }
+                for rotulo, m in sorted(self._por_rotulo.items(), key=lambda item: -item[1]["tempo_total_ms"])
+            }
+        return {
+            "consultas": sum(m["consultas"] for m in por_rotulo.values()),
+            "tempo_total_ms": round(sum(m["tempo_total_ms"] for m in por_rotulo.values()), 2),
+            "linhas": sum(m["linhas"] for m in por_rotulo.values()),
+            "bytes": sum(m["bytes"] for m in por_rotulo.values()),
+            "por_rotulo": por_rotulo,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+metricas_pool = MetricasPool()
+consultas_em_voo = ConsultasEmVoo()
+retratos_compartilhados = RetratosCompartilhados()
+metricas_preparadas = MetricasPreparadas()
+metricas_consultas = MetricasConsultas()
+
+
+def obter_engine():
+    """Engine SQLAlchemy único do processo (criado na primeira chamada), com o pool configurado em POOL_CONFIG."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+                f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}",
+                pool_size=POOL_CONFIG["pool_size"],        # Conexões persistentes
+                max_overflow=POOL_CONFIG["max_overflow"],  # Conexões extras em picos
+                pool_timeout=POOL_CONFIG["pool_timeout"],  # Espera máxima por uma conexão livre
+                pool_pre_ping=True,   # Verifica se conexão está viva antes de usar
+                pool_recycle=POOL_CONFIG["pool_recycle"],  # Recicla conexões periodicamente
+                echo=False            # Desabilita logs SQL verbosos
+            )
+            event.listen(_engine, "checkout", lambda *args: metricas_pool.registrar_checkout())
+            event.listen(_engine, "checkin", lambda *args: metricas_pool.registrar_checkin())
+        return _engine
+
+
+def estado_pool() -> Dict[str, Any]:
+    """Medidores do pool para dimensionamento: configuração, conexões abertas/em uso e espera pelo checkout."""
+    engine = obter_engine()
+    return {
+        "pool_size": engine.pool.size(),
+        "max_overflow": POOL_CONFIG["max_overflow"],
+        "conexoes_abertas": engine.pool.checkedin() + engine.pool.checkedout(),
+        "em_uso_pool": engine.pool.checkedout(),
+        **metricas_pool.resumo(),
+        **consultas_em_voo.resumo(),
+        **metricas_preparadas.resumo(),
+    }
+
 
 class DatabaseConnection:
     def __init__(self):
-        self.engine = create_engine(
-            f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-            f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}",
-            pool_size=5,          # Máximo 5 conexões persistentes
-            max_overflow=2,       # +2 conexões extras em picos
-            pool_pre_ping=True,   # Verifica se conexão está viva antes de usar
-            pool_recycle=3600,    # Recicla conexões após 1 hora
-            echo=False            # Desabilita logs SQL verbosos
-        )
-
-    def execute_query(self, query: Union[str, text], params: Optional[Union[Dict, List, Tuple]] = None) -> pd.DataFrame:
+        # Todas as instâncias compartilham o engine (e o pool) do processo
+        self.engine = obter_engine()
+        # Conexão fixada por `session()`; None fora de uma sessão
+        self._sessao = None
+        self._sessao_lock = threading.Lock()
+        self._sessao_invalida = False
+        # Retrato exportado pela transação da sessão (pg_export_snapshot) e conexões auxiliares que o importam
+        self._snapshot: Optional[str] = None
+        # Raiz do retrato (igual entre sessões que o compartilham); entra na chave da coalescência
+        self._retrato: Optional[str] = None
+        self._auxiliares: List[Any] = []
+        self._auxiliares_livres: List[Any] = []
+        self._auxiliares_reservadas = 0
+        self._auxiliares_lock = threading.Lock()
+        # Métricas das consultas desta instância (uma instância por requisição na API)
+        self.metricas_consultas = MetricasConsultas()
+        # Modo diagnóstico: planos das consultas de Indicadores (ver src/database/explain.py)
+        self.captura_explain: Optional[CapturaExplain] = CapturaExplain() if POOL_CONFIG["explain"] else None
+
+    def ativar_explain(self) -> CapturaExplain:
+        """Ativa a captura de `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` das consultas de Indicadores desta instância."""
+        if self.captura_explain is None:
+            self.captura_explain = CapturaExplain()
+        return self.captura_explain
+
+    def _registrar_consulta(self, rotulo: str, segundos: float, linhas: int, bytes_recebidos: int,
+                            params: Any) -> None:
+        """Registra a consulta nas métricas do processo e da instância; loga se passar do limite de consulta lenta."""
+        metricas_consultas.registrar(rotulo, segundos, linhas, bytes_recebidos)
+        self.metricas_consultas.registrar(rotulo, segundos, linhas, bytes_recebidos)
+        limite_ms = POOL_CONFIG["consulta_lenta_ms"]
+        if limite_ms and segundos * 1000 >= limite_ms:
+            logging.warning(
+                f"🐢 Consulta lenta [{rotulo}]: {segundos * 1000:.1f} ms, {linhas} linhas, {bytes_recebidos} bytes, parâmetros={params}"
+            )
+
+    @contextmanager
+    def session(self) -> Iterator["DatabaseConnection"]:
+        """Fixa uma conexão em uma transação somente leitura REPEATABLE READ.
+
+        Dentro do bloco, todas as consultas desta instância (`fetch_rows`, `execute_query`)
+        veem o mesmo retrato dos dados em todas as páginas, mesmo com uma carga do ETL em
+        andamento, sem checkout/ping por consulta na conexão fixada.
+
+        O retrato é exportado (`pg_export_snapshot`) para que consultas simultâneas
+        (`Indicadores.calcular_em_paralelo`) não fiquem em fila na conexão fixada: enquanto
+        ela está ocupada, `fetch_rows` usa conexões auxiliares do pool, cada uma em uma
+        transação que importa o mesmo retrato (`SET TRANSACTION SNAPSHOT`). Por isso
+        `limite_conexoes()` continua sendo o tamanho do pool dentro da sessão; se o retrato
+        não puder ser exportado, as consultas rodam uma de cada vez (limite 1).
+
+        Se uma consulta falhar na conexão fixada, a transação fica abortada no Postgres; as
+        consultas seguintes da sessão voltam a usar o pool, como fora dela. Sessões
+        aninhadas reaproveitam a conexão da sessão externa.
+        """
+        if self._sessao is not None:
+            yield self
+            return
+        inicio_checkout = time.perf_counter()
+        with self.engine.connect() as conn:
+            metricas_pool.registrar_espera(time.perf_counter() - inicio_checkout)
+            conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+            with conn.begin():
+                self._sessao = conn
+                self._sessao_invalida = False
+                self._snapshot, self._retrato = self._iniciar_retrato(conn)
+                try:
+                    yield self
+                finally:
+                    if self._snapshot is not None:
+                        retratos_compartilhados.remover(self._snapshot)
+                    self._sessao = None
+                    self._snapshot = None
+                    self._retrato = None
+                    self._fechar_auxiliares()
+
+    def _iniciar_retrato(self, conn) -> Tuple[Optional[str], Optional[str]]:
+        """(snapshot exportado, raiz) da transação da sessão.
+
+        Importa o retrato de uma sessão aberta há menos de POOL_CONFIG["retrato_compartilhado_ms"]
+        (ver `RetratosCompartilhados`), se houver; depois exporta o retrato da própria
+        transação para as conexões auxiliares e para as sessões seguintes.
+        """
+        janela_ms = POOL_CONFIG["retrato_compartilhado_ms"]
+        candidato = retratos_compartilhados.recente(janela_ms / 1000) if janela_ms > 0 else None
+        if candidato is not None:
+            try:
+                cursor = conn.connection.cursor()
+                try:
+                    cursor.execute("SET TRANSACTION SNAPSHOT %s", (candidato[0],))
+                finally:
+                    cursor.close()
+            except Exception:
+                # A sessão de origem terminou entre a busca e a importação: segue com retrato próprio
+                conn.connection.rollback()
+                candidato = None
+        snapshot = self._exportar_snapshot(conn)
+        if snapshot is None:
+            return None, None
+        raiz, criado_em = (candidato[1], candidato[2]) if candidato is not None else (snapshot, time.monotonic())
+        retratos_compartilhados.registrar(snapshot, raiz, criado_em)
+        return snapshot, raiz
+
+    @staticmethod
+    def _exportar_snapshot(conn) -> Optional[str]:
+        """Exporta o retrato da transação da sessão; None se o servidor recusar (a sessão segue sem auxiliares)."""
+        try:
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute("SELECT pg_export_snapshot()")
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+        except Exception as e:
+            # Ainda não houve consulta na transação: desfazê-la só descarta a exportação recusada
+            conn.connection.rollback()
+            logging.warning(f"⚠️ Retrato da sessão não exportado; as consultas da sessão rodam uma de cada vez: {e}")
+            return None
+
+    def _conexao_auxiliar(self):
+        """Conexão auxiliar livre (ou nova, até o tamanho do pool) em uma transação com o retrato da sessão.
+
+        Retorna None se o limite foi atingido ou se o retrato não pôde ser importado.
+        """
+        with self._auxiliares_lock:
+            if self._auxiliares_livres:
+                return self._auxiliares_livres.pop()
+            if self._auxiliares_reservadas >= self.engine.pool.size() - 1:
+                return None
+            self._auxiliares_reservadas += 1
+        conn = None
+        try:
+            inicio_checkout = time.perf_counter()
+            conn = self.engine.connect()
+            metricas_pool.registrar_espera(time.perf_counter() - inicio_checkout)
+            conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+            conn.begin()
+            cursor = conn.connection.cursor()
+            try:
+                # Precisa ser o primeiro comando da transação
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", (self._snapshot,))
+            finally:
+                cursor.close()
+        except Exception as e:
+            logging.warning(f"⚠️ Conexão auxiliar da sessão não aberta: {e}")
+            if conn is not None:
+                conn.close()
+            with self._auxiliares_lock:
+                self._auxiliares_reservadas -= 1
+            return None
+        with self._auxiliares_lock:
+            self._auxiliares.append(conn)
+        return conn
+
+    def _devolver_auxiliar(self, conn, valida: bool) -> None:
+        """Devolve a conexão auxiliar às livres; se a consulta falhou (transação abortada), fecha-a."""
+        with self._auxiliares_lock:
+            if valida:
+                self._auxiliares_livres.append(conn)
+                return
+            self._auxiliares.remove(conn)
+            self._auxiliares_reservadas -= 1
+        conn.close()
+
+    def _fechar_auxiliares(self) -> None:
+        """Encerra as transações das conexões auxiliares e as devolve ao pool (fim da sessão)."""
+        with self._auxiliares_lock:
+            auxiliares, self._auxiliares, self._auxiliares_livres = self._auxiliares, [], []
+            self._auxiliares_reservadas = 0
+        for conn in auxiliares:
+            try:
+                conn.close()  # desfaz a transação somente leitura
+            except Exception:
+                pass
+
+    @contextmanager
+    def _conexao_da_sessao(self) -> Iterator[Tuple[Any, bool]]:
+        """(conexão, fixada) para uma consulta na sessão: a conexão fixada se estiver livre, senão uma auxiliar.
+
+        Sem auxiliar disponível, aguarda a conexão fixada.
+        """
+        if self._sessao_lock.acquire(blocking=False):
+            try:
+                yield self._sessao, True
+            finally:
+                self._sessao_lock.release()
+            return
+        auxiliar = self._conexao_auxiliar() if self._snapshot is not None else None
+        if auxiliar is None:
+            with self._sessao_lock:
+                yield self._sessao, True
+            return
+        valida = False
+        try:
+            yield auxiliar, False
+            valida = True
+        finally:
+            self._devolver_auxiliar(auxiliar, valida)
+
+    @property
+    def sessao_invalida(self) -> bool:
+        """True se uma consulta falhou na conexão fixada da sessão atual (as seguintes usam o pool)."""
+        return self._sessao is not None and self._sessao_invalida
+
+    def _invalidar_sessao(self, erro: Exception) -> None:
+        """Marca a sessão como inválida após uma falha: as consultas seguintes voltam ao pool, fora do retrato."""
+        if not self._sessao_invalida:
+            logging.warning(f"⚠️ Sessão invalidada por erro de consulta; as consultas seguintes usam o pool, fora do retrato da sessão: {erro}")
+        self._sessao_invalida = True
+
+    def limite_conexoes(self) -> int:
+        """Quantidade de conexões persistentes do pool (teto para consultas simultâneas).
+
+        Dentro de `session()`, o paralelismo depende do retrato exportado: com ele, a
+        conexão fixada mais as auxiliares chegam ao tamanho do pool; sem ele, 1.
+        """
+        if self._sessao is not None and not self._sessao_invalida and self._snapshot is None:
+            return 1
+        return self.engine.pool.size()
+
+    def execute_query(self, query: Union[str, text], params: Optional[Union[Dict, List, Tuple]] = None) -> "pd.DataFrame":
         """Executa uma query SQL e retorna um DataFrame's a DataFrame.
 
+        Use apenas quando um DataFrame for de fato necessário; para agregados pequenos,
+        prefira `fetch_rows`/`fetch_scalar`, que não passam pelo pandas.
+
         Args:
             query: Consulta SQL (string ou objeto SQLAlchemy text).
             params: Parâmetros da consulta (dicionário, lista ou tupla).
@@ -38,16 +568,145 @@ class DatabaseConnection:
         Raises:
             ValueError: Se a consulta ou parâmetros forem inválidos.
         """
+        import pandas as pd  # importado sob demanda: o caminho principal não usa pandas
+        rotulo = rotulo_chamador()
+        na_sessao = self._sessao is not None and not self._sessao_invalida
         try:
-            return pd.read_sql_query(query, self.engine, params=params)
+            inicio = time.perf_counter()
+            if na_sessao:
+                with self._sessao_lock:
+                    df = pd.read_sql_query(query, self._sessao, params=params)
+            else:
+                df = pd.read_sql_query(query, self.engine, params=params)
         except Exception as e:
+            if na_sessao:
+                self._invalidar_sessao(e)
             raise ValueError(f"Erro ao executar consulta: {str(e)}")
+        # Para DataFrames, os bytes são o tamanho em memória do resultado
+        self._registrar_consulta(rotulo, time.perf_counter() - inicio, len(df), int(df.memory_usage(deep=True).sum()), params)
+        return df
+
+    @staticmethod
+    def _executar_preparada(conn, cursor, sql: str, parametros: Dict[str, Any]) -> None:
+        """Executa `sql` como comando preparado da conexão, preparando-o na primeira vez.
+
+        Os comandos já preparados ficam em `info` da conexão DBAPI (persistente entre
+        checkouts do pool). O PREPARE roda dentro de um SAVEPOINT: se o Postgres recusar
+        a consulta, a transação segue válida e a consulta passa a ser executada sem preparo.
+        """
+        nome, prepare, execute = comando_preparado(sql)
+        if nome in metricas_preparadas.nao_preparaveis:
+            cursor.execute(sql, parametros)
+            return
+        preparadas = conn.connection.info.setdefault("consultas_preparadas", set())
+        if nome in preparadas:
+            metricas_preparadas.registrar("reusos")
+        else:
+            cursor.execute("SAVEPOINT preparar_consulta")
+            try:
+                cursor.execute(prepare)
+                cursor.execute("RELEASE SAVEPOINT preparar_consulta")
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT preparar_consulta")
+                metricas_preparadas.recusar(nome)
+                cursor.execute(sql, parametros)
+                return
+            preparadas.add(nome)
+            metricas_preparadas.registrar("preparacoes")
+        cursor.execute(execute, parametros)
+
+    def fetch_rows(self, query: Union[str, text], params: Optional[Dict[str, Any]] = None,
+                   numeric_como_float: bool = True, preparada: bool = False) -> List[Tuple]:
+        """Executa uma query SQL direto no cursor DBAPI, sem DataFrame.
+
+        Dentro de `session()`, usa a conexão fixada da sessão (ou uma auxiliar com o mesmo
+        retrato, se a fixada estiver ocupada). Chamadas concorrentes com a mesma consulta e
+        os mesmos parâmetros compartilham uma única execução (ver `ConsultasEmVoo`): fora
+        de uma sessão, entre todas as chamadas; dentro dela, apenas entre sessões com o
+        mesmo retrato (ver `RetratosCompartilhados`).
+
+        Args:
+            query: Consulta SQL (string ou objeto SQLAlchemy text) com parâmetros no formato `:nome`.
+            params: Parâmetros da consulta.
+            numeric_como_float: Se True, valores NUMERIC chegam como float; se False, como Decimal.
+            preparada: Consulta de texto fixo de Indicadores. Se True, usa um comando preparado por conexão (PREPARE/EXECUTE), evitando
+                que o Postgres analise e planeje de novo consultas executadas com frequência, e
+                captura o plano da consulta quando o modo diagnóstico (`ativar_explain`) está ativo.
+
+        Returns:
+            Lista de namedtuples (acesso por posição ou por nome da coluna).
+
+        Raises:
+            ValueError: Se a consulta ou parâmetros forem inválidos.
+        """
+        try:
+            compilada = (text(query) if isinstance(query, str) else query).compile(dialect=self.engine.dialect)
+            sql = str(compilada)
+            parametros = compilada.construct_params(params or {})
+        except Exception as e:
+            raise ValueError(f"Erro ao executar consulta: {str(e)}")
+
+        rotulo = rotulo_chamador()
+
+        def consultar(conn) -> List[Tuple]:
+            cursor = conn.connection.cursor(cursor_factory=NamedTupleCursor)
+            try:
+                if preparada and self.captura_explain is not None:
+                    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, parametros)
+                    self.captura_explain.registrar(rotulo, sql, parametros, cursor.fetchone()[0][0])
+                inicio = time.perf_counter()
+                if numeric_como_float:
+                    register_type(NUMERIC_COMO_FLOAT, cursor)
+                if preparada and POOL_CONFIG["consultas_preparadas"]:
+                    self._executar_preparada(conn, cursor, sql, parametros)
+                else:
+                    cursor.execute(sql, parametros)
+                linhas = cursor.fetchall()
+            finally:
+                cursor.close()
+            self._registrar_consulta(rotulo, time.perf_counter() - inicio, len(linhas), bytes_texto(linhas), parametros)
+            return linhas
+
+        def executar() -> List[Tuple]:
+            try:
+                inicio_checkout = time.perf_counter()
+                with self.engine.connect() as conn:
+                    metricas_pool.registrar_espera(time.perf_counter() - inicio_checkout)
+                    return consultar(conn)
+            except Exception as e:
+                raise ValueError(f"Erro ao executar consulta: {str(e)}")
+
+        def executar_na_sessao() -> List[Tuple]:
+            with self._conexao_da_sessao() as (conn, fixada):
+                try:
+                    return consultar(conn)
+                except Exception as e:
+                    if fixada:
+                        self._invalidar_sessao(e)
+                    raise ValueError(f"Erro ao executar consulta: {str(e)}")
+
+        na_sessao = self._sessao is not None and not self._sessao_invalida
+        funcao = executar_na_sessao if na_sessao else executar
+        # Na sessão, só compartilha com quem lê o mesmo retrato (a mesma raiz); sem retrato exportado, não compartilha
+        retrato = self._retrato if na_sessao else None
+        if self.captura_explain is not None or (na_sessao and retrato is None):
+            return funcao()  # cada requisição em diagnóstico captura os próprios planos
+        chave = (sql, _congelar(parametros), numeric_como_float, retrato)
+        try:
+            hash(chave)
+        except TypeError:
+            return funcao()
+        return consultas_em_voo.executar(chave, funcao)
+
+    def fetch_scalar(self, query: Union[str, text], params: Optional[Dict[str, Any]] = None) -> Any:
+        """Executa uma query SQL e retorna a primeira coluna da primeira linha (ou None se não houver linhas)."""
+        linhas = self.fetch_rows(query, params)
+        return linhas[0][0] if linhas else None
 
 def buscar_clientes(db: DatabaseConnection) -> list:
     """Busca todos os clientes no banco."""
     query = "SELECT nome, id_cliente FROM cliente WHERE ativo = TRUE ORDER BY nome;" # so busca clientes ativos
-    df = db.execute_query(query)
-    return df.to_dict(orient='records') if not df.empty else []
+    return [linha._asdict() for linha in db.fetch_rows(query)]
 
 def obter_meses() -> List[tuple]:
     """Retorna lista de meses."""
@@ -79,11 +738,63 @@ def obter_anos(db: DatabaseConnection, id_cliente: int) -> List[int]:
         SELECT DISTINCT EXTRACT(YEAR FROM data)::integer AS ano
         FROM fc
         WHERE id_cliente = :id_cliente
-        AND EXTRACT(YEAR FROM data) <= :ano_atual
+        AND data < :fim
         ORDER BY ano DESC;
     """)
-    params = {"id_cliente": id_cliente, "ano_atual": date.today().year}
-    df = db.execute_query(query, params)
-    anos = df['ano'].tolist() if not df.empty else [date.today().year]
-    return anos
+    params = {"id_cliente": id_cliente, "fim": date(date.today().year + 1, 1, 1)}
+    anos = [linha.ano for linha in db.fetch_rows(query, params)]
+    return anos or [date.today().year]
+
+
+def obter_versao_dados(db: DatabaseConnection, id_cliente: List[int], agregados: bool = False) -> Tuple:
+    """Sonda barata da versão dos dados de um conjunto de clientes.
+
+    Combina, para fc, dre e indicador, a quantidade de linhas e a maior data do cliente (ambas
+    respondidas pelos índices por id_cliente) com o contador de escritas da tabela em
+    `pg_stat_user_tables` (inserções, atualizações e remoções, de qualquer cliente): uma
+    recarga que reescreve um mês com o mesmo número de linhas ou uma correção de valor
+    também mudam a versão, sem ler o histórico do cliente (o contador é publicado pelo
+    Postgres logo após o commit da carga, com atraso de até cerca de 1 s). Com `agregados`, fc e dre são
+    lidos de fc_mensal/dre_mensal: a versão passa a ser a da última atualização registrada
+    em agregados_mensais_controle, de modo que uma consulta feita entre a carga do fc e a
+    atualização do agregado não fica guardada sob a versão nova.
+
+    O plano de contas não entra aqui: a versão dele vem de `CachePlanoDeContas.versoes`
+    (ver `Indicadores.versao_dados`).
+
+    Args:
+        db: Instância de DatabaseConnection.
+        id_cliente: Lista de IDs de clientes.
+        agregados: Indica se Indicadores lê dos agregados mensais (INDICADORES_AGREGADOS_MENSAIS).
+
+    Returns:
+        Tupla ((tabela, linhas, ultima_data, alteracoes), ...) na ordem fc, dre, indicador.
+    """
+    def tabela_bruta(tabela: str) -> str:
+        return f"""
+        SELECT '{tabela}' AS tabela, COUNT(*) AS linhas, MAX(data)::text AS ultima_data,
+               (SELECT (n_tup_ins + n_tup_upd + n_tup_del)::text FROM pg_stat_user_tables
+                WHERE relid = '{tabela}'::regclass) AS alteracoes
+        FROM {tabela} WHERE id_cliente = ANY (:id_cliente)
+        """
+
+    def tabela_agregada(tabela: str) -> str:
+        # Uma linha por par cliente/mês atualizado; atualizado_em muda a cada recálculo
+        return f"""
+        SELECT '{tabela}_mensal' AS tabela, COUNT(*) AS linhas, MAX(data)::text AS ultima_data,
+               MAX(atualizado_em)::text AS alteracoes
+        FROM agregados_mensais_controle WHERE tabela = '{tabela}' AND id_cliente = ANY (:id_cliente)
+        """
 
+    origem = tabela_agregada if agregados else tabela_bruta
+    query = text(f"""
+        {origem("fc")}
+        UNION ALL
+        {origem("dre")}
+        UNION ALL
+        {tabela_bruta("indicador")};
+    """)
+    return tuple(
+        (row.tabela, row.linhas, row.ultima_data, row.alteracoes)
+        for row in db.fetch_rows(query, {"id_cliente": list(id_cliente)})
+    )
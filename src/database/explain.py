@@ -0,0 +1,100 @@
+# src/database/explain.py
+"""
+Modo diagnóstico: captura do plano de execução das consultas de Indicadores.
+
+Com o modo ativo (DB_EXPLAIN=true ou header `X-Explain: 1` na geração do PDF), cada
+consulta de Indicadores também é executada sob `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`.
+Os planos ficam guardados na `DatabaseConnection` da requisição e podem ser resumidos
+(varreduras sequenciais, linhas descartadas por filtro, leituras de buffer) ou salvos em JSON.
+
+Os planos são capturados com os mesmos parâmetros da consulta real, de modo que não é
+mais preciso copiar o SQL de indicadores.py à mão para investigar um relatório lento.
+"""
+
+import json
+import threading
+from typing import Any, Dict, Iterable, List
+
+
+def resumir_plano(plano: Dict[str, Any]) -> Dict[str, Any]:
+    """Resume um plano de `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`.
+
+    Args:
+        plano: Primeiro elemento da saída do EXPLAIN (com 'Plan', 'Planning Time' e 'Execution Time').
+
+    Returns:
+        Dicionário com as tabelas lidas por Seq Scan, linhas descartadas por filtro,
+        blocos lidos do disco/encontrados em cache e tempos de planejamento/execução.
+    """
+    seq_scans: List[str] = []
+    linhas_removidas = 0
+    pendentes = [plano["Plan"]]
+    while pendentes:
+        no = pendentes.pop()
+        if no.get("Node Type") == "Seq Scan":
+            seq_scans.append(no.get("Relation Name", "?"))
+        # Em nós executados em loop, o EXPLAIN informa a média por execução
+        linhas_removidas += int(no.get("Rows Removed by Filter", 0) * no.get("Actual Loops", 1))
+        pendentes.extend(no.get("Plans", []))
+    raiz = plano["Plan"]  # contadores de buffer da raiz já incluem os nós filhos
+    return {
+        "seq_scans": seq_scans,
+        "linhas_removidas_filtro": linhas_removidas,
+        "blocos_lidos": raiz.get("Shared Read Blocks", 0),
+        "blocos_em_cache": raiz.get("Shared Hit Blocks", 0),
+        "planejamento_ms": plano.get("Planning Time"),
+        "execucao_ms": plano.get("Execution Time"),
+    }
+
+
+class CapturaExplain:
+    """Planos capturados em uma requisição, na ordem de execução. Seguro para uso concorrente."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.planos: List[Dict[str, Any]] = []
+
+    def registrar(self, rotulo: str, sql: str, params: Dict[str, Any], plano: Dict[str, Any]) -> None:
+        registro = {
+            "rotulo": rotulo,
+            "sql": sql,
+            "params": {nome: str(valor) for nome, valor in params.items()},
+            "resumo": resumir_plano(plano),
+            "plano": plano,
+        }
+        with self._lock:
+            self.planos.append(registro)
+
+    def resumo(self) -> Dict[str, Any]:
+        """Totais da requisição e o resumo de cada consulta (sem os planos completos)."""
+        with self._lock:
+            consultas = [{"rotulo": p["rotulo"], **p["resumo"]} for p in self.planos]
+        return {
+            "consultas": len(consultas),
+            "com_seq_scan": sum(1 for c in consultas if c["seq_scans"]),
+            "linhas_removidas_filtro": sum(c["linhas_removidas_filtro"] for c in consultas),
+            "blocos_lidos": sum(c["blocos_lidos"] for c in consultas),
+            "blocos_em_cache": sum(c["blocos_em_cache"] for c in consultas),
+            "execucao_ms": round(sum(c["execucao_ms"] or 0 for c in consultas), 2),
+            "por_consulta": consultas,
+        }
+
+    def consultas_com_seq_scan(self, tabelas: Iterable[str] = ("fc", "fc_mensal")) -> List[Dict[str, Any]]:
+        """Registros cujo plano faz Seq Scan em alguma das tabelas."""
+        tabelas = set(tabelas)
+        with self._lock:
+            return [p for p in self.planos if tabelas & set(p["resumo"]["seq_scans"])]
+
+    def verificar_sem_seq_scan(self, tabelas: Iterable[str] = ("fc", "fc_mensal")) -> None:
+        """Falha (AssertionError) se algum plano capturado fizer Seq Scan nas tabelas; para uso em testes."""
+        regressoes = self.consultas_com_seq_scan(tabelas)
+        if regressoes:
+            detalhes = "; ".join(f"{p['rotulo']} ({', '.join(p['resumo']['seq_scans'])})" for p in regressoes)
+            raise AssertionError(f"{len(regressoes)} consulta(s) com Seq Scan: {detalhes}")
+
+    def salvar(self, caminho: str) -> None:
+        """Grava o resumo e os planos completos em um arquivo JSON."""
+        with self._lock:
+            planos = list(self.planos)
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump({"resumo": self.resumo(), "planos": planos}, arquivo, ensure_ascii=False, indent=2, default=str)
@@ -0,0 +1,71 @@
+# src/database/filtros_sql.py
+"""
+Fragmentos de SQL compartilhados pelas consultas de fc, dre e indicador.
+
+Os predicados gerados aqui são "sargáveis": comparam a coluna diretamente com
+parâmetros (intervalo semiaberto de datas, igualdade simples), de modo que o
+Postgres consegue usar os índices de src/queries/INDICES_RECOMENDADOS.txt.
+Evite EXTRACT(... FROM data) e COALESCE(:param, '') nas cláusulas WHERE.
+"""
+
+from datetime import date
+from typing import Dict, Optional
+from dateutil.relativedelta import relativedelta
+
+
+def periodo_mes(mes: date, prefixo: str = "") -> Dict[str, date]:
+    """Parâmetros do intervalo semiaberto [primeiro dia do mês, primeiro dia do mês seguinte).
+
+    Args:
+        mes: Qualquer data dentro do mês desejado.
+        prefixo: Prefixo dos nomes dos parâmetros (ex.: 'prev_' gera prev_inicio/prev_fim).
+
+    Returns:
+        Dicionário com '<prefixo>inicio' e '<prefixo>fim'.
+    """
+    inicio = mes.replace(day=1)
+    return {f"{prefixo}inicio": inicio, f"{prefixo}fim": inicio + relativedelta(months=1)}
+
+
+def filtro_periodo(coluna: str = "data", prefixo: str = "") -> str:
+    """Predicado `coluna >= :inicio AND coluna < :fim` (use com `periodo_mes`)."""
+    return f"{coluna} >= :{prefixo}inicio AND {coluna} < :{prefixo}fim"
+
+
+def _filtro_opcional(valor: Optional[str], coluna: str, parametro: str) -> str:
+    # Sem filtro, a cláusula é omitida (em vez de COALESCE(:param, '') = '' OR ...)
+    return f"AND {coluna} = :{parametro}" if valor else ""
+
+
+def filtro_centro_custo(centro_custo: Optional[str], coluna: str = "centro_custo") -> str:
+    """Cláusula `AND coluna = :centro_custo`, ou vazia quando não há filtro de centro de custo."""
+    return _filtro_opcional(centro_custo, coluna, "centro_custo")
+
+
+def filtro_empresa(empresa: Optional[str], coluna: str = "empresa") -> str:
+    """Cláusula `AND coluna = :empresa`, ou vazia quando não há filtro de empresa."""
+    return _filtro_opcional(empresa, coluna, "empresa")
+
+
+def normalizar_nivel_1(nivel_1: str) -> str:
+    """Forma normalizada do nivel_1, equivalente a LOWER(TRIM(nivel_1))."""
+    return nivel_1.strip(" ").lower()
+
+
+def filtro_nivel_1(*niveis: str, coluna: str = "nivel_1") -> str:
+    """Igualdade normalizada do nivel_1, compatível com o índice sobre LOWER(TRIM(nivel_1)).
+
+    Os níveis são constantes do código (não entrada do usuário) e já saem normalizados,
+    para que o lado direito da comparação não dependa de funções.
+
+    Args:
+        *niveis: Um ou mais valores de nivel_1.
+        coluna: Coluna comparada (ex.: 'f.nivel_1').
+
+    Returns:
+        `LOWER(TRIM(coluna)) = '<nivel>'` ou `LOWER(TRIM(coluna)) IN (...)`.
+    """
+    literais = ", ".join("'" + normalizar_nivel_1(n).replace("'", "''") + "'" for n in niveis)
+    if len(niveis) == 1:
+        return f"LOWER(TRIM({coluna})) = {literais}"
+    return f"LOWER(TRIM({coluna})) IN ({literais})"
@@ -0,0 +1,169 @@
+# src/database/metadados.py
+"""
+Metadados dos seletores da UI e da API: clientes ativos, anos com dados e centros de custo/empresas.
+
+Cada função atende a uma lista de clientes com uma única consulta (`= ANY (:id_cliente)`)
+e guarda o resultado em um cache curto do processo (METADADOS_CONFIG["ttl_segundos"]),
+de modo que os seletores da UI e cada requisição de PDF não repetem as mesmas consultas.
+Um TTL curto basta: os metadados só mudam com as cargas do ETL.
+"""
+
+import copy
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import text
+import sys
+import os
+
+# Garantir que o diretório raiz está no Python path
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from src.database.db_utils import DatabaseConnection, buscar_clientes
+from src.database.filtros_sql import periodo_mes, filtro_periodo
+from src.core.cache import AUSENTE, CacheGlobal, normalizar_clientes
+from config.settings import METADADOS_CONFIG
+
+QUERY_ANOS = text("""
+    SELECT DISTINCT id_cliente, EXTRACT(YEAR FROM data)::integer AS ano
+    FROM fc
+    WHERE id_cliente = ANY (:id_cliente)
+      AND data < :fim;
+""")
+
+# Centros de custo do fc seguidos das empresas do dre, cada grupo em ordem alfabética
+QUERY_CENTROS_CUSTO = text(f"""
+    SELECT nome
+    FROM (
+      SELECT DISTINCT centro_custo AS nome, 0 AS origem
+      FROM fc
+      WHERE id_cliente = ANY (:id_cliente)
+        AND {filtro_periodo()}
+        AND centro_custo IS NOT NULL
+        AND TRIM(centro_custo) != ''
+      UNION ALL
+      SELECT DISTINCT empresa, 1
+      FROM dre
+      WHERE id_cliente = ANY (:id_cliente)
+        AND {filtro_periodo()}
+        AND empresa IS NOT NULL
+        AND TRIM(empresa) != ''
+    ) nomes
+    ORDER BY origem, nome;
+""")
+
+QUERY_NOMES_CLIENTES = text("""
+    SELECT id_cliente, nome
+    FROM cliente
+    WHERE id_cliente = ANY (:id_cliente)
+      AND ativo = TRUE;
+""")
+
+_cache_metadados: Optional[CacheGlobal] = None
+_cache_metadados_lock = threading.Lock()
+
+
+def obter_cache_metadados() -> Optional[CacheGlobal]:
+    """Retorna o cache de metadados do processo (apenas memória) ou None se o TTL for 0."""
+    global _cache_metadados
+    if METADADOS_CONFIG["ttl_segundos"] <= 0:
+        return None
+    with _cache_metadados_lock:
+        if _cache_metadados is None:
+            _cache_metadados = CacheGlobal(
+                max_entradas=METADADOS_CONFIG["max_entradas"],
+                ttl_segundos=METADADOS_CONFIG["ttl_segundos"],
+            )
+        return _cache_metadados
+
+
+def _em_cache(chave: tuple, funcao: Callable[[], Any]) -> Any:
+    """Resultado de `funcao()` guardado sob `chave`; devolve sempre uma cópia."""
+    cache = obter_cache_metadados()
+    if cache is None:
+        return funcao()
+    valor = cache.obter(chave)
+    if valor is AUSENTE:
+        valor = funcao()
+        cache.guardar(chave, valor)
+    return copy.deepcopy(valor)
+
+
+def listar_clientes_ativos(db: DatabaseConnection) -> List[Dict[str, Any]]:
+    """Clientes ativos (`id_cliente`, `nome`) ordenados por nome, como `buscar_clientes`, com cache curto."""
+    return _em_cache(("clientes",), lambda: buscar_clientes(db))
+
+
+def obter_anos_clientes(db: DatabaseConnection, id_cliente: Iterable[int]) -> List[int]:
+    """Anos com dados no fc para um conjunto de clientes, em uma única consulta.
+
+    Mesmo resultado da união de `obter_anos` cliente a cliente: anos até o atual em ordem
+    decrescente, e o ano atual para qualquer cliente inválido ou sem dados.
+
+    Args:
+        db: Instância de DatabaseConnection.
+        id_cliente: IDs dos clientes.
+
+    Returns:
+        Lista de anos distintos em ordem decrescente.
+    """
+    clientes = normalizar_clientes(list(id_cliente))
+    hoje = date.today()
+
+    def consultar() -> List[int]:
+        validos = [c for c in clientes if isinstance(c, int) and c > 0]
+        anos_por_cliente: Dict[int, set] = {c: set() for c in validos}
+        if validos:
+            params = {"id_cliente": validos, "fim": date(hoje.year + 1, 1, 1)}
+            for linha in db.fetch_rows(QUERY_ANOS, params):
+                anos_por_cliente[linha.id_cliente].add(linha.ano)
+        anos = set().union(*anos_por_cliente.values())
+        if len(validos) < len(clientes) or any(not a for a in anos_por_cliente.values()):
+            anos.add(hoje.year)
+        return sorted(anos, reverse=True)
+
+    return _em_cache(("anos", clientes, hoje.year), consultar)
+
+
+def buscar_centros_custo(db: DatabaseConnection, id_cliente: Iterable[int], ano: int, mes: int) -> List[str]:
+    """Centros de custo (fc) e empresas (dre) com dados no mês, em uma única consulta.
+
+    Args:
+        db: Instância de DatabaseConnection.
+        id_cliente: IDs dos clientes.
+        ano: Ano do período.
+        mes: Mês do período.
+
+    Returns:
+        Centros de custo em ordem alfabética, seguidos das empresas que não são também centros de custo.
+    """
+    clientes = normalizar_clientes(list(id_cliente))
+
+    def consultar() -> List[str]:
+        params = {"id_cliente": list(clientes), **periodo_mes(date(ano, mes, 1))}
+        # dict.fromkeys remove repetidos mantendo a primeira ocorrência (centro de custo antes de empresa)
+        return list(dict.fromkeys(linha.nome for linha in db.fetch_rows(QUERY_CENTROS_CUSTO, params)))
+
+    return _em_cache(("centros_custo", clientes, ano, mes), consultar)
+
+
+def buscar_nomes_clientes(db: DatabaseConnection, id_cliente: Iterable[int]) -> Dict[int, str]:
+    """Nomes dos clientes ativos informados, {id_cliente: nome}, sem listar a base inteira.
+
+    Clientes inativos ou inexistentes ficam fora do dicionário, como em `buscar_clientes`.
+    """
+    clientes = normalizar_clientes(list(id_cliente))
+
+    def consultar() -> Dict[int, str]:
+        return {linha.id_cliente: linha.nome for linha in db.fetch_rows(QUERY_NOMES_CLIENTES, {"id_cliente": list(clientes)})}
+
+    return _em_cache(("nomes_clientes", clientes), consultar)
+
+
+def limpar_cache_metadados() -> None:
+    """Descarta os metadados guardados (ex.: logo após uma carga do ETL)."""
+    cache = obter_cache_metadados()
+    if cache is not None:
+        cache.limpar()
@@ -12,6 +12,7 @@ if root_dir not in sys.path:
     sys.path.insert(0, root_dir)
 
 from src.database.db_utils import DatabaseConnection, buscar_clientes, obter_meses, obter_anos
+from src.database.metadados import obter_anos_clientes
 
 # Configuração da API
 API_URL = "https://ize-relatorios-api-1052359947797.southamerica-east1.run.app/v1/relatorios/pdf"
@@ -243,12 +244,8 @@ def main():
     with col_periodo2:
         # Se for multi-cliente, busque anos de todos os clientes selecionados
         if multi_cliente and cliente_ids:
-            todos_anos = []
-            for id_cliente in cliente_ids:
-                anos_cliente = obter_anos(db, id_cliente)
-                todos_anos.extend(anos_cliente)
-            # Remove duplicados e ordena
-            anos = sorted(list(set(todos_anos)), reverse=True)
+            # Uma única consulta para todos os clientes (já sem duplicados e ordenada)
+            anos = obter_anos_clientes(db, cliente_ids)
         else:
             anos = obter_anos(db, cliente_id)
             
@@ -2,6 +2,7 @@ import streamlit as st
 from streamlit_quill import st_quill
 from datetime import date, timedelta
 from src.database.db_utils import DatabaseConnection, buscar_clientes, obter_meses, obter_anos
+from src.database.metadados import obter_anos_clientes
 from src.core.indicadores import Indicadores
 from src.core.relatorios import (
     Relatorio1, Relatorio2, Relatorio3, Relatorio4, Relatorio5, Relatorio6, Relatorio7, Relatorio8
@@ -163,12 +164,8 @@ def main():
     with col_periodo2:
         # Se for multi-cliente, busque anos de todos os clientes selecionados
         if multi_cliente and cliente_ids:
-            todos_anos = []
-            for id_cliente in cliente_ids:
-                anos_cliente = obter_anos(db, id_cliente)
-                todos_anos.extend(anos_cliente)
-            # Remove duplicados e ordena
-            anos = sorted(list(set(todos_anos)), reverse=True)
+            # Uma única consulta para todos os clientes (já sem duplicados e ordenada)
+            anos = obter_anos_clientes(db, cliente_ids)
         else:
             anos = obter_anos(db, cliente_id)
             
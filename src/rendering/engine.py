@@ -3,7 +3,8 @@ import os
 import tempfile
 import subprocess
 from pathlib import Path
-from typing import List, Tuple, Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
 from pypdf import PdfReader, PdfWriter
 import io
 import logging
@@ -19,6 +20,13 @@ import threading
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ordem canônica das páginas no PDF final
+ORDEM_RELATORIOS = [
+    "Índice",
+    "Relatório 1", "Relatório 2", "Relatório 3", "Relatório 4",
+    "Relatório 5", "Relatório 6", "Relatório 7", "Relatório 8"
+]
+
 class PdfUtils:
     """Utilitários para manipulação de arquivos PDF."""
     
@@ -268,13 +276,26 @@ class RenderingEngine:
     def _process_single_report(self, rel_nome: str, dados: Any, cliente_nome: str, mes_nome: str, ano: int) -> tuple:
         """Processa um único relatório sequencialmente."""
         conversion_start = time.time()
-        
+        html, erro = self._gerar_html(rel_nome, dados, cliente_nome, mes_nome, ano)
+        if html is None:
+            return None, rel_nome, erro
+        return self._converter_html(html, rel_nome, conversion_start)
+
+    def _gerar_html(self, rel_nome: str, dados: Any, cliente_nome: str, mes_nome: str, ano: int) -> tuple:
+        """Gera o HTML de um relatório (template Jinja e gráficos matplotlib).
+
+        Deve rodar na thread que produz os relatórios: os renderizadores usam o estado
+        global do pyplot, que não é thread-safe.
+
+        Returns:
+            (html, None) ou (None, mensagem de erro).
+        """
         try:
             if rel_nome == "Índice":
                 from src.rendering.renderers import get_renderer
                 renderer = get_renderer(0)
                 if not renderer or not isinstance(dados, dict):
-                    return None, rel_nome, "Dados inválidos para índice"
+                    return None, "Dados inválidos para índice"
                 
                 html = renderer.render(dados, cliente_nome, mes_nome, ano)
                 
@@ -283,27 +304,27 @@ class RenderingEngine:
                 try:
                     rel_num = int(rel_nome.split()[1])
                 except (IndexError, ValueError):
-                    return None, rel_nome, "Nome de relatório inválido"
+                    return None, "Nome de relatório inválido"
                 
                 from src.rendering.renderers import get_renderer
                 renderer = get_renderer(rel_num)
                 if not renderer:
-                    return None, rel_nome, "Renderizador não encontrado"
+                    return None, "Renderizador não encontrado"
                 
                 if not dados or not isinstance(dados, tuple) or len(dados) < 2:
-                    return None, rel_nome, "Dados inválidos"
+                    return None, "Dados inválidos"
                 
                 html = renderer.render(dados, cliente_nome, mes_nome, ano)
             
             # DEBUG: Verificar conteúdo HTML gerado
             if not isinstance(html, str):
                 logger.error(f"❌ {rel_nome}: HTML não é string, tipo: {type(html)}")
-                return None, rel_nome, "HTML inválido - tipo incorreto"
+                return None, "HTML inválido - tipo incorreto"
                 
             html_clean = html.strip()
             if not html_clean:
                 logger.error(f"❌ {rel_nome}: HTML está vazio")
-                return None, rel_nome, "HTML vazio"
+                return None, "HTML vazio"
                 
             logger.info(f"✅ {rel_nome}: HTML gerado com {len(html_clean)} caracteres")
             
@@ -314,7 +335,17 @@ class RenderingEngine:
             elif not any(tag in html_clean.lower() for tag in ['<body>', '<div>', '<table>', '<p>']):
                 logger.warning(f"⚠️ {rel_nome}: HTML não contém tags esperadas")
                 logger.debug(f"📄 HTML snippet: {html_clean[:200]}...")
-            
+
+            return html, None
+
+        except Exception as e:
+            error_msg = f"Erro ao processar {rel_nome}: {str(e)}"
+            logger.error(error_msg)
+            return None, error_msg
+
+    def _converter_html(self, html: str, rel_nome: str, conversion_start: float) -> tuple:
+        """Converte o HTML já gerado em PDF (apenas o wkhtmltopdf; seguro para rodar em paralelo)."""
+        try:
             pdf_path = self._render_html_to_pdf(html, rel_nome)
             
             conversion_time = time.time() - conversion_start
@@ -335,43 +366,55 @@ class RenderingEngine:
 
     def render_to_pdf(self, relatorios_data: List[Tuple[str, Any]], cliente_nome: str, 
                       mes_nome: str, ano: int, output_path: str = None) -> str:
-        """Renderiza relatórios sequencialmente para PDF mantendo a ordem correta."""
+        """Renderiza relatórios já calculados para PDF mantendo a ordem correta (ver `render_stream`)."""
+        return self.render_stream(relatorios_data, cliente_nome, mes_nome, ano, output_path)
+
+    def render_stream(self, relatorios: Iterable[Tuple[str, Any]], cliente_nome: str,
+                      mes_nome: str, ano: int, output_path: str = None, max_paralelo: Optional[int] = None) -> str:
+        """Renderiza os relatórios à medida que são produzidos, em paralelo com a produção dos seguintes.
+
+        `relatorios` pode ser um gerador que calcula os dados de cada relatório: o HTML e os gráficos
+        de cada item são gerados nesta thread (o pyplot não é thread-safe) e apenas a conversão vai
+        para o wkhtmltopdf em paralelo, enquanto o próximo ainda consulta o banco. A montagem
+        final segue a ordem canônica (capa, índice, relatórios 1 a 8, marketing), independentemente
+        da ordem de chegada ou de término das conversões. Um erro do gerador é propagado depois que
+        as conversões em andamento terminam.
+
+        Args:
+            relatorios: Pares (nome do relatório, dados), ex.: ("Relatório 1", dados).
+            max_paralelo: Conversões wkhtmltopdf simultâneas (padrão: RENDER_MAX_PARALELO ou 2).
+        """
         try:
-            
-            start_time = time.time() 
-            
+            start_time = time.time()
             self._clean_temp_files()
+            max_paralelo = max(1, max_paralelo or int(os.getenv("RENDER_MAX_PARALELO", "2")))
+
+            conversoes: Dict[str, Future] = {}
+            with ThreadPoolExecutor(max_workers=max_paralelo) as executor:
+                for rel_nome, dados in relatorios:
+                    if rel_nome not in ORDEM_RELATORIOS or rel_nome in conversoes:
+                        logger.warning(f"Relatório ignorado na renderização: {rel_nome}")
+                        continue
+                    inicio = time.time()
+                    html, erro = self._gerar_html(rel_nome, dados, cliente_nome, mes_nome, ano)
+                    if html is None:
+                        # Falha já conhecida: entra na montagem como uma conversão concluída
+                        conversoes[rel_nome] = Future()
+                        conversoes[rel_nome].set_result((None, rel_nome, erro))
+                        continue
+                    logger.info(f"▶️ {rel_nome} enviado para conversão")
+                    conversoes[rel_nome] = executor.submit(self._converter_html, html, rel_nome, inicio)
 
-            # Definir ordem correta dos relatórios
-            ordem_relatorios = [
-                "Índice",
-                "Relatório 1", "Relatório 2", "Relatório 3", "Relatório 4",
-                "Relatório 5", "Relatório 6", "Relatório 7", "Relatório 8"
-            ]
-            
             pdf_paths = []
             processed_reports = []
             index_pdf_path = None
             
-            logger.info(f"Processando {len(relatorios_data)} relatórios sequencialmente...")
-            
-            # Processar relatórios sequencialmente na ordem correta
-            for rel_nome in ordem_relatorios:
-                # Encontrar os dados correspondentes ao relatório atual
-                dados_relatorio = None
-                for rel_nome_data, dados in relatorios_data:
-                    if rel_nome_data == rel_nome:
-                        dados_relatorio = dados
-                        break
-                
-                if dados_relatorio is None:
+            # Montar na ordem correta, independentemente da ordem de término das conversões
+            for rel_nome in ORDEM_RELATORIOS:
+                if rel_nome not in conversoes:
                     logger.warning(f"Dados não encontrados para: {rel_nome}")
                     continue
-                
-                # Processar o relatório
-                pdf_path, rel_nome_result, status = self._process_single_report(
-                    rel_nome, dados_relatorio, cliente_nome, mes_nome, ano
-                )
+                pdf_path, rel_nome_result, status = conversoes[rel_nome].result()
                 
                 if pdf_path:
                     if rel_nome == "Índice":
@@ -438,4 +481,4 @@ class RenderingEngine:
             return output_path
             
         finally:
-            self._clean_temp_files()
\ No newline at end of file
+            self._clean_temp_files()
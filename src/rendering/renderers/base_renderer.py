@@ -58,7 +58,8 @@ class BaseRenderer(ABC):
         Renderiza os dados do relatório em HTML.
         
         Args:
-            data: Dados específicos do relatório
+            data: Dados específicos do relatório (dicionários ou `Categoria`/`Subcategoria`
+                de src/core/modelos.py, que são subclasses de dict)
             cliente_nome: Nome do cliente
             mes_nome: Nome do mês
             ano: Ano do relatório
@@ -107,8 +107,11 @@ class Relatorio5Renderer(BaseRenderer):
         
         media = analise_temporal_data.get('media', 0)
         
-        # Calcular valores acumulados na ordem cronológica
-        acumulado = np.cumsum(geracao_caixa)
+        # Valores acumulados na ordem cronológica (calculados pela análise temporal; cumsum para dados sem 'acumulado')
+        if all('acumulado' in item for item in meses_data_ordenados):
+            acumulado = np.array([item['acumulado'] for item in meses_data_ordenados])
+        else:
+            acumulado = np.cumsum(geracao_caixa)
         
         # Definir cores baseadas nos valores
         cores = [cfg['colors']['positive'] if valor >= 0 else cfg['colors']['negative'] 
@@ -305,7 +308,7 @@ class Relatorio5Renderer(BaseRenderer):
                                   linestyle=cfg['styling']['mean_line_style'], 
                                   linewidth=cfg['styling']['mean_line_width'], 
                                   zorder=2,
-                                  label='Média dos últimos 3 meses')
+                                  label=f'Média dos últimos {len(meses)} meses')
             
             if cfg['annotations']['show_mean_label']:
                 media_formatada = f"R${media:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
@@ -0,0 +1,141 @@
+# benchmark_outras_categorias.py
+"""
+Micro-benchmark de `calcular_outras_categorias` (uma seção por chamada) e de
+`calcular_outras_categorias_lote` (todas as seções de todos os centros em uma chamada)
+contra a implementação anterior, copiada abaixo como referência.
+
+Antes de medir, confere que os resultados são idênticos (repr de cada valor) em
+dados aleatórios com NaN, None, infinitos, zeros com sinal e empates.
+
+Uso: python tests/benchmark_outras_categorias.py
+"""
+import random
+import timeit
+from typing import Any, Dict, List
+from src.core.utils import safe_float, calcular_outras_categorias, calcular_outras_categorias_lote
+from src.core.modelos import como_dict
+
+
+def calcular_outras_categorias_referencia(
+    items: List[Dict[str, Any]],
+    items_anterior: List[Dict[str, Any]],
+    total_atual: float,
+    total_anterior: float,
+    receita_total: float,
+    chave_valor: str = "valor",
+    chave_nome: str = "categoria",
+    top_n: int = 3,
+    usar_valor_abs: bool = False
+) -> List[Dict[str, Any]]:
+    """Implementação anterior (ordena os dicionários e chama safe_float a cada acesso)."""
+    ordenados = sorted(
+        items,
+        key=lambda x: abs(safe_float(x.get(chave_valor, 0))) if usar_valor_abs else safe_float(x.get(chave_valor, 0)),
+        reverse=True
+    )
+    total_subcategorias = sum(
+        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
+        for item in items
+    ) if items else 0
+    resultado = [
+        {
+            "subcategoria": item.get(chave_nome, "N/A"),
+            "valor": safe_float(item.get(chave_valor, 0)),
+            "av": round(safe_float(item.get("av", 0)), 2),
+            "ah": round(safe_float(item.get("ah", 0)), 2),
+            "representatividade": round(
+                (abs(safe_float(item.get(chave_valor, 0))) / total_subcategorias) * 100, 2
+            ) if total_subcategorias != 0 else 0
+        } for item in ordenados[:top_n]
+    ]
+    outras_valor = sum(
+        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
+        for item in ordenados[top_n:]
+    ) if len(ordenados) > top_n else 0
+    outras_anterior = sum(
+        abs(safe_float(item.get(chave_valor, 0))) if usar_valor_abs else safe_float(item.get(chave_valor, 0))
+        for item in sorted(
+            items_anterior,
+            key=lambda x: abs(safe_float(x.get(chave_valor, 0))) if usar_valor_abs else safe_float(x.get(chave_valor, 0)),
+            reverse=True
+        )[top_n:]
+    ) if len(items_anterior) > top_n else 0
+    outras_av = round(
+        (outras_valor / receita_total) * 100, 2
+    ) if receita_total != 0 else 0
+    outras_ah = round(
+        ((outras_valor / outras_anterior) - 1) * 100, 2
+    ) if outras_anterior != 0 else 0
+    if outras_valor != 0:
+        resultado.append({
+            "subcategoria": "Outras categorias",
+            "valor": -outras_valor if usar_valor_abs else outras_valor,
+            "av": outras_av,
+            "ah": outras_ah,
+            "representatividade": round(
+                (abs(outras_valor) / total_subcategorias) * 100, 2
+            ) if total_subcategorias != 0 else 0
+        })
+    return resultado
+
+
+def gerar_grupos(quantidade: int, itens_por_grupo: int, casos_limite: bool = False, semente: int = 42) -> List[Dict[str, Any]]:
+    """Grupos no formato de `calcular_outras_categorias_lote`, como as seções dos relatórios 1 a 4."""
+    aleatorio = random.Random(semente)
+
+    def valor():
+        if casos_limite and aleatorio.random() < 0.3:
+            return aleatorio.choice([None, float("nan"), float("inf"), 0, 0.0, -0.0, "12.5", 100.0, -100.0])
+        return round(aleatorio.uniform(-50000, 50000), 2)
+
+    def itens(n):
+        return [{"total_categoria": valor(), "nivel_2": f"Categoria {i}", "av": valor(), "ah": valor()} for i in range(n)]
+
+    return [
+        {
+            "items": itens(aleatorio.randint(0, itens_por_grupo)),
+            "items_anterior": itens(aleatorio.randint(0, itens_por_grupo)),
+            "total_atual": 0.0,
+            "total_anterior": 0.0,
+            "receita_total": aleatorio.choice([0, 250000.0]),
+            "chave_valor": "total_categoria",
+            "chave_nome": "nivel_2",
+            "top_n": 3,
+            "usar_valor_abs": aleatorio.random() < 0.5,
+        }
+        for _ in range(quantidade)
+    ]
+
+
+def verificar_identico(grupos: List[Dict[str, Any]]) -> None:
+    """Falha se algum grupo divergir da referência (simples ou em lote)."""
+    lote = calcular_outras_categorias_lote(grupos)
+    for grupo, resultado in zip(grupos, lote):
+        esperado = repr(calcular_outras_categorias_referencia(**grupo))
+        assert repr(como_dict(resultado)) == esperado, grupo
+        assert repr(como_dict(calcular_outras_categorias(**grupo))) == esperado, grupo
+
+
+def medir(grupos: List[Dict[str, Any]], repeticoes: int = 5) -> Dict[str, float]:
+    """Melhor tempo (ms) de cada implementação para processar todos os grupos."""
+    casos = {
+        "referencia": lambda: [calcular_outras_categorias_referencia(**g) for g in grupos],
+        "por_grupo": lambda: [calcular_outras_categorias(**g) for g in grupos],
+        "lote": lambda: calcular_outras_categorias_lote(grupos),
+    }
+    return {
+        nome: round(min(timeit.repeat(funcao, number=1, repeat=repeticoes)) * 1000, 3)
+        for nome, funcao in casos.items()
+    }
+
+
+if __name__ == "__main__":
+    verificar_identico(gerar_grupos(2000, 15, casos_limite=True))
+    verificar_identico(gerar_grupos(100, 1000, casos_limite=True))
+    print("Resultados idênticos à implementação anterior")
+
+    # (centros × seções, itens por seção): de um PDF simples a um ZIP com muitos centros;
+    # as seções reais têm até ~15 itens
+    for quantidade, itens_por_grupo in ((2, 10), (2, 200), (9 * 40, 15), (9 * 40, 200)):
+        tempos = medir(gerar_grupos(quantidade, itens_por_grupo))
+        print(f"{quantidade} grupos x até {itens_por_grupo} itens: {tempos}")
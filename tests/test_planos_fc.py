@@ -0,0 +1,32 @@
+# test_planos_fc.py
+from datetime import date
+import json
+from dateutil.relativedelta import relativedelta
+from src.database.db_utils import DatabaseConnection
+from src.core.indicadores import Indicadores
+from src.core.relatorios import Relatorio1, Relatorio2, Relatorio3, Relatorio4, Relatorio5
+
+def testar_planos_sem_seq_scan(cliente_ids: list, mes_atual: date):
+    """
+    Gera os relatórios de fluxo de caixa (1 a 5) capturando o EXPLAIN de cada consulta
+    e falha se algum plano regredir para Seq Scan em fc/fc_mensal.
+
+    Args:
+        cliente_ids: Lista de IDs dos clientes
+        mes_atual: Data do mês do relatório
+    """
+    db_connection = DatabaseConnection()
+    captura = db_connection.ativar_explain()
+    indicadores = Indicadores(cliente_ids, db_connection)
+    indicadores.cache_global = None  # resultados em cache não passariam pelo banco
+
+    mes_anterior = mes_atual - relativedelta(months=1)
+    for classe in (Relatorio1, Relatorio2, Relatorio3, Relatorio4, Relatorio5):
+        classe(indicadores, "Cliente Teste").gerar_relatorio(mes_atual, mes_anterior)
+
+    resumo = captura.resumo()
+    print(json.dumps({k: v for k, v in resumo.items() if k != "por_consulta"}, indent=2, ensure_ascii=False))
+    captura.verificar_sem_seq_scan()
+
+if __name__ == "__main__":
+    testar_planos_sem_seq_scan([243], date(2025, 3, 1))